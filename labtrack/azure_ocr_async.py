@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Azure Document Intelligence client.
+
+All analyze operations run on ONE background event loop, so any number of
+OCR jobs can be in flight without a thread (or a blocking sleep) each:
+- submit: POST the PDF, retry on 429 honouring Retry-After
+- poll: GET Operation-Location, waiting Retry-After when Azure sends it,
+  otherwise an adaptive delay (starts short, grows x1.5 up to a cap) so
+  short documents are picked up close to their real completion time
+
+Sync callers (worker threads) use OCRClient.ocr(); a batch of PDFs can be
+driven concurrently from a single thread with OCRClient.ocr_many().
+"""
+
+import os
+import time
+import atexit
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, List, Tuple, Mapping
+
+import aiohttp
+
+from http_client import HTTP
+
+# Polling schedule (seconds). First poll comes quickly: a 1-page PDF is
+# usually done in well under a second.
+OCR_POLL_INITIAL_S = float(os.getenv("OCR_POLL_INITIAL_S", "0.25"))
+OCR_POLL_MAX_S = float(os.getenv("OCR_POLL_MAX_S", "4"))
+OCR_POLL_BACKOFF = 1.5
+OCR_POLL_TIMEOUT_S = float(os.getenv("OCR_POLL_TIMEOUT_S", "120"))
+
+# Analyze operations allowed in flight at once on the loop
+OCR_MAX_IN_FLIGHT = int(os.getenv("OCR_MAX_IN_FLIGHT", "32"))
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date), None if absent/invalid."""
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class OCRClient:
+    """
+    Azure Document Intelligence "analyze" client backed by a private event loop.
+
+    The loop thread and the aiohttp session (pooled via http_client.HTTP) are
+    created on first use and shared by every caller of this client.
+    """
+
+    def __init__(self, endpoint: str, key: str, model_id: str = "prebuilt-read",
+                 api_version: str = "2024-11-30", max_in_flight: int = OCR_MAX_IN_FLIGHT):
+        self.endpoint = endpoint
+        self.key = key
+        self.model_id = model_id
+        self.api_version = api_version
+        self.max_in_flight = max_in_flight
+
+        self.jobs = 0
+        self.polls = 0
+        self.rate_limited = 0
+        self.retry_after_honoured = 0
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def analyze_url(self) -> str:
+        return (f"{self.endpoint}documentintelligence/documentModels/{self.model_id}"
+                f":analyze?api-version={self.api_version}")
+
+    # ------------------------------------------------------------
+    # Sync entry points (thread-safe)
+    # ------------------------------------------------------------
+
+    def ocr(self, pdf_bytes: bytes, max_retries: int = 3, job: Optional[Dict] = None) -> Optional[str]:
+        """
+        OCR one PDF; blocks the calling thread only, not the other jobs.
+        If given, job is filled with this call's retries / polls / latency_s.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._analyze(pdf_bytes, max_retries, job), self._ensure_loop())
+        return future.result()
+
+    def ocr_many(self, pdfs: List[bytes], max_retries: int = 3,
+                 jobs: Optional[List[Dict]] = None) -> List[Optional[str]]:
+        """
+        OCR several PDFs concurrently (up to max_in_flight); results in input order.
+        A job that fails for any reason is None, the others are still returned.
+        """
+        jobs = jobs if jobs is not None else [None] * len(pdfs)
+
+        async def run_all():
+            return await asyncio.gather(*(self._analyze(pdf, max_retries, job) for pdf, job in zip(pdfs, jobs)),
+                                        return_exceptions=True)
+
+        results = asyncio.run_coroutine_threadsafe(run_all(), self._ensure_loop()).result()
+        for i, result in enumerate(results):
+            if isinstance(result, BaseException):
+                print(f"    [ERROR] OCR job {i + 1}/{len(results)} failed: {result!r}")
+                results[i] = None
+        return results
+
+    def close(self) -> None:
+        """Close the HTTP session and stop the loop thread."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result()
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+
+    def format_stats(self) -> str:
+        per_job = self.polls / self.jobs if self.jobs else 0.0
+        return (f"OCR polling: {self.jobs} jobs, {self.polls} polls ({per_job:.1f}/job), "
+                f"{self.retry_after_honoured} Retry-After waits, {self.rate_limited} rate-limited")
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="azure-ocr-loop", daemon=True).start()
+                self._loop = loop
+                atexit.register(self.close)
+            return self._loop
+
+    # ------------------------------------------------------------
+    # Coroutines (run on the client loop)
+    # ------------------------------------------------------------
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = HTTP.aiohttp_session(headers={"Ocp-Apim-Subscription-Key": self.key})
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self._session
+
+    def _wait_hint(self, headers: Mapping[str, str], fallback: float) -> float:
+        retry_after = retry_after_seconds(headers)
+        if retry_after is None:
+            return fallback
+        self.retry_after_honoured += 1
+        return retry_after
+
+    async def _analyze(self, pdf_bytes: bytes, max_retries: int, job: Optional[Dict]) -> Optional[str]:
+        session = self._get_session()
+        job = job if job is not None else {}
+        job.update(retries=0, polls=0)
+        async with self._slots:
+            self.jobs += 1
+            start = time.monotonic()
+            try:
+                submitted = await self._submit(session, pdf_bytes, max_retries, job)
+                if submitted is None:
+                    return None
+                operation_url, first_wait = submitted
+                return await self._poll(session, operation_url, first_wait, job)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                # Connection reset, DNS, read timeout, unparseable poll body: a failed job, not a crash
+                print(f"    [ERROR] OCR request failed: {type(e).__name__}: {e}")
+                job["error"] = type(e).__name__
+                return None
+            finally:
+                job["latency_s"] = time.monotonic() - start
+
+    async def _submit(self, session: aiohttp.ClientSession, pdf_bytes: bytes,
+                      max_retries: int, job: Dict) -> Optional[Tuple[str, float]]:
+        """POST the PDF. Returns (operation_url, delay before the first poll) or None."""
+        for retry in range(max_retries):
+            async with session.post(self.analyze_url, data=pdf_bytes,
+                                    headers={"Content-Type": "application/pdf"}) as response:
+                if response.status == 202:
+                    operation_url = response.headers.get("Operation-Location")
+                    if not operation_url:
+                        return None
+                    return operation_url, self._wait_hint(response.headers, OCR_POLL_INITIAL_S)
+
+                if response.status != 429:
+                    print(f"    [ERROR] OCR submission failed: {response.status}")
+                    print(f"    [ERROR DETAILS] {(await response.text())[:500]}")
+                    if response.status == 403:
+                        print("    [HINT] 403 = Access Denied. Check: API key, endpoint URL, or quota exceeded")
+                    return None
+
+                self.rate_limited += 1
+                job["retries"] += 1
+                wait_time = self._wait_hint(response.headers, 15 * (retry + 1))
+
+            print(f"    [RATE LIMIT] Waiting {wait_time:.1f}s before retry {retry + 1}/{max_retries}...")
+            await asyncio.sleep(wait_time)
+
+        return None
+
+    async def _poll(self, session: aiohttp.ClientSession, operation_url: str, wait: float,
+                    job: Dict) -> Optional[str]:
+        deadline = time.monotonic() + OCR_POLL_TIMEOUT_S
+        delay = OCR_POLL_INITIAL_S
+
+        while time.monotonic() + wait < deadline:
+            await asyncio.sleep(wait)
+            self.polls += 1
+            job["polls"] += 1
+
+            async with session.get(operation_url) as response:
+                if response.status == 429 or response.status >= 500:
+                    if response.status == 429:
+                        self.rate_limited += 1
+                    delay = min(delay * OCR_POLL_BACKOFF, OCR_POLL_MAX_S)
+                    wait = self._wait_hint(response.headers, delay)
+                    continue
+                result = await response.json(content_type=None)
+                headers = response.headers
+
+            status = result.get("status")
+            if status == "succeeded":
+                return result.get("analyzeResult", {}).get("content", "")
+            elif status == "failed":
+                return None
+
+            # Still running: wait what Azure asks for, else back off adaptively
+            delay = min(delay * OCR_POLL_BACKOFF, OCR_POLL_MAX_S)
+            wait = self._wait_hint(headers, delay)
+
+        print(f"    [ERROR] OCR still running after {OCR_POLL_TIMEOUT_S:.0f}s, giving up")
+        return None
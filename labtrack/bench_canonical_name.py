@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: get_canonical_name (precompiled matcher) vs the historical
+linear scan (sort all keys + substring / \\b regex per key on every call).
+
+Checks first that both return the same canonical IDs on the full synonym
+table, then times them.
+
+Usage:
+    python bench_canonical_name.py [--rounds 20]
+"""
+import re
+import sys
+import time
+import random
+import argparse
+sys.path.insert(0, '.')
+
+from ocr_gpt_quality_test import (
+    NAME_TO_CANONICAL, CANONICAL_MATCHER, get_canonical_name, normalize_name_for_matching
+)
+
+
+def linear_match(name_norm: str):
+    """Reference fuzzy stage: the original longest-key-first linear scan."""
+    sorted_keys = sorted(NAME_TO_CANONICAL.keys(), key=len, reverse=True)
+
+    for key in sorted_keys:
+        if len(key) <= 3:
+            if re.search(r'\b' + re.escape(key) + r'\b', name_norm):
+                return key
+            continue
+        if key in name_norm:
+            return key
+    return None
+
+
+def get_canonical_name_linear(raw_name: str):
+    """Reference implementation of get_canonical_name before the matcher."""
+    name_norm = normalize_name_for_matching(raw_name)
+
+    if name_norm in NAME_TO_CANONICAL:
+        return NAME_TO_CANONICAL[name_norm], raw_name
+
+    key = linear_match(name_norm)
+    if key is not None:
+        return NAME_TO_CANONICAL[key], raw_name
+
+    return raw_name.lower().replace(" ", "_"), raw_name
+
+
+def build_names(seed: int = 42):
+    """Every synonym, plus realistic decorated / combined / unknown variants."""
+    rng = random.Random(seed)
+    keys = list(NAME_TO_CANONICAL.keys())
+    prefixes = ["", "Dosage ", "Taux de ", "Sérum - ", "(S) ", "Calcul du "]
+    suffixes = ["", " (sérum)", " - Méthode enzymatique", " calculé", " *", " sur sang total"]
+
+    names = list(keys)
+    names += [k.upper() for k in keys]
+    for key in keys:
+        names.append(rng.choice(prefixes) + key.capitalize() + rng.choice(suffixes))
+    for _ in range(len(keys)):
+        a, b = rng.sample(keys, 2)
+        names.append(f"{a} {b}")
+    names += ["Biomarqueur inconnu", "Aspect du sérum", "Calculé", "Commentaire", ""]
+    return names
+
+
+def time_fn(fn, names, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            fn(name)
+    return time.perf_counter() - start
+
+
+def main(rounds: int):
+    names = build_names()
+    print(f"Synonym table: {len(NAME_TO_CANONICAL)} keys | {len(names)} probe names")
+
+    mismatches = [n for n in names if get_canonical_name(n) != get_canonical_name_linear(n)]
+    if mismatches:
+        print(f"[FAIL] {len(mismatches)} names differ, e.g.:")
+        for n in mismatches[:10]:
+            print(f"  {n!r}: {get_canonical_name(n)[0]} != {get_canonical_name_linear(n)[0]}")
+        sys.exit(1)
+    print("Results identical to the linear scan ✅")
+
+    calls = len(names) * rounds
+    linear = time_fn(get_canonical_name_linear, names, rounds)
+    matcher = time_fn(get_canonical_name, names, rounds)
+
+    print("\nget_canonical_name (normalization + lookup):")
+    print(f"  Linear scan : {linear:.3f}s ({linear / calls * 1e6:.1f} µs/call)")
+    print(f"  Matcher     : {matcher:.3f}s ({matcher / calls * 1e6:.1f} µs/call)")
+    print(f"  Speedup     : x{linear / matcher:.1f}")
+
+    # Fuzzy stage alone, on names that miss the exact lookup
+    fuzzy = [normalize_name_for_matching(n) for n in names]
+    fuzzy = [n for n in fuzzy if n not in NAME_TO_CANONICAL]
+    calls = len(fuzzy) * rounds
+    linear = time_fn(linear_match, fuzzy, rounds)
+    matcher = time_fn(CANONICAL_MATCHER.match, fuzzy, rounds)
+
+    print(f"\nFuzzy stage only ({len(fuzzy)} names missing the exact lookup):")
+    print(f"  Linear scan : {linear:.3f}s ({linear / calls * 1e6:.1f} µs/call)")
+    print(f"  Matcher     : {matcher:.3f}s ({matcher / calls * 1e6:.1f} µs/call)")
+    print(f"  Speedup     : x{linear / matcher:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark get_canonical_name")
+    parser.add_argument("--rounds", type=int, default=20)
+    main(parser.parse_args().rounds)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the normalization and scoring hot paths:
+get_canonical_name, normalize_name_for_matching, clean_value, compare_values,
+calculate_alternate_unit and evaluate_extraction.
+
+Inputs come from a synthetic corpus generator (fixed seed, so every run
+times exactly the same inputs): French biomarker names with accents,
+decorations and OCR spacing, values with < / > / status signs and comma
+decimals, and dual-unit rows (same result reported in the alternate unit,
+as calculate_alternate_unit would). --scale multiplies the corpus size.
+
+Each path is timed --repeats times with the GC off and the name cache
+cleared before every repeat; the median per-call time is reported (min as
+a noise indicator). --save-baseline writes the numbers to a JSON file,
+--compare checks the current numbers against it and exits with status 1
+if a path got slower than the tolerance.
+
+Usage:
+    python bench_hot_paths.py [--scale 1] [--repeats 7] [--only clean_value,compare_values]
+    python bench_hot_paths.py --save-baseline [--baseline bench_baseline.json]
+    python bench_hot_paths.py --compare [--tolerance 0.25]
+"""
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+sys.path.insert(0, '.')
+
+from ocr_gpt_quality_test import (
+    BIOMARKER_UNITS, NAME_TO_CANONICAL, UNIT_MAPPINGS, _normalize_name_cached,
+    calculate_alternate_unit, clean_value, compare_values, evaluate_extraction,
+    get_canonical_name, normalize_name_for_matching
+)
+
+DEFAULT_BASELINE = Path("bench_baseline.json")
+DEFAULT_SEED = 1234
+
+# Report-style names (accents, casing, abbreviations) on top of the synonym table keys
+FRENCH_NAMES = [
+    "Hémoglobine", "Hématies", "Hématocrite", "Leucocytes", "Plaquettes", "V.G.M.", "T.C.M.H.",
+    "Polynucléaires neutrophiles", "Lymphocytes", "Glycémie à jeun", "Hémoglobine glyquée (HbA1c)",
+    "Cholestérol total", "Cholestérol HDL", "Cholestérol LDL calculé", "Triglycérides",
+    "Créatinine", "Créatininémie", "Urée", "Acide urique", "Débit de filtration glomérulaire (CKD-EPI)",
+    "Sodium", "Potassium", "Chlorures", "Calcium", "Calcium corrigé", "Phosphore", "Magnésium",
+    "Fer sérique", "Ferritine", "Transferrine", "Coefficient de saturation", "Bilirubine totale",
+    "ASAT (TGO)", "ALAT (TGP)", "Gamma GT", "Phosphatases alcalines", "Protéines totales",
+    "Albumine", "Alpha-1 globulines", "Alpha-2 globulines", "Bêta-1 globulines", "Gamma globulines",
+    "Vitamine B12", "Folates sériques", "25-OH Vitamine D", "TSH ultrasensible", "T4 libre", "T3 libre",
+    "Taux de prothrombine", "INR", "Temps de céphaline activée", "Protéine C réactive (CRP)",
+    "Estradiol", "CMV - Titre des IgG", "Toxoplasmose - Index d'IgM", "Borréliose (Lyme) - IgG",
+]
+PREFIXES = ["", "", "", "Dosage ", "Taux de ", "Sérum - ", "(S) ", "* "]
+SUFFIXES = ["", "", "", " (sérum)", " - Méthode enzymatique", " *", " sur sang total", " :"]
+UNKNOWN_NAMES = ["Aspect du sérum", "Commentaire", "Biomarqueur inconnu", "Calculé", "Groupe sanguin"]
+QUALITATIVE = ["Négatif", "Positif", "Absence", "Traces", "Indétectable"]
+
+# Display forms of the engine units ("µmol/l" -> "µmol/L", "umol/l"...)
+UNIT_DISPLAY = {
+    "mmol/l": ["mmol/L", "mmol/l"], "µmol/l": ["µmol/L", "umol/l", "μmol/L"], "nmol/l": ["nmol/L"],
+    "pmol/l": ["pmol/L"], "g/l": ["g/L", "g/l"], "g/dl": ["g/dL", "g/100mL"], "mg/l": ["mg/L"],
+    "mg/dl": ["mg/dL"], "µg/l": ["µg/L", "ug/l"], "µg/dl": ["µg/dL"], "ng/ml": ["ng/mL"], "ng/l": ["ng/L"],
+    "pg/ml": ["pg/mL"], "ng/dl": ["ng/dL"], "%": ["%"], "mmol/mol": ["mmol/mol"],
+}
+
+
+class SyntheticCorpus(NamedTuple):
+    names: List[str]
+    values: List[str]
+    comparisons: List[Tuple[str, Any, str, str]]   # compare_values arguments
+    conversions: List[Tuple[float, str, str]]      # calculate_alternate_unit arguments
+    documents: List[Tuple[Dict, List[Dict]]]       # (gpt_result, groundtruth_rows)
+
+
+def french_decimal(value: float, rng: random.Random) -> str:
+    """A lab value as printed: 1-2 decimals, comma or point."""
+    text = f"{value:.{rng.choice((0, 1, 1, 2))}f}"
+    return text.replace(".", ",") if rng.random() < 0.7 else text
+
+
+def random_name(rng: random.Random, keys: List[str]) -> str:
+    roll = rng.random()
+    if roll < 0.45:
+        base = rng.choice(FRENCH_NAMES)
+    elif roll < 0.9:
+        base = rng.choice(keys).capitalize()
+    else:
+        base = rng.choice(UNKNOWN_NAMES)
+    name = rng.choice(PREFIXES) + base + rng.choice(SUFFIXES)
+    if rng.random() < 0.15:
+        name = name.upper()
+    if rng.random() < 0.1:
+        name = name.replace(" ", "  ")  # OCR spacing
+    return name
+
+
+def random_value(rng: random.Random) -> str:
+    value = rng.lognormvariate(1.5, 1.5)
+    roll = rng.random()
+    if roll < 0.6:
+        return french_decimal(value, rng)
+    if roll < 0.75:
+        return f"{rng.choice(['<', '>', '< ', '> ', '≤', '≥'])}{french_decimal(value, rng)}"
+    if roll < 0.9:
+        return f"{rng.choice(['+ ', '+', '- '])}{french_decimal(value, rng)}"
+    return rng.choice(QUALITATIVE)
+
+
+def dual_unit_row(rng: random.Random) -> Tuple[float, str, str]:
+    """(value, canonical_id, displayed unit) for a biomarker with alternate units."""
+    canonical = rng.choice(sorted(BIOMARKER_UNITS))
+    unit = rng.choice(BIOMARKER_UNITS[canonical][0])
+    return round(rng.lognormvariate(1.5, 1.2), 2), canonical, rng.choice(UNIT_DISPLAY.get(unit, [unit]))
+
+
+def build_document(rng: random.Random, keys: List[str], rows: int) -> Tuple[Dict, List[Dict]]:
+    """
+    One report: groundtruth rows and a GPT result that gets most of them right,
+    with the usual noise (name variants, comma / point, status signs, rounding,
+    alternate units, missing and extra biomarkers).
+    """
+    canonical_by_key = list(NAME_TO_CANONICAL.items())
+    gt_rows, biomarkers = [], []
+    for _ in range(rows):
+        if rng.random() < 0.3:
+            value, canonical, unit = dual_unit_row(rng)
+            key = next((k for k, c in canonical_by_key if c == canonical), canonical)
+        else:
+            key = rng.choice(keys)
+            value = round(rng.lognormvariate(1.5, 1.5), 2)
+            unit = rng.choice(list(UNIT_MAPPINGS.values()))
+        gt_rows.append({"biomarker_name": key.capitalize(), "value": french_decimal(value, rng), "unit": unit})
+
+        roll = rng.random()
+        if roll < 0.08:
+            continue  # missed by GPT
+        name = random_name(rng, [key]) if rng.random() < 0.5 else key.capitalize()
+        extracted, extracted_unit = str(value), unit
+        if roll < 0.2:
+            alternate = calculate_alternate_unit(value, NAME_TO_CANONICAL.get(key, key), unit)
+            if alternate:
+                extracted, extracted_unit = str(alternate[0]), alternate[1]
+        elif roll < 0.3:
+            extracted = f"+ {value * 1.004:.2f}"  # status sign, rounding difference
+        biomarkers.append({"biomarker_name": name, "value": extracted, "unit": extracted_unit})
+
+    for _ in range(rows // 10):
+        biomarkers.append({"biomarker_name": random_name(rng, keys), "value": random_value(rng), "unit": ""})
+    rng.shuffle(biomarkers)
+    return {"biomarkers": biomarkers}, gt_rows
+
+
+def build_corpus(scale: float = 1.0, seed: int = DEFAULT_SEED) -> SyntheticCorpus:
+    rng = random.Random(seed)
+    keys = sorted(NAME_TO_CANONICAL)
+
+    def count(base: int) -> int:
+        return max(1, int(base * scale))
+
+    names = [random_name(rng, keys) for _ in range(count(2000))]
+    values = [random_value(rng) for _ in range(count(2000))]
+
+    comparisons = []
+    for _ in range(count(2000)):
+        expected = random_value(rng)
+        numeric, modifier, text = clean_value(expected)
+        roll = rng.random()
+        if numeric is not None and roll < 0.4:
+            numeric = round(numeric * rng.choice((1.0, 1.001, 1.01, 1.2)), 3)
+        elif roll < 0.5:
+            modifier = rng.choice(("", "<", ">"))
+        comparisons.append((expected, numeric, modifier, text))
+
+    conversions = [dual_unit_row(rng) for _ in range(count(2000))]
+    documents = [build_document(rng, keys, rows=rng.randint(25, 60)) for _ in range(count(40))]
+    return SyntheticCorpus(names, values, comparisons, conversions, documents)
+
+
+def benchmarks(corpus: SyntheticCorpus) -> Dict[str, Tuple[Callable[[], Any], int]]:
+    """name -> (function running every input once, number of calls)."""
+    def each(fn, items, star=False):
+        if star:
+            return lambda: [fn(*item) for item in items]
+        return lambda: [fn(item) for item in items]
+
+    return {
+        "normalize_name_for_matching": (each(normalize_name_for_matching, corpus.names), len(corpus.names)),
+        "get_canonical_name": (each(get_canonical_name, corpus.names), len(corpus.names)),
+        "clean_value": (each(clean_value, corpus.values), len(corpus.values)),
+        "compare_values": (each(compare_values, corpus.comparisons, star=True), len(corpus.comparisons)),
+        "calculate_alternate_unit": (each(calculate_alternate_unit, corpus.conversions, star=True),
+                                     len(corpus.conversions)),
+        "evaluate_extraction": (each(evaluate_extraction, corpus.documents, star=True), len(corpus.documents)),
+    }
+
+
+def time_benchmark(run: Callable[[], Any], calls: int, repeats: int) -> Dict[str, float]:
+    """Median / min µs per call over repeats, each from a cold name cache with the GC off."""
+    samples = []
+    for _ in range(repeats):
+        _normalize_name_cached.cache_clear()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) / calls * 1e6)
+        finally:
+            gc.enable()
+    return {"median_us": round(statistics.median(samples), 3), "min_us": round(min(samples), 3),
+            "calls": calls, "repeats": repeats}
+
+
+def compare_to_baseline(results: Dict[str, Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Print current vs baseline medians; return the names that regressed beyond tolerance."""
+    regressed = []
+    print(f"\n{'Path':<30} {'Baseline':>12} {'Now':>12} {'Change':>9}")
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<30} {'-':>12} {result['median_us']:>10.2f}µs {'new':>9}")
+            continue
+        change = result["median_us"] / previous["median_us"] - 1 if previous["median_us"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressed.append(name)
+            flag = "  ❌"
+        print(f"{name:<30} {previous['median_us']:>10.2f}µs {result['median_us']:>10.2f}µs {change:>+8.1%}{flag}")
+    return regressed
+
+
+def main(scale: float, repeats: int, only: List[str], baseline_path: Path,
+         save_baseline: bool, compare: bool, tolerance: float):
+    start = time.perf_counter()
+    corpus = build_corpus(scale)
+    rows = sum(len(gt_rows) for _, gt_rows in corpus.documents)
+    print(f"Synthetic corpus (scale {scale}, seed {DEFAULT_SEED}): {len(corpus.names)} names, "
+          f"{len(corpus.values)} values, {len(corpus.comparisons)} comparisons, "
+          f"{len(corpus.conversions)} dual-unit rows, {len(corpus.documents)} documents / {rows} groundtruth rows "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    results = {}
+    print(f"\n{'Path':<30} {'Median':>12} {'Min':>12} {'Calls':>8}")
+    for name, (run, calls) in benchmarks(corpus).items():
+        if only and name not in only:
+            continue
+        results[name] = time_benchmark(run, calls, repeats)
+        print(f"{name:<30} {results[name]['median_us']:>10.2f}µs {results[name]['min_us']:>10.2f}µs {calls:>8}")
+
+    meta = {"scale": scale, "seed": DEFAULT_SEED, "repeats": repeats, "python": platform.python_version(),
+            "machine": platform.machine(), "date": datetime.now().isoformat(timespec="seconds")}
+
+    if compare:
+        if not baseline_path.exists():
+            print(f"\n[ERROR] No baseline at {baseline_path} - run with --save-baseline first")
+            sys.exit(1)
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        if (baseline["meta"]["scale"], baseline["meta"]["seed"]) != (scale, DEFAULT_SEED):
+            print(f"\n[WARN] Baseline was taken at scale {baseline['meta']['scale']}, "
+                  f"seed {baseline['meta']['seed']}: per-call times may not be comparable")
+        regressed = compare_to_baseline(results, baseline, tolerance)
+        if regressed:
+            print(f"\n[FAIL] Slower than baseline by more than {tolerance:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+        print(f"\nNo regression beyond {tolerance:.0%} ✅")
+
+    if save_baseline:
+        baseline_path.write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+        print(f"\nBaseline saved to {baseline_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the normalization and scoring hot paths")
+    parser.add_argument("--scale", type=float, default=1.0, help="Corpus size multiplier")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--only", default="", help="Comma-separated paths to time (default: all)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare to --baseline, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown (0.25 = +25%%)")
+    args = parser.parse_args()
+    main(args.scale, args.repeats, [p for p in args.only.split(",") if p], args.baseline,
+         args.save_baseline, args.compare, args.tolerance)
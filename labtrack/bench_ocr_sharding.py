@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: whole-document OCR vs page-sharded OCR on the same corpus.
+
+Every PDF in bloodwork/ is OCR'd twice against Azure, bypassing OCR_CACHE:
+once as a single Document Intelligence job, once split into shards of
+--pages-per-shard pages submitted concurrently (ocr_sharded). Reports the
+per-PDF latency (submit -> full text) of both modes and the corpus wall time
+with the same number of workers, plus the stitched / whole text length
+ratio as a sanity check.
+
+Usage:
+    python bench_ocr_sharding.py [--workers 4] [--pages-per-shard 1] [--limit 10]
+"""
+import sys
+import time
+import argparse
+sys.path.insert(0, '.')
+
+from ocr_gpt_quality_test import (
+    BLOODWORK_DIR, DEFAULT_WORKERS, OCR_CLIENT, OCR_PAGES_PER_SHARD,
+    call_azure_ocr, get_pdf_page_count, ocr_sharded, run_corpus
+)
+from usage_ledger import LEDGER
+
+
+def timed_ocr(pdf_path, mode: str, pages_per_shard: int):
+    """(seconds, text or None) for one uncached OCR of pdf_path."""
+    with LEDGER.scope(pdf_path.name):
+        start = time.perf_counter()
+        if mode == "whole":
+            text = call_azure_ocr(pdf_path.read_bytes())
+        else:
+            text = ocr_sharded(pdf_path, pages_per_shard, use_cache=False)
+        return time.perf_counter() - start, text
+
+
+def run_mode(pdf_paths, mode: str, pages_per_shard: int, workers: int):
+    print(f"\n[{mode}] OCR {len(pdf_paths)} PDFs ({workers} workers)...")
+    start = time.perf_counter()
+    outcomes = run_corpus(pdf_paths, lambda p: timed_ocr(p, mode, pages_per_shard), workers=workers)
+    return time.perf_counter() - start, [o if o is not None else (0.0, None) for o in outcomes]
+
+
+def main(workers: int, pages_per_shard: int, limit: int):
+    pdf_paths = sorted(BLOODWORK_DIR.glob("*.pdf"))[:limit or None]
+    if not pdf_paths:
+        print(f"[ERROR] No PDFs in {BLOODWORK_DIR}/")
+        return
+
+    whole_wall, whole = run_mode(pdf_paths, "whole", pages_per_shard, workers)
+    sharded_wall, sharded = run_mode(pdf_paths, "sharded", pages_per_shard, workers)
+
+    print("\n" + "=" * 78)
+    print(f"OCR LATENCY - whole document vs {pages_per_shard}-page shards")
+    print("=" * 78)
+    print(f"{'PDF':<42} {'Pages':>5} {'Whole':>8} {'Sharded':>8} {'Speedup':>8} {'Text':>5}")
+    for pdf_path, (whole_s, whole_text), (sharded_s, sharded_text) in zip(pdf_paths, whole, sharded):
+        if not whole_text or not sharded_text:
+            status = "whole failed" if not whole_text else "sharded failed"
+            print(f"{pdf_path.name[:42]:<42} {get_pdf_page_count(pdf_path):>5} {status:>26}")
+            continue
+        print(f"{pdf_path.name[:42]:<42} {get_pdf_page_count(pdf_path):>5} {whole_s:>7.1f}s {sharded_s:>7.1f}s "
+              f"{whole_s / sharded_s:>7.1f}x {len(sharded_text) / len(whole_text):>5.2f}")
+
+    ok = [(w[0], s[0]) for w, s in zip(whole, sharded) if w[1] and s[1]]
+    print("-" * 78)
+    if ok:
+        whole_total = sum(w for w, _ in ok)
+        sharded_total = sum(s for _, s in ok)
+        print(f"Mean per-PDF latency: whole {whole_total / len(ok):.1f}s | sharded {sharded_total / len(ok):.1f}s "
+              f"(x{whole_total / sharded_total:.2f})")
+    print(f"Corpus wall time: whole {whole_wall:.1f}s | sharded {sharded_wall:.1f}s "
+          f"(x{whole_wall / sharded_wall:.2f}, {workers} workers)")
+    print(OCR_CLIENT.format_stats())
+    print(LEDGER.format_run_summary())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark whole-document vs page-sharded OCR")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--pages-per-shard", type=int, default=OCR_PAGES_PER_SHARD)
+    parser.add_argument("--limit", type=int, default=0, help="Only the first N PDFs (0 = all)")
+    args = parser.parse_args()
+    main(args.workers, args.pages_per_shard, args.limit)
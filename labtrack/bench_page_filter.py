@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Page filter check: prompt tokens and extraction recall with / without the
+page relevance filter (page_filter.py), on the groundtruth corpus.
+
+For every PDF of bloodwork.csv, page texts come from the text layer (or
+single-page OCR shards for scans, cached). Both the full text and the
+filtered text are then:
+- checked offline: share of groundtruth values still present in the text
+- sent to GPT and scored with evaluate_extraction (skip with --no-gpt)
+
+Exits with status 1 if the filter loses any exact match or value.
+
+Usage:
+    python bench_page_filter.py [--workers 4] [--no-gpt] [--limit 10]
+"""
+import sys
+import argparse
+sys.path.insert(0, '.')
+
+from ocr_gpt_quality_test import (
+    BLOODWORK_DIR, DEFAULT_WORKERS, call_azure_gpt, evaluate_extraction, get_pdf_page_count,
+    join_pages, load_groundtruth_csv, ocr_page_shards, run_corpus, text_layer_pages
+)
+from page_filter import PAGE_FILTER_STATS
+from usage_ledger import LEDGER
+
+
+def page_texts_of(pdf_path):
+    """Every page's text: text layer where usable, single-page OCR elsewhere."""
+    with LEDGER.scope(pdf_path.name):
+        pages = text_layer_pages(pdf_path)
+        if pages is not None:
+            return pages
+        shards = [(i, 1) for i in range(get_pdf_page_count(pdf_path))]
+        texts = ocr_page_shards(pdf_path, pdf_path.read_bytes(), shards)
+        return None if texts is None else [texts[i] for i in sorted(texts)]
+
+
+def values_present(text: str, gt_rows) -> int:
+    """Groundtruth values found verbatim in text (decimal comma or point)."""
+    found = 0
+    for row in gt_rows:
+        value = (row.get("value") or "").strip()
+        if value and (value in text or value.replace(",", ".") in text or value.replace(".", ",") in text):
+            found += 1
+    return found
+
+
+def compare(job, use_gpt: bool):
+    pdf_name, gt_rows = job
+    pdf_path = BLOODWORK_DIR / pdf_name
+    pages = page_texts_of(pdf_path)
+    if pages is None:
+        return None
+
+    full = join_pages(pages)
+    filtered = join_pages(pages, page_filter=True)
+    row = {
+        "pdf_name": pdf_name,
+        "pages": len(pages),
+        "tokens_full": LEDGER.estimate_tokens(full),
+        "tokens_filtered": LEDGER.estimate_tokens(filtered),
+        "values_full": values_present(full, gt_rows),
+        "values_filtered": values_present(filtered, gt_rows),
+        "fields": len(gt_rows),
+    }
+    if use_gpt:
+        with LEDGER.scope(pdf_name):
+            row["matches_full"] = evaluate_extraction(call_azure_gpt(full), gt_rows).get("exact_matches", 0)
+            row["matches_filtered"] = evaluate_extraction(call_azure_gpt(filtered), gt_rows).get("exact_matches", 0)
+    return row
+
+
+def main(workers: int, use_gpt: bool, limit: int):
+    groundtruth_csv = BLOODWORK_DIR / "bloodwork.csv"
+    if not groundtruth_csv.exists():
+        print(f"[ERROR] Groundtruth CSV not found: {groundtruth_csv}")
+        return
+    jobs = [(pdf_name, gt_rows) for pdf_name, gt_rows in load_groundtruth_csv(groundtruth_csv).items()
+            if (BLOODWORK_DIR / pdf_name).exists()][:limit or None]
+
+    rows = [r for r in run_corpus(jobs, lambda job: compare(job, use_gpt), workers=workers) if r]
+
+    print("\n" + "=" * 86)
+    print("PAGE FILTER - full text vs result pages only")
+    print("=" * 86)
+    header = f"{'PDF':<40} {'Tokens':>15} {'Values':>11}"
+    if use_gpt:
+        header += f" {'Exact matches':>14}"
+    print(header)
+    for r in rows:
+        line = (f"{r['pdf_name'][:40]:<40} {r['tokens_full']:>6} -> {r['tokens_filtered']:<6} "
+                f"{r['values_full']:>4} -> {r['values_filtered']:<4}")
+        if use_gpt:
+            line += f" {r['matches_full']:>5} -> {r['matches_filtered']:<5}"
+        print(line)
+
+    def total(key):
+        return sum(r[key] for r in rows)
+
+    print("-" * 86)
+    print(PAGE_FILTER_STATS.format_stats(LEDGER.chars_per_token()))
+    if total("tokens_full"):
+        print(f"Prompt tokens: {total('tokens_full'):,} -> {total('tokens_filtered'):,} "
+              f"(-{(1 - total('tokens_filtered') / total('tokens_full')) * 100:.1f}%)")
+    print(f"Groundtruth values in text: {total('values_full')} -> {total('values_filtered')} "
+          f"/ {total('fields')} fields")
+    lost = total("values_full") - total("values_filtered")
+    if use_gpt:
+        print(f"Exact matches (evaluate_extraction): {total('matches_full')} -> {total('matches_filtered')}")
+        lost = max(lost, total("matches_full") - total("matches_filtered"))
+    print(LEDGER.format_run_summary())
+
+    if lost > 0:
+        print(f"[FAIL] The page filter loses {lost} result(s)")
+        sys.exit(1)
+    print("No recall loss ✅")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the page relevance filter")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--no-gpt", action="store_true", help="Offline check only (values present in text)")
+    parser.add_argument("--limit", type=int, default=0, help="Only the first N PDFs (0 = all)")
+    args = parser.parse_args()
+    main(args.workers, not args.no_gpt, args.limit)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Streaming helpers for chat/completions extraction.
+
+- iter_sse_data(lines): "data:" payloads of a server-sent events stream
+- BiomarkerStreamParser: incremental JSON parser that returns every object
+  of the "biomarkers" array as soon as its closing brace arrives, so
+  biomarkers can be normalized while the model is still generating
+- StreamStats: time to first token / first biomarker / last biomarker
+"""
+
+import json
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """Data of each SSE event, up to "[DONE]" (one "data:" line per event on Azure OpenAI)."""
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        yield data
+
+
+class BiomarkerStreamParser:
+    """
+    Feed completion text as it arrives; feed() returns the objects completed by
+    that piece. An object is emitted when it sits directly inside the top-level
+    object's "biomarkers" array ({"biomarkers": [{...}, ...]}); objects of any
+    other array ("notes": [...]) are not.
+    """
+
+    ARRAY_KEY = "biomarkers"
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._object_start: Optional[int] = None
+        self._string_start = 0
+        self._last_key: Optional[str] = None   # last string read at the top level
+        self._array_key: Optional[str] = None  # key of the open top-level array
+        self._pos = 0
+        self.emitted = 0
+
+    def feed(self, text: str) -> List[Dict]:
+        objects = []
+        for c in text:
+            self._buffer.append(c)
+            pos = self._pos
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._stack == ["{"]:
+                        self._last_key = "".join(self._buffer[self._string_start:pos])
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = pos + 1
+            elif c in "{[":
+                if c == "[" and self._stack == ["{"]:
+                    self._array_key = self._last_key
+                elif c == "{" and self._stack == ["{", "["] and self._array_key == self.ARRAY_KEY:
+                    self._object_start = pos
+                self._stack.append(c)
+            elif c in "}]" and self._stack:
+                self._stack.pop()
+                if c == "}" and self._object_start is not None and self._stack == ["{", "["]:
+                    raw = "".join(self._buffer[self._object_start:pos + 1])
+                    self._object_start = None
+                    try:
+                        objects.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        continue
+        self.emitted += len(objects)
+        return objects
+
+    @property
+    def text(self) -> str:
+        return "".join(self._buffer)
+
+
+class StreamStats:
+    """
+    Thread-safe latency samples of streamed completions (seconds from request start).
+    Biomarker times are None for a completion that emitted no biomarker, and
+    left out of the first / last biomarker means.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: List[Dict[str, Optional[float]]] = []
+
+    def add(self, first_token_s: float, first_biomarker_s: Optional[float],
+            last_biomarker_s: Optional[float], total_s: float) -> None:
+        with self._lock:
+            self.samples.append({
+                "first_token_s": first_token_s,
+                "first_biomarker_s": first_biomarker_s,
+                "last_biomarker_s": last_biomarker_s,
+                "total_s": total_s,
+            })
+
+    def format_stats(self) -> str:
+        with self._lock:
+            samples = list(self.samples)
+        if not samples:
+            return "GPT stream: no streamed completion"
+
+        def mean(key: str) -> str:
+            values = [s[key] for s in samples if s[key] is not None]
+            return f"{sum(values) / len(values):.1f}s" if values else "n/a"
+
+        empty = sum(1 for s in samples if s["first_biomarker_s"] is None)
+        return (f"GPT stream: {len(samples)} completions ({empty} without biomarkers), "
+                f"mean first token {mean('first_token_s')}, first biomarker {mean('first_biomarker_s')}, "
+                f"last biomarker {mean('last_biomarker_s')}, complete {mean('total_s')}")
+
+
+# Process-wide stats shared by every worker
+STREAM_STATS = StreamStats()
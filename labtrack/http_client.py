@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Shared, pooled HTTP client for the Azure calls (OCR submit/poll, GPT, LOINC GPT).
+
+One keep-alive connection pool per host instead of a fresh TCP+TLS handshake
+per request:
+- sync side: a requests.Session with a bounded urllib3 pool per host
+  (GPT completions, called from worker threads)
+- async side: aiohttp sessions built on the same limits (OCR client loop)
+
+Both sides count requests vs. newly opened connections, so connection
+reuse can be read off at the end of a corpus run.
+"""
+
+import os
+import threading
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connections kept open per host (worker threads beyond this wait for a free one)
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "16"))
+# Seconds; read timeout covers a full GPT completion
+HTTP_CONNECT_TIMEOUT_S = float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "10"))
+HTTP_READ_TIMEOUT_S = float(os.getenv("HTTP_READ_TIMEOUT_S", "120"))
+
+
+class PooledHTTPClient:
+    """
+    Thread-safe pooled client. Use .post()/.get() like requests, or
+    .aiohttp_session() from inside a running event loop.
+    """
+
+    def __init__(self, pool_per_host: int = HTTP_POOL_PER_HOST,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT_S,
+                 read_timeout: float = HTTP_READ_TIMEOUT_S):
+        self.pool_per_host = pool_per_host
+        self.timeout = (connect_timeout, read_timeout)
+
+        # pool_connections = hosts whose pool is kept alive (Azure OCR, OpenAI, ...)
+        self._adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_per_host, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._sync_requests = 0
+        self._async_requests = 0
+        self._async_connections = 0
+
+    # ------------------------------------------------------------
+    # Sync (requests)
+    # ------------------------------------------------------------
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        with self._lock:
+            self._sync_requests += 1
+        return self.session.request(method, url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def _sync_connections(self) -> int:
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    # ------------------------------------------------------------
+    # Async (aiohttp)
+    # ------------------------------------------------------------
+
+    def aiohttp_session(self, headers: Optional[Dict[str, str]] = None) -> aiohttp.ClientSession:
+        """New aiohttp session with the same per-host limit and timeouts; call on the loop that uses it."""
+        connect_timeout, read_timeout = self.timeout
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_async_request)
+        trace.on_connection_create_end.append(self._on_async_connection)
+        return aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_per_host),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+            trace_configs=[trace],
+        )
+
+    async def _on_async_request(self, session, context: SimpleNamespace, params) -> None:
+        with self._lock:
+            self._async_requests += 1
+
+    async def _on_async_connection(self, session, context: SimpleNamespace, params) -> None:
+        with self._lock:
+            self._async_connections += 1
+
+    # ------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            requests_sent = self._sync_requests + self._async_requests
+            connections = self._sync_connections() + self._async_connections
+        reused = max(requests_sent - connections, 0)
+        return {
+            "requests": requests_sent,
+            "connections": connections,
+            "reused": reused,
+            "reuse_rate": round(reused / requests_sent * 100, 1) if requests_sent else 0.0,
+        }
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (f"HTTP pool: {s['requests']} requests over {s['connections']} connections "
+                f"({s['reused']} reused, {s['reuse_rate']}%)")
+
+
+# Process-wide client shared by every Azure call
+HTTP = PooledHTTPClient()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Lab fingerprinting and per-template extraction profiles.
+
+The first page of a report (its first LAB_HEAD_CHARS characters of text) is
+enough to tell the lab and the report template apart:
+- lab: Biogroup / Synlab / Cerballiance name or domain (LAB_SIGNATURES)
+- template: the result-table header row's columns, in that row's order
+  ("resultat-unite-reference-anteriorite"), which is stable per lab template
+
+A known template is routed to its profile: the column order as a prompt
+hint (used with the compact system prompt instead of the generic one) and
+whether regular rows are parsed locally (off for a new template, like
+LOCAL_ROWS, until it is validated). Profiles are cached in memory and in
+LAB_PROFILES (JSON, one entry per template seen), where a template can be
+tuned by hand: edit "columns_hint" / "local_rows", or set "enabled" to
+false to send it back to the generic prompt. Unknown labs always get the
+generic prompt.
+
+Usage (fingerprint the text of saved OCR outputs / list cached profiles):
+    python lab_profiles.py ocr_gpt_test_results/*_ocr.md
+    python lab_profiles.py --list
+"""
+
+import os
+import re
+import sys
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from loinc_index import fold_text
+
+LAB_ROUTING = os.getenv("LAB_ROUTING", "0") == "1"
+LAB_PROFILES_PATH = Path(os.getenv("LAB_PROFILES", "lab_profiles.json"))
+# Characters of report text read for the fingerprint (~ first page)
+LAB_HEAD_CHARS = int(os.getenv("LAB_HEAD_CHARS", "3000"))
+
+# Folded patterns naming the lab on its reports
+LAB_SIGNATURES = (
+    ("biogroup", re.compile(r'\bbiogroup\b|biogroup\.fr')),
+    ("synlab", re.compile(r'\bsynlab\b|synlab\.fr')),
+    ("cerballiance", re.compile(r'\bcerballiance\b|cerballiance\.fr')),
+)
+UNKNOWN_LAB = "unknown"
+
+# Result-table column headers (folded) -> column key, and how the prompt names them
+COLUMN_HEADERS = (
+    (re.compile(r'\bresultats?\b'), "resultat", "Résultat"),
+    (re.compile(r'\bunites?\b'), "unite", "Unité"),
+    (re.compile(r'\bvaleurs? (?:de reference|normales?|usuelles?)|\breferences?\b|\bnormales\b'),
+     "reference", "Valeurs de référence"),
+    (re.compile(r'\banteriorites?\b'), "anteriorite", "Antériorités (à ignorer)"),
+    (re.compile(r'\btemoin\b'), "temoin", "Témoin (coagulation, à ignorer)"),
+)
+_COLUMN_LABELS = {key: label for _, key, label in COLUMN_HEADERS}
+# A header row is short; longer lines are prose ("résultats à interpréter selon...")
+_HEADER_MAX_WORDS = 8
+# Column headers the header row needs (one match is a banner: "Référence dossier")
+_HEADER_MIN_COLUMNS = 2
+_DIGIT_RE = re.compile(r'\d')
+
+
+class Fingerprint(NamedTuple):
+    lab: str
+    template: str  # "<lab>/<columns>"
+    columns: Tuple[str, ...]
+
+
+class TemplateProfile(NamedTuple):
+    template: str
+    columns_hint: str
+    local_rows: bool
+    enabled: bool = True
+
+
+def header_cells(line: str) -> List[str]:
+    """Column keys of a (folded) line, left to right; none for prose or lines with values."""
+    if len(line.split()) > _HEADER_MAX_WORDS or _DIGIT_RE.search(line):
+        return []
+    found = []
+    for pattern, key, _ in COLUMN_HEADERS:
+        match = pattern.search(line)
+        if match:
+            found.append((match.start(), key))
+    return [key for _, key in sorted(found)]
+
+
+def header_row(lines: List[str]) -> Tuple[str, ...]:
+    """
+    Columns of the result table header: the first line, or run of adjacent
+    lines (OCR splits table cells), naming at least _HEADER_MIN_COLUMNS
+    column headers, in that row's order. Empty if there is none.
+    """
+    run: List[str] = []
+    for line in lines + [""]:
+        cells = header_cells(line)
+        if cells:
+            run.extend(key for key in cells if key not in run)
+            continue
+        if len(run) >= _HEADER_MIN_COLUMNS:
+            return tuple(run)
+        run = []
+    return ()
+
+
+def fingerprint(text: str) -> Fingerprint:
+    """Lab and template of a report from the head of its text."""
+    head = fold_text(text[:LAB_HEAD_CHARS])
+    lab = next((name for name, pattern in LAB_SIGNATURES if pattern.search(head)), UNKNOWN_LAB)
+    columns = header_row(head.splitlines())
+    return Fingerprint(lab, f"{lab}/{'-'.join(columns) or 'default'}", columns)
+
+
+def default_profile(fp: Fingerprint) -> TemplateProfile:
+    """Profile built from the fingerprint alone: column order as the prompt hint, no local rows."""
+    hint = " | ".join(_COLUMN_LABELS[key] for key in fp.columns)
+    return TemplateProfile(fp.template, hint, local_rows=False)
+
+
+class ProfileCache:
+    """Thread-safe template -> profile cache, persisted to a JSON file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._profiles: Optional[Dict[str, TemplateProfile]] = None
+
+    def _load(self) -> Dict[str, TemplateProfile]:
+        if self._profiles is None:
+            self._profiles = {}
+            if self.path.exists():
+                try:
+                    stored = json.loads(self.path.read_text(encoding="utf-8"))
+                except json.JSONDecodeError:
+                    print(f"    [LAB PROFILES] Unreadable {self.path}, starting empty")
+                    stored = {}
+                for template, fields in stored.items():
+                    self._profiles[template] = TemplateProfile(template, **fields)
+        return self._profiles
+
+    def _save(self) -> None:
+        stored = {t: {k: v for k, v in p._asdict().items() if k != "template"}
+                  for t, p in sorted(self._profiles.items())}
+        self.path.write_text(json.dumps(stored, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def get(self, fp: Fingerprint) -> Optional[TemplateProfile]:
+        """Profile of a known lab's template (created and saved on first sight), None to use the generic path."""
+        if fp.lab == UNKNOWN_LAB:
+            return None
+        with self._lock:
+            profiles = self._load()
+            profile = profiles.get(fp.template)
+            if profile is None:
+                profile = profiles[fp.template] = default_profile(fp)
+                self._save()
+        return profile if profile.enabled else None
+
+    def profiles(self) -> List[TemplateProfile]:
+        with self._lock:
+            return list(self._load().values())
+
+
+# Process-wide cache shared by every worker
+LAB_PROFILES = ProfileCache(LAB_PROFILES_PATH)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: python {Path(__file__).name} <ocr text file>... | --list")
+        sys.exit(1)
+
+    if sys.argv[1] == "--list":
+        for profile in LAB_PROFILES.profiles():
+            state = "local rows" if profile.local_rows else "GPT only"
+            print(f"{profile.template:<50} {state:<10} {'on' if profile.enabled else 'off':<4} {profile.columns_hint}")
+        sys.exit(0)
+
+    for name in sys.argv[1:]:
+        fp = fingerprint(Path(name).read_text(encoding="utf-8"))
+        print(f"{Path(name).name[:50]:<50} {fp.template}")
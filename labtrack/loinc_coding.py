@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Deterministic local LOINC coding of extracted biomarkers (no LOINC in the prompt).
+
+Takes the dicts from normalize_gpt_biomarkers and assigns a code from
+loinc_fr_context.csv, trying in order:
+1. "name"      the raw name equals a LOINC name (accent/punctuation-folded)
+2. "canonical" a NAME_TO_CANONICAL synonym of the biomarker's canonical ID
+               equals a LOINC name (Glycémie -> glucose -> "Glucose")
+3. "retrieval" best BM25 hit of the raw name (loinc_retrieval) whose name
+               words all appear in the raw name or its synonyms
+
+Within a step, candidates are ranked by unit compatibility. An exact unit
+beats a unit of the same dimension (mass, molar...), which beats an entry
+with a unit we cannot judge. An entry whose unit is known to be incompatible
+(e.g. a molar LOINC code for a value in g/L) is never assigned.
+
+Usage (offline, on the saved *_gpt.json of the last quality test run):
+    python loinc_coding.py
+"""
+
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from ocr_gpt_quality_test import (
+    NAME_TO_CANONICAL, UNIT_DIMENSIONS, OUTPUT_DIR,
+    canonical_unit_key, normalize_gpt_biomarkers, load_saved_outputs
+)
+from loinc_index import LoincEntry, LoincIndex, LOINC_CSV
+from loinc_retrieval import LoincRetriever
+
+UNKNOWN_CODE = "UNKNOWN"
+
+# Retrieval hits must cover the whole LOINC name (one code is assigned, not a shortlist)
+LOINC_CODING_MIN_COVERAGE = 1.0
+
+_BRACES_RE = re.compile(r'\{[^}]*\}')
+
+# Unit spellings unified on both sides (LOINC UCUM / French lab reports)
+_UNIT_KEYS = {
+    "10*9/l": "giga/l", "10^9/l": "giga/l", "10⁹/l": "giga/l",
+    "10*12/l": "tera/l", "10^12/l": "tera/l", "10¹²/l": "tera/l", "t/l": "tera/l", "téra/l": "tera/l",
+    "ml/mn/1.73m2": "ml/min/1.73m2", "ml/min/1.73m²": "ml/min/1.73m2", "ml/mn/1.73m²": "ml/min/1.73m2",
+}
+
+
+def unit_key(unit: str) -> str:
+    """Comparable unit key: "[IU]/L", "UI/L" -> "u/l"; "10*9/L" -> "giga/l"; "%{Hb}" -> "%"."""
+    key = unit.lower().strip().replace("{1.73_m2}", "1.73m2")
+    key = _BRACES_RE.sub("", key).replace("[iu]", "u")
+    if key.startswith(("ui/", "mui/", "µui/")):
+        key = key.replace("ui/", "u/", 1)
+    if key.startswith(("ug", "um")):  # UCUM micro prefix: ug/L, umol/mmol
+        key = "µ" + key[1:]
+    key = canonical_unit_key(key)
+    return _UNIT_KEYS.get(key, key)
+
+
+def unit_keys(unit: str) -> Set[str]:
+    """Keys an extracted unit may stand for ("G/L" is grams OR giga (10^9) per litre)."""
+    key = unit_key(unit)
+    return {key, "giga/l"} if key == "g/l" else {key}
+
+
+def unit_score(extracted: Set[str], loinc_unit: str) -> int:
+    """3 same unit, 2 same dimension, 1 cannot judge, 0 incompatible."""
+    if not loinc_unit or not extracted or extracted == {""}:
+        return 1
+    key = unit_key(loinc_unit)
+    if key in extracted:
+        return 3
+    dimension = UNIT_DIMENSIONS.get(key)
+    extracted_dims = {UNIT_DIMENSIONS.get(k) for k in extracted} - {None}
+    if dimension is None or not extracted_dims:
+        return 1
+    return 2 if dimension[0] in {dim for dim, _ in extracted_dims} else 0
+
+
+class LoincCoder:
+    """Assigns LOINC codes to normalized biomarkers; see module docstring for the rules."""
+
+    def __init__(self, index: LoincIndex, retriever: LoincRetriever):
+        self.index = index
+        self.retriever = retriever
+
+        # canonical ID -> LOINC entries named like one of its synonyms (first seen first)
+        self.by_canonical: Dict[str, List[LoincEntry]] = {}
+        for name, canonical in NAME_TO_CANONICAL.items():
+            entries = self.by_canonical.setdefault(canonical, [])
+            for entry in index.by_name(name):
+                if entry not in entries:
+                    entries.append(entry)
+
+    @classmethod
+    def from_csv(cls, path=LOINC_CSV) -> "LoincCoder":
+        return cls(LoincIndex.open(path), LoincRetriever.from_csv(path))
+
+    @staticmethod
+    def _best(candidates: List[LoincEntry], extracted_units: Set[str]) -> Optional[LoincEntry]:
+        best, best_score = None, 0
+        for entry in candidates:
+            score = unit_score(extracted_units, entry.unit)
+            if score > best_score:
+                best, best_score = entry, score
+        return best
+
+    def code(self, bio: Dict) -> Tuple[Optional[LoincEntry], str]:
+        """(LOINC entry or None, method: name / canonical / retrieval / none) for one biomarker."""
+        extracted_units = unit_keys(bio.get("unit") or "")
+
+        entry = self._best(self.index.by_name(bio["raw_name"]), extracted_units)
+        if entry is not None:
+            return entry, "name"
+
+        entry = self._best(self.by_canonical.get(bio["canonical_id"], []), extracted_units)
+        if entry is not None:
+            return entry, "canonical"
+
+        hits = self.retriever.search(bio["raw_name"], min_coverage=LOINC_CODING_MIN_COVERAGE)
+        hits = [self.retriever.entries[i] for _, i in hits]
+        entry = self._best(hits, extracted_units)
+        if entry is not None:
+            return entry, "retrieval"
+
+        return None, "none"
+
+    def code_biomarkers(self, biomarkers: List[Dict]) -> List[Dict]:
+        """Copies of the normalized biomarkers with loinc_code / loinc_name / loinc_method added."""
+        coded = []
+        for bio in biomarkers:
+            entry, method = self.code(bio)
+            coded.append({
+                **bio,
+                "loinc_code": entry.code if entry else UNKNOWN_CODE,
+                "loinc_name": entry.name if entry else None,
+                "loinc_method": method,
+            })
+        return coded
+
+
+def main():
+    print("=" * 70)
+    print("Local LOINC coding - saved GPT outputs (no Azure calls)")
+    print("=" * 70)
+
+    saved = [(pdf_name, gpt_result) for pdf_name, gpt_result, _, _ in load_saved_outputs() if gpt_result]
+    if not saved:
+        print(f"[ERROR] No saved *_gpt.json in {OUTPUT_DIR}/ - run ocr_gpt_quality_test.py first")
+        return
+
+    coder = LoincCoder.from_csv()
+    total_biomarkers = 0
+    total_loinc_matched = 0
+    methods: Dict[str, int] = {}
+
+    for i, (pdf_name, gpt_result) in enumerate(saved, 1):
+        coded = coder.code_biomarkers(normalize_gpt_biomarkers(gpt_result))
+        matched = sum(1 for b in coded if b["loinc_code"] != UNKNOWN_CODE)
+        for b in coded:
+            methods[b["loinc_method"]] = methods.get(b["loinc_method"], 0) + 1
+
+        total_biomarkers += len(coded)
+        total_loinc_matched += matched
+        match_rate = matched / len(coded) * 100 if coded else 0
+        print(f"[{i}/{len(saved)}] {pdf_name[:50]}: {len(coded)} biomarkers | {matched} LOINC matched | "
+              f"{len(coded) - matched} unknown | {match_rate:.1f}%")
+
+        unknowns = [b["raw_name"] for b in coded if b["loinc_code"] == UNKNOWN_CODE]
+        if unknowns:
+            print(f"  Unknown: {', '.join(unknowns[:5])}" + (" ..." if len(unknowns) > 5 else ""))
+
+    print("\n" + "=" * 70)
+    print("SUMMARY")
+    print("=" * 70)
+    print(f"Total biomarkers: {total_biomarkers}")
+    print(f"LOINC matched: {total_loinc_matched}")
+    print(f"Unknown: {total_biomarkers - total_loinc_matched}")
+    if total_biomarkers > 0:
+        print(f"Overall LOINC match rate: {total_loinc_matched/total_biomarkers*100:.1f}%")
+    print("By method: " + ", ".join(f"{m}={n}" for m, n in sorted(methods.items())))
+
+
+if __name__ == "__main__":
+    main()
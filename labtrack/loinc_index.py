@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Compiled LOINC index: loinc_fr_context.csv parsed once into a compact binary
+file that is mmap'ed on load (a few ms, no per-line parsing).
+
+Lookups:
+- by_code("718-7")            hash table on the code
+- by_name("Hémoglobine")      hash table on the normalized name
+- by_prefix("cholesterol h")  binary search on records sorted by normalized name
+
+The file stores the SHA-256 of the CSV it was built from and is rebuilt
+automatically when the CSV changes. It is a local cache (native byte order),
+not meant to be shipped.
+
+Usage:
+    python loinc_index.py [--rebuild] [--code 718-7] [--name hemoglobine] [--prefix chol]
+"""
+
+import os
+import re
+import mmap
+import time
+import zlib
+import bisect
+import struct
+import hashlib
+import argparse
+import tempfile
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional
+
+LOINC_CSV = Path("loinc_fr_context.csv")
+LOINC_INDEX = Path(os.getenv("LOINC_INDEX_PATH", ".loinc_index.bin"))
+
+# magic, CSV SHA-256, record count, hash slots, blob length
+_HEADER = struct.Struct("=8s32sIII")
+_MAGIC = b"LOINCIX2"
+_EMPTY = 0xFFFFFFFF
+
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+class LoincEntry(NamedTuple):
+    code: str
+    name: str
+    unit: str
+
+    def prompt_line(self) -> str:
+        return f"{self.code}|{self.name}|{self.unit}"
+
+
+def fold_text(text: str) -> str:
+    """Lowercase, strip accents and dots (Hémoglobine -> hemoglobine, V.G.M. -> vgm)."""
+    text = text.lower().replace('.', '')
+    if not text.isascii():
+        text = unicodedata.normalize('NFD', text)
+        text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    return text
+
+
+def normalize_loinc_name(name: str) -> str:
+    """Folded name with punctuation collapsed: "DFG (CKD-EPI)" -> "dfg ckd epi"."""
+    return _NON_WORD_RE.sub(' ', fold_text(name)).strip()
+
+
+def load_loinc_entries(path: Path = LOINC_CSV) -> List[LoincEntry]:
+    """Parse loinc_fr_context.csv (Code|Nom|Unite, header line first)."""
+    if not path.exists():
+        return []
+
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        next(f)  # Skip header
+        for line in f:
+            parts = line.strip().split('|')
+            if len(parts) >= 2:
+                entries.append(LoincEntry(parts[0], parts[1], parts[2] if len(parts) > 2 else ""))
+    return entries
+
+
+def _hash(key: str) -> int:
+    return zlib.crc32(key.encode("utf-8"))
+
+
+def _hash_table(keys: List[str], n_slots: int) -> array:
+    """Open addressing (linear probing): slot -> record index, _EMPTY if free."""
+    slots = array("I", [_EMPTY]) * n_slots
+    mask = n_slots - 1
+    for i, key in enumerate(keys):
+        slot = _hash(key) & mask
+        while slots[slot] != _EMPTY:
+            slot = (slot + 1) & mask
+        slots[slot] = i
+    return slots
+
+
+def build_index(csv_path: Path = LOINC_CSV, index_path: Path = LOINC_INDEX) -> None:
+    """Compile csv_path into index_path (atomic replace)."""
+    csv_bytes = csv_path.read_bytes()
+    entries = load_loinc_entries(csv_path)
+    names = [normalize_loinc_name(entry.name) for entry in entries]
+
+    # Records in CSV order: "code|name|unit|normalized name\n"
+    blob = bytearray()
+    offsets = array("I")
+    for entry, name in zip(entries, names):
+        offsets.append(len(blob))
+        blob += f"{entry.prompt_line()}|{name}\n".encode("utf-8")
+    offsets.append(len(blob))
+
+    n_slots = 1 << max(4, (2 * len(entries)).bit_length())  # load factor < 0.5
+    name_order = array("I", sorted(range(len(entries)), key=lambda i: (names[i], i)))
+
+    header = _HEADER.pack(_MAGIC, hashlib.sha256(csv_bytes).digest(), len(entries), n_slots, len(blob))
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=index_path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(offsets.tobytes())
+            f.write(name_order.tobytes())
+            f.write(_hash_table([entry.code for entry in entries], n_slots).tobytes())
+            f.write(_hash_table(names, n_slots).tobytes())
+            f.write(blob)
+        os.replace(tmp_name, index_path)
+    except OSError:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+class LoincIndex:
+    """Read-only view over a compiled index file; iterate for entries in CSV order."""
+
+    def __init__(self, index_path: Path = LOINC_INDEX):
+        with open(index_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.csv_sha256, self.size, n_slots, blob_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a LOINC index: {index_path}")
+
+        view = self._view = memoryview(self._mm)
+        pos = _HEADER.size
+        self._offsets = view[pos:pos + 4 * (self.size + 1)].cast("I")
+        pos += 4 * (self.size + 1)
+        self._name_order = view[pos:pos + 4 * self.size].cast("I")
+        pos += 4 * self.size
+        self._code_slots = view[pos:pos + 4 * n_slots].cast("I")
+        pos += 4 * n_slots
+        self._name_slots = view[pos:pos + 4 * n_slots].cast("I")
+        pos += 4 * n_slots
+        self._blob = view[pos:pos + blob_len]
+        self._mask = n_slots - 1
+
+    @classmethod
+    def open(cls, csv_path: Path = LOINC_CSV, index_path: Path = LOINC_INDEX) -> "LoincIndex":
+        """Open index_path, (re)building it first if missing or built from another CSV."""
+        csv_sha256 = hashlib.sha256(Path(csv_path).read_bytes()).digest()
+        try:
+            index = cls(index_path)
+            if index.csv_sha256 == csv_sha256:
+                return index
+            index.close()
+        except (OSError, ValueError, struct.error):
+            pass  # missing / truncated / old format: rebuild
+
+        print(f"Building LOINC index {index_path} from {csv_path}...")
+        build_index(Path(csv_path), Path(index_path))
+        return cls(index_path)
+
+    def close(self) -> None:
+        for view in (self._offsets, self._name_order, self._code_slots, self._name_slots, self._blob, self._view):
+            view.release()
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _fields(self, i: int) -> List[str]:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1] - 1]).decode("utf-8").split("|")
+
+    def entry(self, i: int) -> LoincEntry:
+        code, name, unit, _ = self._fields(i)
+        return LoincEntry(code, name, unit)
+
+    def normalized_name(self, i: int) -> str:
+        return self._fields(i)[3]
+
+    def _records(self) -> List[str]:
+        # One decode for the whole catalogue instead of one per record
+        return bytes(self._blob).decode("utf-8").split("\n")[:self.size]
+
+    def __iter__(self) -> Iterator[LoincEntry]:
+        for record in self._records():
+            code, name, unit, _ = record.split("|")
+            yield LoincEntry(code, name, unit)
+
+    def prompt_lines(self) -> List[str]:
+        """Every entry as "code|name|unit" (CSV order), without building LoincEntry objects."""
+        return [record.rpartition("|")[0] for record in self._records()]
+
+    def _probe(self, slots, key: str) -> Iterator[int]:
+        slot = _hash(key) & self._mask
+        while slots[slot] != _EMPTY:
+            yield slots[slot]
+            slot = (slot + 1) & self._mask
+
+    def by_code(self, code: str) -> Optional[LoincEntry]:
+        """Entry for a LOINC code (a few codes have synonym rows: first in CSV order)."""
+        for i in self._probe(self._code_slots, code):
+            entry = self.entry(i)
+            if entry.code == code:
+                return entry
+        return None
+
+    def by_name(self, name: str) -> List[LoincEntry]:
+        """All entries whose normalized name equals normalize_loinc_name(name), CSV order."""
+        key = normalize_loinc_name(name)
+        return [self.entry(i) for i in sorted(self._probe(self._name_slots, key))
+                if self.normalized_name(i) == key]
+
+    def by_prefix(self, prefix: str, limit: int = 50) -> List[LoincEntry]:
+        """Entries whose normalized name starts with the normalized prefix, by name."""
+        prefix = normalize_loinc_name(prefix)
+        ordered = _SortedNames(self)
+        start = bisect.bisect_left(ordered, prefix)
+
+        matches = []
+        for pos in range(start, min(start + limit, self.size)):
+            i = self._name_order[pos]
+            if not self.normalized_name(i).startswith(prefix):
+                break
+            matches.append(self.entry(i))
+        return matches
+
+
+class _SortedNames:
+    """Sequence view of normalized names in sorted order, for bisect."""
+
+    def __init__(self, index: LoincIndex):
+        self.index = index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, pos: int) -> str:
+        return self.index.normalized_name(self.index._name_order[pos])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build / query the compiled LOINC index")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--code")
+    parser.add_argument("--name")
+    parser.add_argument("--prefix")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        start = time.perf_counter()
+        build_index()
+        print(f"Built {LOINC_INDEX} in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    index = LoincIndex.open()
+    print(f"Loaded {len(index)} entries in {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"({LOINC_INDEX.stat().st_size // 1024} KB)")
+
+    if args.code:
+        print(index.by_code(args.code))
+    if args.name:
+        for entry in index.by_name(args.name):
+            print(entry.prompt_line())
+    if args.prefix:
+        for entry in index.by_prefix(args.prefix):
+            print(entry.prompt_line())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Local LOINC shortlist retrieval.
+
+Instead of pasting the whole loinc_fr_context.csv (~5300 entries) into the
+system prompt, index the catalogue once (BM25 over accent-folded name
+tokens) and, for each OCR text, keep only the entries that plausibly match
+one of its lines:
+- every OCR line is a query; an entry is a hit when the line covers most of
+  the entry's name (by IDF weight), so "Cholestérol HDL" needs both words
+- lines naming a known biomarker (CANONICAL_MATCHER) are expanded with the
+  NAME_TO_CANONICAL synonyms, so "Glycémie à jeun" also finds "Glucose à jeun"
+- the best few entries per line are kept, then the union is ranked by score
+  and capped at top-K
+
+Usage (quick look at what a document would inject):
+    python loinc_retrieval.py ocr_gpt_test_results/<name>_ocr.md [--top-k 120]
+"""
+
+import re
+import math
+import argparse
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ocr_gpt_quality_test import NAME_TO_CANONICAL, CANONICAL_MATCHER
+from loinc_index import LoincEntry, LoincIndex, LOINC_CSV, fold_text
+
+# Entries injected per document / kept per OCR line
+LOINC_SHORTLIST_K = 120
+LOINC_HITS_PER_LINE = 3
+# Share of an entry's name weight (IDF) the line must contain
+LOINC_MIN_COVERAGE = 0.6
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'[a-z][a-z0-9]*')
+_WORD_RE = re.compile(r'[a-z0-9]+')
+# Not "a"/"d": they are real name parts ("Vitamine A", "Vitamine D")
+_STOPWORDS = frozenset({"de", "du", "des", "la", "le", "les", "en", "et", "sur", "par", "au", "aux", "l"})
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(fold_text(text)) if t not in _STOPWORDS]
+
+
+def _build_synonym_tokens() -> Dict[str, List[str]]:
+    """canonical ID -> tokens of all its synonyms + of the ID itself (glucose_fasting -> glucose fasting)."""
+    synonyms: Dict[str, set] = {}
+    for name, canonical in NAME_TO_CANONICAL.items():
+        tokens = synonyms.setdefault(canonical, set(tokenize(canonical.replace("_", " "))))
+        tokens.update(tokenize(name))
+    return {canonical: sorted(tokens) for canonical, tokens in synonyms.items()}
+
+
+SYNONYM_TOKENS = _build_synonym_tokens()
+
+
+def expand_query(line: str) -> List[str]:
+    """Tokens of an OCR line, plus the synonyms of the biomarker it names (if any)."""
+    tokens = tokenize(line)
+    key = CANONICAL_MATCHER.match(" ".join(_WORD_RE.findall(fold_text(line))))
+    if key is not None:
+        tokens += SYNONYM_TOKENS[NAME_TO_CANONICAL[key]]
+    return tokens
+
+
+class LoincRetriever:
+    """BM25 index over LOINC names; shortlist(ocr_text) returns the entries to inject."""
+
+    def __init__(self, entries: List[LoincEntry]):
+        self.entries = entries
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}  # token -> [(entry idx, term freq)]
+        self.lengths: List[int] = []
+
+        for i, entry in enumerate(entries):
+            tokens = tokenize(entry.name)
+            self.lengths.append(len(tokens))
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                self.postings.setdefault(token, []).append((i, tf))
+
+        n = len(entries)
+        self.avg_length = sum(self.lengths) / n if n else 0.0
+        self.idf = {
+            token: math.log(1 + (n - len(post) + 0.5) / (len(post) + 0.5))
+            for token, post in self.postings.items()
+        }
+        # Total name weight per entry, for the coverage test
+        self.weight = [0.0] * n
+        for token, post in self.postings.items():
+            for i, _ in post:
+                self.weight[i] += self.idf[token]
+
+    @classmethod
+    def from_csv(cls, path: Path = LOINC_CSV) -> "LoincRetriever":
+        """Retriever over the catalogue, loaded through the compiled LOINC index."""
+        index = LoincIndex.open(path)
+        entries = list(index)
+        index.close()
+        return cls(entries)
+
+    def search(self, query: str, limit: int = LOINC_HITS_PER_LINE,
+               min_coverage: float = LOINC_MIN_COVERAGE) -> List[Tuple[float, int]]:
+        """Best (score, entry idx) for one query line, entries mostly covered by it only."""
+        scores: Dict[int, float] = {}
+        covered: Dict[int, float] = {}
+
+        for token in set(expand_query(query)):
+            post = self.postings.get(token)
+            if post is None:
+                continue
+            idf = self.idf[token]
+            for i, tf in post:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                covered[i] = covered.get(i, 0.0) + idf
+
+        hits = [(score, i) for i, score in scores.items()
+                if covered[i] >= min_coverage * self.weight[i] - 1e-9]
+        hits.sort(key=lambda hit: (-hit[0], hit[1]))
+        return hits[:limit]
+
+    def shortlist(self, ocr_text: str, top_k: int = LOINC_SHORTLIST_K) -> List[LoincEntry]:
+        """Top-K entries plausibly named in ocr_text, in catalogue order."""
+        best: Dict[int, float] = {}
+        for line in ocr_text.splitlines():
+            for score, i in self.search(line):
+                if score > best.get(i, 0.0):
+                    best[i] = score
+
+        ranked = sorted(best, key=lambda i: (-best[i], i))[:top_k]
+        return [self.entries[i] for i in sorted(ranked)]
+
+    def shortlist_context(self, ocr_text: str, top_k: int = LOINC_SHORTLIST_K) -> str:
+        """Shortlist formatted like load_loinc_context (Code|Nom|Unite per line)."""
+        return "\n".join(entry.prompt_line() for entry in self.shortlist(ocr_text, top_k))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the LOINC shortlist for an OCR text")
+    parser.add_argument("ocr_file", type=Path)
+    parser.add_argument("--top-k", type=int, default=LOINC_SHORTLIST_K)
+    args = parser.parse_args()
+
+    retriever = LoincRetriever.from_csv()
+    context = retriever.shortlist_context(args.ocr_file.read_text(encoding="utf-8"), args.top_k)
+    print(context)
+    print(f"\n{len(context.splitlines())}/{len(retriever.entries)} entries, ~{len(context) // 4} tokens")
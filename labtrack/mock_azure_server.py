@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Azure Document Intelligence and Azure OpenAI, for
+offline end-to-end load tests (concurrency, retries, caching).
+
+Implements:
+- POST {endpoint}documentintelligence/documentModels/<model>:analyze
+  -> 202 + Operation-Location; GET on it -> "running" until the job's
+  latency has elapsed, then "succeeded" with analyzeResult.content
+- POST {api_base}openai/deployments/<deployment>/chat/completions
+  -> a chat completion, or server-sent events when "stream" is set
+
+Responses replay recorded fixtures keyed by input hash. The fixture
+directories use the same layout and keys as OCR_CACHE / GPT_CACHE, so the
+caches of a live run are the recording (point the mock at .ocr_cache /
+.gpt_cache, or at a copy). Inputs without a fixture get a synthetic answer:
+the PDF's own text layer for OCR, an empty biomarker list for GPT.
+
+Latency is drawn per request from a distribution ("fixed:1",
+"uniform:0.5:2", "lognormal:<median>:<sigma>"), plus a per-page term for
+OCR. Any request can be answered 429 with a Retry-After header
+(--rate-limit-p), from a seeded RNG so runs are reproducible.
+
+Usage:
+    python mock_azure_server.py [--port 8765] [--ocr-latency lognormal:1.5:0.4] [--rate-limit-p 0.05]
+    # then, in another shell:
+    AZURE_OCR_ENDPOINT=http://127.0.0.1:8765/ AZURE_OCR_KEY=mock \\
+    AZURE_OPENAI_API_BASE=http://127.0.0.1:8765/ AZURE_OPENAI_API_KEY=mock \\
+    OCR_CACHE_MAX_MB=0 GPT_CACHE_MAX_MB=0 python ocr_gpt_quality_test.py --workers 8
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import fitz  # PyMuPDF
+from aiohttp import web
+sys.path.insert(0, '.')
+
+from result_cache import sha256_key
+from ocr_gpt_quality_test import gpt_cache_key
+
+MOCK_AZURE_PORT = int(os.getenv("MOCK_AZURE_PORT", "8765"))
+# Characters of completion text per streamed chunk (Azure sends a few tokens per event)
+STREAM_CHUNK_CHARS = 12
+
+
+class Latency:
+    """Seconds to wait, drawn from "fixed:<s>", "uniform:<min>:<max>" or "lognormal:<median>:<sigma>"."""
+
+    def __init__(self, spec: str, rng: random.Random):
+        kind, *params = spec.split(":")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.rng = rng
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if expected.get(kind) != len(self.params):
+            raise ValueError(f"Bad latency spec {spec!r} (fixed:<s>, uniform:<min>:<max>, lognormal:<median>:<sigma>)")
+
+    def draw(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        median, sigma = self.params
+        return median * self.rng.lognormvariate(0.0, sigma)
+
+
+class MockAzure:
+    """Request handlers and counters of one mock server."""
+
+    def __init__(self, ocr_fixtures: Path, gpt_fixtures: Path, ocr_latency: str, ocr_per_page_s: float,
+                 gpt_latency: str, rate_limit_p: float, retry_after_s: float, seed: int):
+        self.ocr_fixtures = ocr_fixtures
+        self.gpt_fixtures = gpt_fixtures
+        self.rng = random.Random(seed)
+        self.ocr_latency = Latency(ocr_latency, self.rng)
+        self.ocr_per_page_s = ocr_per_page_s
+        self.gpt_latency = Latency(gpt_latency, self.rng)
+        self.rate_limit_p = rate_limit_p
+        self.retry_after_s = retry_after_s
+
+        self._operations: Dict[str, Tuple[float, str]] = {}  # id -> (ready at, content)
+        self._ids = itertools.count(1)
+        self.counters = {
+            "ocr_submits": 0, "ocr_polls": 0, "ocr_fixture_hits": 0, "ocr_fixture_misses": 0,
+            "gpt_requests": 0, "gpt_streams": 0, "gpt_fixture_hits": 0, "gpt_fixture_misses": 0,
+            "rate_limited": 0, "unauthorized": 0,
+        }
+
+    # ------------------------------------------------------------
+    # Shared checks
+    # ------------------------------------------------------------
+
+    def _reject(self, request: web.Request, key_header: str) -> Optional[web.Response]:
+        """401 without a key, injected 429 + Retry-After, else None."""
+        if not request.headers.get(key_header):
+            self.counters["unauthorized"] += 1
+            return web.json_response({"error": {"code": "401", "message": "Missing key"}}, status=401)
+        if self.rate_limit_p and self.rng.random() < self.rate_limit_p:
+            self.counters["rate_limited"] += 1
+            return web.json_response({"error": {"code": "429", "message": "Rate limit (mock)"}}, status=429,
+                                     headers={"Retry-After": f"{self.retry_after_s:g}"})
+        return None
+
+    # ------------------------------------------------------------
+    # Document Intelligence
+    # ------------------------------------------------------------
+
+    def _ocr_content(self, model_id: str, api_version: str, pdf_bytes: bytes) -> Tuple[str, int]:
+        """(content, pages): recorded fixture (same key as ocr_cache_key), else the PDF's text layer."""
+        try:
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except Exception:
+            return "", 1
+        pages = len(doc)
+        fixture = self.ocr_fixtures / f"{sha256_key(model_id.encode(), api_version.encode(), pdf_bytes)}.md"
+        if fixture.exists():
+            self.counters["ocr_fixture_hits"] += 1
+            content = fixture.read_text(encoding="utf-8")
+        else:
+            self.counters["ocr_fixture_misses"] += 1
+            content = "\n".join(page.get_text() for page in doc)
+        doc.close()
+        return content, pages
+
+    async def analyze(self, request: web.Request) -> web.Response:
+        rejected = self._reject(request, "Ocp-Apim-Subscription-Key")
+        if rejected is not None:
+            return rejected
+        self.counters["ocr_submits"] += 1
+
+        model_id = request.match_info["model_id"]
+        content, pages = self._ocr_content(model_id, request.query.get("api-version", ""), await request.read())
+        operation_id = str(next(self._ids))
+        latency = self.ocr_latency.draw() + self.ocr_per_page_s * pages
+        self._operations[operation_id] = (time.monotonic() + latency, content)
+        location = f"{request.url.origin()}/documentintelligence/documentModels/{model_id}/analyzeResults/{operation_id}"
+        return web.Response(status=202, headers={"Operation-Location": location})
+
+    async def analyze_result(self, request: web.Request) -> web.Response:
+        rejected = self._reject(request, "Ocp-Apim-Subscription-Key")
+        if rejected is not None:
+            return rejected
+        self.counters["ocr_polls"] += 1
+
+        operation = self._operations.get(request.match_info["operation_id"])
+        if operation is None:
+            return web.json_response({"error": {"code": "NotFound"}}, status=404)
+        ready_at, content = operation
+        if time.monotonic() < ready_at:
+            return web.json_response({"status": "running"})
+        return web.json_response({"status": "succeeded", "analyzeResult": {"content": content}})
+
+    # ------------------------------------------------------------
+    # OpenAI chat/completions
+    # ------------------------------------------------------------
+
+    def _completion(self, deployment: str, api_version: str, payload: Dict) -> str:
+        """Completion text: recorded fixture (same key as gpt_cache_key), else no biomarker."""
+        # Streamed and plain requests share the cache key (see call_azure_gpt_stream)
+        base = {k: v for k, v in payload.items() if k not in ("stream", "stream_options")}
+        fixture = self.gpt_fixtures / f"{gpt_cache_key(deployment, api_version, base)}.json"
+        if fixture.exists():
+            self.counters["gpt_fixture_hits"] += 1
+            return fixture.read_text(encoding="utf-8")
+        self.counters["gpt_fixture_misses"] += 1
+        return json.dumps({"biomarkers": []})
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        rejected = self._reject(request, "api-key")
+        if rejected is not None:
+            return rejected
+        self.counters["gpt_requests"] += 1
+
+        payload = await request.json()
+        content = self._completion(request.match_info["deployment"], request.query.get("api-version", ""), payload)
+        prompt_chars = sum(len(m.get("content") or "") for m in payload.get("messages", []))
+        usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4,
+                 "prompt_tokens_details": {"cached_tokens": 0}}
+        latency = self.gpt_latency.draw()
+
+        if not payload.get("stream"):
+            await asyncio.sleep(latency)
+            return web.json_response({"choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                                   "finish_reason": "stop"}], "usage": usage})
+
+        self.counters["gpt_streams"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        for text in chunks:
+            await asyncio.sleep(latency / len(chunks))
+            event = {"choices": [{"index": 0, "delta": {"content": text}}]}
+            await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            await response.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.counters)
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=500 * 1024 * 1024)
+        app.router.add_post("/documentintelligence/documentModels/{model_id:[^/:]+}:analyze", self.analyze)
+        app.router.add_get("/documentintelligence/documentModels/{model_id}/analyzeResults/{operation_id}",
+                           self.analyze_result)
+        app.router.add_post("/openai/deployments/{deployment}/chat/completions", self.chat_completions)
+        app.router.add_get("/mock/stats", self.stats)
+        return app
+
+
+def main(args: argparse.Namespace):
+    mock = MockAzure(args.ocr_fixtures, args.gpt_fixtures, args.ocr_latency, args.ocr_per_page_s,
+                     args.gpt_latency, args.rate_limit_p, args.retry_after, args.seed)
+    base = f"http://{args.host}:{args.port}/"
+    print("Mock Azure OCR + OpenAI")
+    print(f"  OCR fixtures: {args.ocr_fixtures} | GPT fixtures: {args.gpt_fixtures}")
+    print(f"  OCR latency: {args.ocr_latency} + {args.ocr_per_page_s}s/page | GPT latency: {args.gpt_latency}")
+    print(f"  429 probability: {args.rate_limit_p} (Retry-After {args.retry_after:g}s)")
+    print(f"\n  export AZURE_OCR_ENDPOINT={base} AZURE_OCR_KEY=mock")
+    print(f"  export AZURE_OPENAI_API_BASE={base} AZURE_OPENAI_API_KEY=mock")
+    print(f"  Counters: {base}mock/stats\n")
+    try:
+        web.run_app(mock.app(), host=args.host, port=args.port, print=None)
+    finally:
+        print(f"\n{json.dumps(mock.counters, indent=2)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the Azure OCR / OpenAI endpoints")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=MOCK_AZURE_PORT, help="env MOCK_AZURE_PORT")
+    parser.add_argument("--ocr-fixtures", type=Path, default=Path(os.getenv("OCR_CACHE_DIR", ".ocr_cache")),
+                        help="Recorded OCR results (OCR_CACHE layout, default: the OCR cache)")
+    parser.add_argument("--gpt-fixtures", type=Path, default=Path(os.getenv("GPT_CACHE_DIR", ".gpt_cache")),
+                        help="Recorded GPT results (GPT_CACHE layout, default: the GPT cache)")
+    parser.add_argument("--ocr-latency", default="lognormal:1.0:0.3", help="Per analyze job")
+    parser.add_argument("--ocr-per-page-s", type=float, default=0.5, help="Added per PDF page")
+    parser.add_argument("--gpt-latency", default="lognormal:4.0:0.4", help="Per completion")
+    parser.add_argument("--rate-limit-p", type=float, default=0.0, help="Probability of a 429 per request")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -11,21 +11,36 @@ IMPROVED VERSION with:
 
 Usage:
     source ocr_test_venv/bin/activate
-    python ocr_gpt_quality_test.py
+    python ocr_gpt_quality_test.py [--workers N] [--prefetch-ocr]
+    python ocr_gpt_quality_test.py --evaluate-only   # re-score saved *_gpt.json, no network
 """
 
 import os
 import json
 import time
 import re
+import argparse
+import threading
+import contextvars
 import unicodedata
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, List, Any, Tuple
+from typing import Optional, Dict, List, Any, Tuple, Callable, Set
 from dotenv import load_dotenv
-import requests
 import fitz  # PyMuPDF
 
+from result_cache import DiskCache, SingleFlight, sha256_key
+from azure_ocr_async import OCRClient
+from http_client import HTTP
+from usage_ledger import LEDGER
+from text_layer import TEXT_LAYER_FAST_PATH, TEXT_LAYER_STATS, extract_page_texts, check_page_text
+from page_filter import PAGE_FILTER, PAGE_FILTER_STATS, filter_result_pages, is_section_header, section_family
+from loinc_index import fold_text
+from gpt_stream import STREAM_STATS, BiomarkerStreamParser, iter_sse_data
+from lab_profiles import LAB_PROFILES, LAB_ROUTING, TemplateProfile, fingerprint
+
 # Load environment variables from .env.local
 load_dotenv(".env.local")
 
@@ -38,6 +53,51 @@ AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o
 BLOODWORK_DIR = Path("bloodwork")
 OUTPUT_DIR = Path("ocr_gpt_test_results")
 
+AZURE_OCR_MODEL_ID = "prebuilt-read"
+AZURE_OCR_API_VERSION = "2024-11-30"
+
+# OCR results cached on disk by PDF hash (OCR_CACHE_MAX_MB=0 disables the cache)
+OCR_CACHE = DiskCache(
+    Path(os.getenv("OCR_CACHE_DIR", ".ocr_cache")),
+    max_bytes=int(os.getenv("OCR_CACHE_MAX_MB", "500")) * 1024 * 1024,
+    suffix=".md",
+)
+
+AZURE_OPENAI_API_VERSION = "2024-08-01-preview"
+
+# GPT completions cached by payload hash. Point GPT_CACHE_DIR at a shared
+# directory to reuse completions across processes/machines.
+GPT_CACHE = DiskCache(
+    Path(os.getenv("GPT_CACHE_DIR", ".gpt_cache")),
+    max_bytes=int(os.getenv("GPT_CACHE_MAX_MB", "200")) * 1024 * 1024,
+    suffix=".json",
+)
+GPT_SINGLE_FLIGHT = SingleFlight()
+
+# Async Document Intelligence client: one event loop polls every in-flight OCR job
+OCR_CLIENT = OCRClient(AZURE_OCR_ENDPOINT, AZURE_OCR_KEY, AZURE_OCR_MODEL_ID, AZURE_OCR_API_VERSION)
+
+# "whole": one OCR job per PDF (page-by-page fallback if it fails)
+# "sharded": PDF split into shards of OCR_PAGES_PER_SHARD pages, OCR'd concurrently
+OCR_MODES = ("whole", "sharded")
+OCR_MODE = os.getenv("OCR_MODE", "whole")
+# At least 1: ocr_sharded steps through the pages by this count
+OCR_PAGES_PER_SHARD = max(1, int(os.getenv("OCR_PAGES_PER_SHARD", "1")))
+
+# Number of PDFs kept in flight by run_corpus (OCR polling + GPT are I/O bound)
+DEFAULT_WORKERS = int(os.getenv("OCR_GPT_WORKERS", "4"))
+
+# "single": one completion per PDF; "sections": one completion per report section, concurrently;
+# "stream": one streamed completion per PDF, biomarkers normalized as they arrive
+GPT_MODES = ("single", "sections", "stream")
+GPT_MODE = os.getenv("GPT_MODE", "single")
+# Sections smaller than this are merged into a neighbour; at most this many completions per PDF
+GPT_SECTION_MIN_CHARS = int(os.getenv("GPT_SECTION_MIN_CHARS", "400"))
+GPT_SECTION_MAX_CHUNKS = int(os.getenv("GPT_SECTION_MAX_CHUNKS", "6"))
+
+# Parse regular result rows locally and send only the other lines to GPT
+LOCAL_ROWS = os.getenv("LOCAL_ROWS", "0") == "1"
+
 # ============================================================
 # ENHANCED GPT PROMPT - Improved for better extraction
 # ============================================================
@@ -108,6 +168,48 @@ Voici le texte OCR du bilan:
 
 {ocr_text}"""
 
+# Section-parallel mode: same system prompt (prompt cache), one focused user prompt per section
+GPT_SECTION_USER_PROMPT_TEMPLATE = """Extrait TOUS les biomarqueurs de cet extrait d'un bilan sanguin français ({sections}).
+L'extrait n'est qu'une partie du bilan: extrais uniquement ce qui y figure.
+
+RAPPEL CRITIQUE:
+- Scan multi-colonnes (gauche ET droite) jusqu'à la dernière ligne de l'extrait
+{focus}
+- IGNORER les "Antériorités" (colonnes historiques)
+
+Voici le texte OCR de l'extrait:
+
+{ocr_text}"""
+
+GPT_SECTION_FOCUS = {
+    "hematology": "- HÉMATOLOGIE: NFS complète, formule leucocytaire (valeurs absolues en G/L)",
+    "hemostasis": "- COAGULATION: TP%, INR, TCA (tables Patient/Témoin)",
+    "biochemistry": "- N'oublie pas le DFG/CKD-EPI (fonction rénale)!",
+    "electrophoresis": "- ÉLECTROPHORÈSE: Albumine, Alpha-1/2, Bêta-1/2, Gamma en g/L",
+    "serology": "- SÉROLOGIES: CMV, Toxo, Lyme, HSV, VZV, Syphilis - VALEURS NUMÉRIQUES!",
+}
+
+
+# Known lab templates (lab_profiles.py): compact system prompt + the template's column order
+GPT_TEMPLATE_SYSTEM_PROMPT = """Tu es un expert médical spécialisé dans l'extraction de données de bilans sanguins français.
+Extrais TOUS les biomarqueurs du document en JSON.
+
+- Toutes les pages, colonnes gauche et droite, jusqu'à la dernière ligne.
+- Valeurs ACTUELLES uniquement: IGNORER les "Antériorités" / valeurs précédentes.
+- Coagulation: valeur Patient (pas Témoin); TP %, INR, TCA (sec), Ratio TCA.
+- Électrophorèse: la valeur en g/L de chaque fraction (pas le %).
+- Sérologies: la VALEUR NUMÉRIQUE (Index, Titre, UI/mL...), pas Positif/Négatif.
+- Garde < et > ("<5"), retire les signes + / - de statut, "1,85" -> 1.85.
+- JSON strict: {"biomarkers": [{"biomarker_name": "...", "value": "...", "unit": "..."}]}
+"""
+
+GPT_TEMPLATE_USER_PROMPT_TEMPLATE = """Extrait TOUS les biomarqueurs de ce bilan {lab}.
+Colonnes des tableaux de résultats, dans l'ordre: {columns}
+
+Voici le texte OCR du bilan:
+
+{ocr_text}"""
+
 
 # ============================================================
 # EXCLUDED BIOMARKERS (Calculated/QC - Professionals compute these)
@@ -359,6 +461,9 @@ def normalize_unit(unit: str) -> str:
 # ============================================================
 # VALUE CLEANING WITH MODIFIER HANDLING
 # ============================================================
+_STATUS_SIGN_RE = re.compile(r'^([+\-])\s*(\d)')
+
+
 def clean_value(value: Any) -> Tuple[Optional[float], str, str]:
     """
     Clean and parse a value, extracting any modifier (< > =).
@@ -380,7 +485,7 @@ def clean_value(value: Any) -> Tuple[Optional[float], str, str]:
     # These indicate "above/below reference" not actual value modifiers
     # Example: "+ 11.68" means 11.68 is high, extract as 11.68
     # Match patterns: "+ 11.68", "+11.68", "- 41", with any amount of whitespace
-    status_match = re.match(r'^([+\-])\s*(\d)', val_str)
+    status_match = _STATUS_SIGN_RE.match(val_str)
     if status_match:
         sign = status_match.group(1)
         # For minus sign directly followed by digit (no space), it might be negative number
@@ -415,33 +520,120 @@ def clean_value(value: Any) -> Tuple[Optional[float], str, str]:
         return None, modifier, original
 
 
-def normalize_name_for_matching(name: str) -> str:
-    """Normalize a biomarker name for matching against canonical mappings."""
-    if not name:
-        return ""
-    
+_DASH_RE = re.compile(r'\s*-\s*')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Distinct names seen in a corpus run are a few thousand at most
+NAME_CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _normalize_name_cached(name: str) -> str:
     # Lowercase
     name = name.lower().strip()
     
-    # Remove accents
-    name = unicodedata.normalize('NFD', name)
-    name = ''.join(c for c in name if unicodedata.category(c) != 'Mn')
+    # Remove accents (pure ASCII has nothing to decompose)
+    if not name.isascii():
+        name = unicodedata.normalize('NFD', name)
+        name = ''.join(c for c in name if unicodedata.category(c) != 'Mn')
     
     # Remove dots (Fixes T.C.M.H -> tcmh)
     name = name.replace('.', '')
     
     # Remove dashes surrounded by spaces (Fixes "CMV - Titre des IgG" -> "CMV Titre des IgG")
-    name = re.sub(r'\s*-\s*', ' ', name)
+    name = _DASH_RE.sub(' ', name)
     
     # Remove parentheses content for matching (Fixes "Borréliose (Lyme)" -> "Borréliose Lyme")
     name = name.replace('(', ' ').replace(')', ' ')
     
     # Remove extra whitespace
-    name = re.sub(r'\s+', ' ', name).strip()
+    name = _WHITESPACE_RE.sub(' ', name).strip()
     
     return name
 
 
+def normalize_name_for_matching(name: str) -> str:
+    """
+    Normalize a biomarker name for matching against canonical mappings.
+    Memoized (bounded LRU): the same GPT / groundtruth names come back constantly.
+    """
+    if not name:
+        return ""
+    return _normalize_name_cached(name)
+
+
+def normalize_names_for_matching(names: List[str]) -> List[str]:
+    """Batch version: normalizes each DISTINCT name once, returns results in input order."""
+    unique = {name: normalize_name_for_matching(name) for name in dict.fromkeys(names)}
+    return [unique[name] for name in names]
+
+
+class CanonicalNameMatcher:
+    """
+    Precompiled fuzzy lookup over NAME_TO_CANONICAL.
+    
+    Returns exactly what scanning the keys longest-first would return:
+    - keys of 3 chars or less only match as a whole word (\\b boundaries),
+      i.e. as one token of re.findall(r'\\w+', name) -> set lookup
+    - longer keys match anywhere as substrings -> indexed by their first
+      4 characters, so each position of the name costs one dict lookup
+    The winner is the matching key with the best (longest-first) rank.
+    Rebuild it (see CANONICAL_MATCHER) if NAME_TO_CANONICAL is changed at runtime.
+    """
+    ANCHOR_LEN = 4
+    
+    def __init__(self, mapping: Dict[str, str]):
+        # Same order as the historical scan: stable sort by length, longest first
+        sorted_keys = sorted(mapping.keys(), key=len, reverse=True)
+        self.rank = {key: i for i, key in enumerate(sorted_keys)}
+        
+        self.word_keys: Dict[str, int] = {}        # short keys made of \w chars
+        self.regex_keys: List[Tuple[int, str, re.Pattern]] = []  # other short keys
+        self.anchors: Dict[str, List[str]] = {}    # key[:4] -> keys in rank order
+        
+        for key in sorted_keys:
+            if len(key) <= 3:
+                if re.fullmatch(r'\w+', key):
+                    self.word_keys[key] = self.rank[key]
+                else:
+                    pattern = re.compile(r'\b' + re.escape(key) + r'\b')
+                    self.regex_keys.append((self.rank[key], key, pattern))
+            else:
+                self.anchors.setdefault(key[:self.ANCHOR_LEN], []).append(key)
+    
+    def match(self, name_norm: str) -> Optional[str]:
+        """Return the best matching key contained in name_norm, or None."""
+        best_rank = len(self.rank)
+        best_key = None
+        
+        for token in _WORD_RE.findall(name_norm):
+            rank = self.word_keys.get(token)
+            if rank is not None and rank < best_rank:
+                best_rank, best_key = rank, token
+        
+        for rank, key, pattern in self.regex_keys:
+            if rank < best_rank and pattern.search(name_norm):
+                best_rank, best_key = rank, key
+        
+        anchors = self.anchors
+        for i in range(len(name_norm) - self.ANCHOR_LEN + 1):
+            keys = anchors.get(name_norm[i:i + self.ANCHOR_LEN])
+            if not keys:
+                continue
+            for key in keys:
+                if self.rank[key] >= best_rank:
+                    break  # keys are in rank order, nothing better at this position
+                if name_norm.startswith(key, i):
+                    best_rank, best_key = self.rank[key], key
+                    break
+        
+        return best_key
+
+
+_WORD_RE = re.compile(r'\w+')
+CANONICAL_MATCHER = CanonicalNameMatcher(NAME_TO_CANONICAL)
+
+
 def get_canonical_name(raw_name: str) -> Tuple[str, str]:
     """
     Get canonical name for a biomarker.
@@ -453,25 +645,11 @@ def get_canonical_name(raw_name: str) -> Tuple[str, str]:
     if name_norm in NAME_TO_CANONICAL:
         return NAME_TO_CANONICAL[name_norm], raw_name
     
-    # 2. Iterative Lookup (Longest keys first!)
-    # We sort keys by length descending so "calcium" matches before "ca"
-    sorted_keys = sorted(NAME_TO_CANONICAL.keys(), key=len, reverse=True)
-    
-    for key in sorted_keys:
-        canonical = NAME_TO_CANONICAL[key]
-        
-        # SAFETY: Skip short keys for fuzzy matching
-        # "ca", "na", "k", "tp" are too dangerous to search as substrings
-        if len(key) <= 3:
-            # Only match if it's a distinct word (e.g. "na " or " na" or exact "na")
-            # We use regex word boundaries \b
-            if re.search(r'\b' + re.escape(key) + r'\b', name_norm):
-                 return canonical, raw_name
-            continue
-            
-        # Normal fuzzy match for longer keys
-        if key in name_norm:
-            return canonical, raw_name
+    # 2. Fuzzy Lookup (Longest keys first!) so "calcium" matches before "ca".
+    # Short keys ("ca", "na", "k", "tp") only match as distinct words.
+    key = CANONICAL_MATCHER.match(name_norm)
+    if key is not None:
+        return NAME_TO_CANONICAL[key], raw_name
             
     # No match found
     return raw_name.lower().replace(" ", "_"), raw_name
@@ -480,101 +658,190 @@ def get_canonical_name(raw_name: str) -> Tuple[str, str]:
 # ============================================================
 # UNIT CONVERSION CALCULATOR
 # ============================================================
+# Every concentration unit belongs to a dimension and has a scale relative to
+# that dimension's base unit (g/L for mass, mol/L for molar). Keys are lowercase.
+UNIT_DIMENSIONS = {
+    # mass concentration -> g/L
+    "g/l": ("mass", 1.0), "g/dl": ("mass", 10.0),
+    "mg/l": ("mass", 1e-3), "mg/dl": ("mass", 1e-2),
+    "µg/l": ("mass", 1e-6), "ng/ml": ("mass", 1e-6), "µg/dl": ("mass", 1e-5),
+    "ng/l": ("mass", 1e-9), "pg/ml": ("mass", 1e-9), "ng/dl": ("mass", 1e-8),
+    # molar concentration -> mol/L
+    "mmol/l": ("molar", 1e-3), "µmol/l": ("molar", 1e-6),
+    "nmol/l": ("molar", 1e-9), "pmol/l": ("molar", 1e-12),
+    # HbA1c reporting systems (NGSP % vs IFCC mmol/mol) - linked explicitly below
+    "%": ("percent", 1.0), "mmol/mol": ("ifcc", 1.0),
+}
+
+UNIT_ALIASES = {
+    "umol/l": "µmol/l", "ug/l": "µg/l", "ug/dl": "µg/dl", "mcg/l": "µg/l",
+    "g/100ml": "g/dl", "mg/100ml": "mg/dl",
+}
+
+# canonical_id -> (units in preference order, molar mass in g/mol or None)
+# The first unit of another dimension is the "alternate" returned by
+# calculate_alternate_unit; every listed unit is reachable from every other.
+BIOMARKER_UNITS = {
+    # --- METABOLISM ---
+    "glucose": (["mmol/l", "g/l", "mg/dl"], 180.16),
+    "glucose_fasting": (["mmol/l", "g/l", "mg/dl"], 180.16),
+    "hba1c": (["%", "mmol/mol"], None),
+    
+    # --- LIPIDS ---
+    "cholesterol_total": (["mmol/l", "g/l", "mg/dl"], 386.65),
+    "cholesterol_hdl": (["mmol/l", "g/l", "mg/dl"], 386.65),
+    "cholesterol_ldl": (["mmol/l", "g/l", "mg/dl"], 386.65),
+    "cholesterol_non_hdl": (["mmol/l", "g/l", "mg/dl"], 386.65),
+    "triglycerides": (["mmol/l", "g/l", "mg/dl"], 885.0),
+    
+    # --- KIDNEY ---
+    "creatinine": (["µmol/l", "mg/l", "mg/dl"], 113.12),
+    "urea": (["mmol/l", "g/l"], 60.06),
+    "uric_acid": (["µmol/l", "mg/l"], 168.11),
+    
+    # --- IRON & LIVER ---
+    "iron": (["µmol/l", "mg/l", "µg/dl"], 55.845),
+    "ferritin": (["µg/l", "pmol/l", "ng/ml"], 445000.0),
+    "bilirubin_total": (["µmol/l", "mg/l", "mg/dl"], 584.66),
+    "bilirubin_direct": (["µmol/l", "mg/l", "mg/dl"], 584.66),
+    "bilirubin_indirect": (["µmol/l", "mg/l", "mg/dl"], 584.66),
+    
+    # --- PROTEINS ---
+    "total_protein": (["g/l", "g/dl"], None),
+    "albumin": (["g/l", "g/dl"], None),
+    
+    # --- VITAMINS ---
+    "vitamin_b12": (["pmol/l", "ng/l", "pg/ml"], 1355.4),
+    "folates": (["nmol/l", "µg/l", "ng/ml"], 441.4),
+    "vitamin_d": (["nmol/l", "ng/ml", "µg/l"], 400.0),
+    
+    # --- THYROID ---
+    "free_t4": (["pmol/l", "ng/dl"], 777.0),
+    "free_t3": (["pmol/l", "ng/l"], 651.0),
+    
+    # --- ELECTROLYTES ---
+    "calcium": (["mmol/l", "mg/l"], 40.08),
+    "calcium_corrected": (["mmol/l", "mg/l"], 40.08),
+    "phosphorus": (["mmol/l", "mg/l"], 30.97),
+    "magnesium": (["mmol/l", "mg/l"], 24.3),
+    
+    # --- GENERAL ---
+    "hemoglobin": (["g/dl", "g/l"], None),
+    "estradiol": (["pmol/l", "pg/ml"], 272.4),
+}
+
+# Conversions that are not a plain dimension/molar-mass relation: (from, to, factor)
+CUSTOM_UNIT_LINKS = {
+    "hba1c": [("%", "mmol/mol", 10.93)],
+}
+
+
+def canonical_unit_key(unit: str) -> str:
+    """Lowercase engine key for a unit ("µmol/L", "umol/l", "μmol/l" -> "µmol/l")."""
+    key = unit.lower().strip().replace("\u03bc", "\u00b5")  # greek mu -> micro sign
+    return UNIT_ALIASES.get(key, key)
+
+
+class UnitConversionEngine:
+    """
+    Unit conversions compiled ONCE from BIOMARKER_UNITS / CUSTOM_UNIT_LINKS.
+    
+    For each biomarker, units are graph nodes; edges come from the shared
+    dimension scales, the molar mass (mass <-> molar) and custom links.
+    Every reachable pair is pre-multiplied into one factor, so multi-hop
+    conversions (e.g. cholesterol mg/dL -> g/L) are a dict lookup at runtime.
+    """
+    
+    def __init__(self, biomarker_units: Dict, custom_links: Dict):
+        # canonical -> source unit -> [(target unit, factor)] in preference order
+        self.table: Dict[str, Dict[str, List[Tuple[str, float]]]] = {}
+        self.primary: Dict[str, Dict[str, Tuple[str, float]]] = {}
+        
+        for canonical, (units, molar_mass) in biomarker_units.items():
+            edges = {u: {} for u in units}
+            for a in units:
+                for b in units:
+                    if a != b:
+                        factor = self._direct_factor(a, b, molar_mass)
+                        if factor is not None:
+                            edges[a][b] = factor
+            for a, b, factor in custom_links.get(canonical, []):
+                edges[a][b] = factor
+                edges[b][a] = 1 / factor
+            
+            self.table[canonical] = {}
+            self.primary[canonical] = {}
+            for src in units:
+                reachable = self._reachable(src, edges)
+                ordered = [(u, reachable[u]) for u in units if u in reachable]
+                self.table[canonical][src] = ordered
+                # Prefer crossing dimensions (mass <-> molar), else any other unit
+                src_dim = UNIT_DIMENSIONS[src][0]
+                other_dim = [c for c in ordered if UNIT_DIMENSIONS[c[0]][0] != src_dim]
+                if ordered:
+                    self.primary[canonical][src] = (other_dim or ordered)[0]
+    
+    @staticmethod
+    def _direct_factor(a: str, b: str, molar_mass: Optional[float]) -> Optional[float]:
+        dim_a, scale_a = UNIT_DIMENSIONS[a]
+        dim_b, scale_b = UNIT_DIMENSIONS[b]
+        if dim_a == dim_b:
+            return scale_a / scale_b
+        if molar_mass and dim_a == "molar" and dim_b == "mass":
+            return scale_a * molar_mass / scale_b
+        if molar_mass and dim_a == "mass" and dim_b == "molar":
+            return scale_a / molar_mass / scale_b
+        return None
+    
+    @staticmethod
+    def _reachable(src: str, edges: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """Breadth-first walk from src, multiplying factors along the path."""
+        factors = {src: 1.0}
+        queue = [src]
+        while queue:
+            unit = queue.pop(0)
+            for nxt, factor in edges[unit].items():
+                if nxt not in factors:
+                    factors[nxt] = factors[unit] * factor
+                    queue.append(nxt)
+        del factors[src]
+        return factors
+    
+    def conversions(self, canonical: str, unit: str) -> List[Tuple[str, float]]:
+        """All (target_unit, factor) pairs for a value of `canonical` in `unit`."""
+        if not unit:
+            return []
+        return self.table.get(canonical, {}).get(canonical_unit_key(unit), [])
+    
+    def primary_conversion(self, canonical: str, unit: str) -> Optional[Tuple[str, float]]:
+        if not unit:
+            return None
+        return self.primary.get(canonical, {}).get(canonical_unit_key(unit))
+    
+    def convert(self, value: float, canonical: str, from_unit: str, to_unit: str) -> Optional[float]:
+        """Convert value between any two units registered for canonical (None if impossible)."""
+        target = canonical_unit_key(to_unit)
+        if canonical_unit_key(from_unit) == target:
+            return value
+        for unit, factor in self.conversions(canonical, from_unit):
+            if unit == target:
+                return value * factor
+        return None
+
+
+UNIT_ENGINE = UnitConversionEngine(BIOMARKER_UNITS, CUSTOM_UNIT_LINKS)
+
+
 def calculate_alternate_unit(value: float, biomarker_canonical: str, current_unit: str) -> Optional[Tuple[float, str]]:
     """
     Calculate the alternate unit value for a biomarker using universal factors.
     Returns (converted_value, new_unit) or None.
     """
-    if not current_unit:
+    conversion = UNIT_ENGINE.primary_conversion(biomarker_canonical, current_unit)
+    if conversion is None:
         return None
-        
-    # Force lowercase for dictionary lookup (fixes mmol/L vs mmol/l mismatch)
-    unit_lower = current_unit.lower().strip()
-    
-    # COMPREHENSIVE CONVERSION TABLE (Keys must be LOWERCASE)
-    CONVERSIONS = {
-        # --- METABOLISM ---
-        "glucose": {"mmol/l": ("g/l", 0.18), "g/l": ("mmol/l", 5.56)},
-        "glucose_fasting": {"mmol/l": ("g/l", 0.18), "g/l": ("mmol/l", 5.56)},
-        "hba1c": {"mmol/mol": ("%", 0.0915), "%": ("mmol/mol", 10.93)}, 
-
-        # --- LIPIDS ---
-        "cholesterol_total": {"mmol/l": ("g/l", 0.387), "g/l": ("mmol/l", 2.586), "mg/dl": ("mmol/l", 0.0259)},
-        "cholesterol_hdl": {"mmol/l": ("g/l", 0.387), "g/l": ("mmol/l", 2.586), "mg/dl": ("mmol/l", 0.0259)},
-        "cholesterol_ldl": {"mmol/l": ("g/l", 0.387), "g/l": ("mmol/l", 2.586), "mg/dl": ("mmol/l", 0.0259)},
-        "cholesterol_non_hdl": {"mmol/l": ("g/l", 0.387), "g/l": ("mmol/l", 2.586), "mg/dl": ("mmol/l", 0.0259)},
-        "triglycerides": {"mmol/l": ("g/l", 0.885), "g/l": ("mmol/l", 1.13), "mg/dl": ("mmol/l", 0.0113)},
-
-        # --- KIDNEY ---
-        "creatinine": {"µmol/l": ("mg/l", 0.113), "mg/l": ("µmol/l", 8.84)},
-        "urea": {"mmol/l": ("g/l", 0.06), "g/l": ("mmol/l", 16.67)},
-        "uric_acid": {"µmol/l": ("mg/l", 0.168), "mg/l": ("µmol/l", 5.95)},
-
-        # --- IRON & LIVER ---
-        "iron": {"µmol/l": ("mg/l", 0.0558), "mg/l": ("µmol/l", 17.92)},
-        "ferritin": {
-            "µg/l": ("pmol/l", 2.247), "ng/ml": ("pmol/l", 2.247),
-            "pmol/l": ("µg/l", 0.445)
-        },
-        "bilirubin_total": {"µmol/l": ("mg/l", 0.585), "mg/l": ("µmol/l", 1.71)},
-        "bilirubin_direct": {"µmol/l": ("mg/l", 0.585), "mg/l": ("µmol/l", 1.71)},
-        "bilirubin_indirect": {"µmol/l": ("mg/l", 0.585), "mg/l": ("µmol/l", 1.71)},
-
-        # --- PROTEINS ---
-        "total_protein": {"g/l": ("g/dl", 0.1), "g/dl": ("g/l", 10)},
-        "albumin": {"g/l": ("g/dl", 0.1), "g/dl": ("g/l", 10)},
-
-        # --- VITAMINS ---
-        # Each entry can now be a list of possible conversions to try
-        "vitamin_b12": {
-            "pmol/l": [("ng/l", 1.355), ("pg/ml", 1.355)],  # Try both conversions
-            "ng/l": [("pmol/l", 0.738)],
-            "pg/ml": [("pmol/l", 0.738)]
-        },
-        "folates": {
-            "nmol/l": [("µg/l", 0.441), ("ng/ml", 0.441)],
-            "µg/l": [("nmol/l", 2.27)],
-            "ng/ml": [("nmol/l", 2.27)]
-        },
-        "vitamin_d": {
-            "nmol/l": [("ng/ml", 0.4), ("µg/l", 0.4)],
-            "ng/ml": [("nmol/l", 2.5)],
-            "µg/l": [("nmol/l", 2.5)]
-        },
-
-        # --- THYROID ---
-        "free_t4": {"pmol/l": ("ng/dl", 0.0777), "ng/dl": ("pmol/l", 12.87)},
-        "free_t3": {
-            "pmol/l": ("ng/l", 0.651),
-            "ng/l": ("pmol/l", 1.536)
-        },
-
-        # --- ELECTROLYTES ---
-        "calcium": {"mmol/l": ("mg/l", 40.08), "mg/l": ("mmol/l", 0.02495)},
-        "calcium_corrected": {"mmol/l": ("mg/l", 40.08), "mg/l": ("mmol/l", 0.02495)},
-        "phosphorus": {"mmol/l": ("mg/l", 30.97), "mg/l": ("mmol/l", 0.0323)},
-        "magnesium": {"mmol/l": ("mg/l", 24.3), "mg/l": ("mmol/l", 0.0411)},
-        
-        # --- GENERAL ---
-        "hemoglobin": {"g/dl": ("g/l", 10), "g/l": ("g/dl", 0.1)},
-        "estradiol": {"pmol/l": ("pg/ml", 0.272), "pg/ml": ("pmol/l", 3.67)}
-    }
-    
-    if biomarker_canonical in CONVERSIONS:
-        conversions = CONVERSIONS[biomarker_canonical]
-        if unit_lower in conversions:
-            conv_data = conversions[unit_lower]
-            # Handle both old tuple format and new list format
-            if isinstance(conv_data, list):
-                # New format: list of (new_unit, factor) tuples - return first one
-                # The evaluation logic will try multiple times if needed
-                new_unit, factor = conv_data[0]
-            else:
-                # Old format: single (new_unit, factor) tuple
-                new_unit, factor = conv_data
-            return round(value * factor, 2), new_unit
-    
-    return None
+    new_unit, factor = conversion
+    return round(value * factor, 2), new_unit
 
 
 def calculate_all_alternate_units(value: float, biomarker_canonical: str, unit: str) -> list:
@@ -582,38 +849,8 @@ def calculate_all_alternate_units(value: float, biomarker_canonical: str, unit:
     Calculate ALL possible unit conversions for a biomarker value.
     Returns a list of (converted_value, converted_unit) tuples.
     """
-    unit_lower = unit.lower().strip()
-    results = []
-    
-    CONVERSIONS = {
-        # Vitamins with multiple possible units
-        "vitamin_b12": {
-            "pmol/l": [("ng/l", 1.355), ("pg/ml", 1.355)],
-            "ng/l": [("pmol/l", 0.738)],
-            "pg/ml": [("pmol/l", 0.738)]
-        },
-        "folates": {
-            "nmol/l": [("µg/l", 0.441), ("ng/ml", 0.441)],
-            "µg/l": [("nmol/l", 2.27)],
-            "ng/ml": [("nmol/l", 2.27)]
-        },
-        "vitamin_d": {
-            "nmol/l": [("ng/ml", 0.4), ("µg/l", 0.4)],
-            "ng/ml": [("nmol/l", 2.5)],
-            "µg/l": [("nmol/l", 2.5)]
-        },
-        # Bilirubin
-        "bilirubin_total": {"µmol/l": [("mg/l", 0.585)], "mg/l": [("µmol/l", 1.71)]},
-        "bilirubin_direct": {"µmol/l": [("mg/l", 0.585)], "mg/l": [("µmol/l", 1.71)]},
-    }
-    
-    if biomarker_canonical in CONVERSIONS:
-        conversions = CONVERSIONS[biomarker_canonical]
-        if unit_lower in conversions:
-            for new_unit, factor in conversions[unit_lower]:
-                results.append((round(value * factor, 2), new_unit))
-    
-    return results
+    return [(round(value * factor, 2), new_unit)
+            for new_unit, factor in UNIT_ENGINE.conversions(biomarker_canonical, unit)]
 
 
 # ============================================================
@@ -643,53 +880,346 @@ def get_pdf_page_count(pdf_path: Path) -> int:
     return count
 
 
+def get_pdf_bytes_page_count(pdf_bytes: bytes) -> int:
+    """Get the number of pages in an in-memory PDF (0 if unreadable)."""
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception:
+        return 0
+    count = len(doc)
+    doc.close()
+    return count
+
+
+def record_ocr_job(client: OCRClient, pdf_bytes: bytes, ocr_text: Optional[str], job: Dict,
+                   pdf: Optional[str] = None) -> None:
+    """Write one OCR job (filled in by OCRClient) to the usage ledger."""
+    LEDGER.record_ocr(
+        client.model_id, get_pdf_bytes_page_count(pdf_bytes), len(pdf_bytes), len(ocr_text or ""),
+        job.get("latency_s", 0.0), job.get("retries", 0), job.get("polls", 0),
+        "ok" if ocr_text is not None else "error", pdf=pdf,
+    )
+
+
+def ocr_with_ledger(client: OCRClient, pdf_bytes: bytes, max_retries: int = 3) -> Optional[str]:
+    """client.ocr() + one usage ledger record."""
+    job = {}
+    ocr_text = client.ocr(pdf_bytes, max_retries, job)
+    record_ocr_job(client, pdf_bytes, ocr_text, job)
+    return ocr_text
+
+
 def call_azure_ocr(pdf_bytes: bytes, max_retries: int = 3) -> Optional[str]:
-    """Call Azure Document Intelligence to OCR a PDF."""
-    analyze_url = f"{AZURE_OCR_ENDPOINT}documentintelligence/documentModels/prebuilt-read:analyze?api-version=2024-11-30"
+    """Call Azure Document Intelligence to OCR a PDF (shared async client, adaptive polling)."""
+    return ocr_with_ledger(OCR_CLIENT, pdf_bytes, max_retries)
+
+
+def ocr_cache_key(pdf_bytes: bytes) -> str:
+    """Cache key for an OCR result: SHA-256 of the PDF bytes + model + API version."""
+    return sha256_key(AZURE_OCR_MODEL_ID.encode(), AZURE_OCR_API_VERSION.encode(), pdf_bytes)
+
+
+def cached_ocr(pdf_bytes: bytes, ocr_fn: Callable[[bytes], Optional[str]] = None) -> Optional[str]:
+    """
+    Return OCR text for pdf_bytes, from OCR_CACHE if possible.
+    Falls back to ocr_fn (call_azure_ocr by default) and caches non-empty results.
+    """
+    key = ocr_cache_key(pdf_bytes)
+    cached = OCR_CACHE.get(key)
+    if cached is not None:
+        print("    OCR cache hit")
+        return cached
     
-    headers = {
-        "Ocp-Apim-Subscription-Key": AZURE_OCR_KEY,
-        "Content-Type": "application/pdf"
-    }
+    ocr_text = (ocr_fn or call_azure_ocr)(pdf_bytes)
+    if ocr_text:
+        OCR_CACHE.put(key, ocr_text)
+    return ocr_text
+
+
+def has_usable_text_layer(pdf_path: Path) -> bool:
+    """True if text_layer_pages() will read at least one page locally (no whole-document OCR)."""
+    return any(check_page_text(page)[0] for page in extract_page_texts(pdf_path))
+
+
+def prefetch_ocr(pdf_names: List[str], text_layer: bool = TEXT_LAYER_FAST_PATH) -> None:
+    """
+    OCR every uncached PDF concurrently on the OCR client loop and fill OCR_CACHE,
+    so the per-PDF pipeline then only waits on GPT.
+    With text_layer, PDFs the text layer fast path reads are skipped: they only
+    send their failing pages to OCR, never the whole document.
+    """
+    if not OCR_CACHE.enabled:
+        print("[PREFETCH] OCR cache disabled, nothing to prefetch into")
+        return
     
-    for retry in range(max_retries):
-        response = requests.post(analyze_url, headers=headers, data=pdf_bytes)
-        
-        if response.status_code == 429:
-            wait_time = 15 * (retry + 1)
-            print(f"    [RATE LIMIT] Waiting {wait_time}s before retry {retry + 1}/{max_retries}...")
-            time.sleep(wait_time)
+    if text_layer:
+        scanned = [pdf_name for pdf_name in pdf_names if not has_usable_text_layer(BLOODWORK_DIR / pdf_name)]
+        if len(scanned) < len(pdf_names):
+            print(f"\n[PREFETCH] Skipping {len(pdf_names) - len(scanned)} PDF(s) read from their text layer")
+        pdf_names = scanned
+    
+    pending = []
+    for pdf_name in pdf_names:
+        pdf_bytes = (BLOODWORK_DIR / pdf_name).read_bytes()
+        key = ocr_cache_key(pdf_bytes)
+        if OCR_CACHE.get(key) is None:
+            pending.append((pdf_name, key, pdf_bytes))
+    if not pending:
+        print("\n[PREFETCH] Nothing to OCR")
+        return
+    
+    print(f"\n[PREFETCH] OCR {len(pending)} uncached PDF(s) concurrently...")
+    start = time.time()
+    jobs = [{} for _ in pending]
+    texts = OCR_CLIENT.ocr_many([pdf_bytes for _, _, pdf_bytes in pending], jobs=jobs)
+    for (pdf_name, key, pdf_bytes), ocr_text, job in zip(pending, texts, jobs):
+        record_ocr_job(OCR_CLIENT, pdf_bytes, ocr_text, job, pdf=pdf_name)
+        if ocr_text:
+            OCR_CACHE.put(key, ocr_text)
+    print(f"[PREFETCH] {sum(1 for t in texts if t)}/{len(pending)} done in {time.time() - start:.1f}s")
+
+
+def ocr_shard_cache_key(pdf_bytes: bytes, start_page: int, num_pages: int) -> str:
+    """Cache key for the OCR text of pages [start_page, start_page + num_pages) of a PDF."""
+    return sha256_key(AZURE_OCR_MODEL_ID.encode(), AZURE_OCR_API_VERSION.encode(),
+                      f"pages {start_page}+{num_pages}".encode(), pdf_bytes)
+
+
+def ocr_failed_marker(start_page: int, num_pages: int) -> str:
+    """Stand-in text for a shard whose OCR failed, so the other pages are still used."""
+    pages = f"page {start_page + 1}" if num_pages <= 1 else f"pages {start_page + 1}-{start_page + num_pages}"
+    return f"[OCR FAILED: {pages}]"
+
+
+def ocr_page_shards(pdf_path: Path, pdf_bytes: bytes, shards: List[Tuple[int, int]],
+                    use_cache: bool = True) -> Optional[Dict[int, str]]:
+    """
+    OCR page ranges (start_page, num_pages) of a PDF concurrently on the OCR client
+    loop, one extract_pages_as_pdf job per shard. Shards are cached individually.
+    Returns {start_page: text}; a failed shard's text is an "[OCR FAILED: ...]"
+    marker. None only if every shard fails.
+    """
+    texts = {}
+    pending = []
+    for start_page, num_pages in shards:
+        key = ocr_shard_cache_key(pdf_bytes, start_page, num_pages)
+        cached = OCR_CACHE.get(key) if use_cache else None
+        if cached is not None:
+            texts[start_page] = cached
+        else:
+            pending.append((start_page, key, extract_pages_as_pdf(pdf_path, start_page, num_pages)))
+    
+    if not pending:
+        print(f"    OCR cache hit ({len(texts)} shards)")
+        return texts
+    
+    jobs = [{} for _ in pending]
+    results = OCR_CLIENT.ocr_many([shard for _, _, shard in pending], jobs=jobs)
+    failed = []
+    for (start_page, key, shard), ocr_text, job in zip(pending, results, jobs):
+        record_ocr_job(OCR_CLIENT, shard, ocr_text, job)
+        if ocr_text is None:
+            failed.append(start_page + 1)
+            # The shard PDF holds the real page count (the last shard can be short)
+            texts[start_page] = ocr_failed_marker(start_page, get_pdf_bytes_page_count(shard))
             continue
-        
-        if response.status_code != 202:
-            print(f"    [ERROR] OCR submission failed: {response.status_code}")
-            print(f"    [ERROR DETAILS] {response.text[:500]}")
-            if response.status_code == 403:
-                print("    [HINT] 403 = Access Denied. Check: API key, endpoint URL, or quota exceeded")
-            elif response.status_code == 429:
-                print("    [HINT] 429 = Rate limit. Consider adding delays between requests")
+        texts[start_page] = ocr_text
+        if ocr_text and use_cache:
+            OCR_CACHE.put(key, ocr_text)
+    
+    if failed:
+        print(f"    [ERROR] OCR failed for shard(s) starting at page {', '.join(map(str, failed))}")
+        if len(failed) == len(shards):
             return None
-        
-        operation_url = response.headers.get("Operation-Location")
-        if not operation_url:
+    return texts
+
+
+def join_pages(page_texts: List[str], page_filter: bool = False) -> str:
+    """Stitch page (or shard) texts in order, without non-result pages (page_filter.py) if page_filter."""
+    if page_filter:
+        page_texts = filter_result_pages(page_texts)
+    return "\n".join(page_texts)
+
+
+def ocr_sharded(pdf_path: Path, pages_per_shard: int = OCR_PAGES_PER_SHARD,
+                use_cache: bool = True, page_filter: bool = False) -> Optional[str]:
+    """
+    OCR a PDF as page shards submitted concurrently, and stitch the text back
+    together in page order. Failed shards are kept as "[OCR FAILED: ...]"
+    markers; None only if every shard fails.
+    """
+    total_pages = get_pdf_page_count(pdf_path)
+    shards = [(start_page, pages_per_shard) for start_page in range(0, total_pages, pages_per_shard)]
+    
+    texts = ocr_page_shards(pdf_path, pdf_path.read_bytes(), shards, use_cache)
+    if texts is None:
+        return None
+    return join_pages([texts[start_page] for start_page in sorted(texts)], page_filter)
+
+
+def text_layer_pages(pdf_path: Path) -> Optional[List[str]]:
+    """
+    Text of every page of a PDF, read from its own text layer (text_layer.py),
+    with Azure OCR only for the pages that fail the quality check.
+    Returns None if no page has a usable text layer (scanned PDF) or OCR fails
+    for every page sent to it.
+    """
+    start = time.time()
+    pages = extract_page_texts(pdf_path)
+    ocr_pages = [i for i, page in enumerate(pages) if not check_page_text(page)[0]]
+    local_s = time.time() - start
+    
+    if len(ocr_pages) == len(pages):
+        TEXT_LAYER_STATS.add(len(pages), 0, local_s)
+        return None
+    
+    texts = {i: page.text for i, page in enumerate(pages)}
+    if ocr_pages:
+        print(f"    Text layer: {len(pages) - len(ocr_pages)}/{len(pages)} pages, "
+              f"OCR for page(s) {', '.join(str(i + 1) for i in ocr_pages)}...")
+        ocr_texts = ocr_page_shards(pdf_path, pdf_path.read_bytes(), [(i, 1) for i in ocr_pages])
+        if ocr_texts is None:
+            TEXT_LAYER_STATS.add(len(pages), 0, local_s)
             return None
+        texts.update(ocr_texts)
+    else:
+        print(f"    Text layer: all {len(pages)} pages, OCR skipped")
+    
+    TEXT_LAYER_STATS.add(len(pages), len(pages) - len(ocr_pages), local_s)
+    return [texts[i] for i in range(len(pages))]
+
+
+# ============================================================
+# OCR COMPACTION - fewer prompt tokens, same results
+# ============================================================
+# Opt-in (OCR_COMPACTION=1) until an A/B run on the corpus shows no recall loss
+# against the plain preprocessing (see quality_results.json)
+OCR_COMPACTION = os.getenv("OCR_COMPACTION", "0") == "1"
+
+_DOT_RUN_RE = re.compile(r'\.{3,}')
+_ANTERIORITY_RE = re.compile(r'ant[ée]riorit[ée]s?', re.IGNORECASE)
+_DATE = r'\d{1,2}/\d{1,2}/\d{2,4}'
+_DATE_ONLY_RE = re.compile(rf'^(?:du |le )?{_DATE}\s*:?$', re.IGNORECASE)
+# Historical cell inside a result line: "12/03/23 : 14,2" / "(12/03/2023) <5"
+_DATED_VALUE_RE = re.compile(rf'\s*\(?{_DATE}\)?\s*:?\s*[<>]?\s*\d+(?:[.,]\d+)?')
+_BARE_VALUE_RE = re.compile(r'^[<>]?\s*\d+(?:[.,]\d+)?\s*%?$')
+_DIGIT_RE = re.compile(r'\d')
+_UNIT_ONLY_RE = re.compile(
+    r'(?:^|[\s(])(?:g/dl|g/l|mg/l|mg/dl|[µu]g/l|ng/ml|ng/l|pg/ml|pg|fl|[mµunp]mol/l|m?ui/l|[µu]ui/ml|'
+    r'u/l|ui/ml|giga/l|tera/l|t/l|/mm3|ml/min|%)(?:$|[\s)])'
+)
+_QUALITATIVE_WORDS = frozenset({
+    "negatif", "negative", "positif", "positive", "absence", "absent", "absents", "presence",
+    "douteux", "equivoque", "immunise", "immunisee", "indetectable", "traces", "rares", "nombreux",
+})
+# Patient / prescriber banners, page footers, lab addresses and accreditation lines
+_BOILERPLATE_RE = re.compile(
+    r'^(?:page \d+ ?(?:/|sur) ?\d+|patient\s*:|n[ée]e? le\b|dossier\b|prescripteur|prescrit|'
+    r'pr[ée]lev[ée]|[ée]dit[ée] le|imprim[ée]|re[çc]u le|valid[ée] |docteur |dr\.? |'
+    r'(?:mme|mlle|mr|m\.|monsieur|madame) [A-Z]|t[ée]l[ .:]|fax\b|www\.|siret|finess|cofrac|accr[ée]dit)'
+    r'|^\d+,? (?:bis |ter )?(?:rue|avenue|av\.|boulevard|bd|place|chemin|all[ée]e|route|quai|cours) '
+    r'|\b\d{5} [A-ZÀ-Ý][A-ZÀ-Ý\' -]+(?: cedex)?$',
+    re.IGNORECASE,
+)
+# Page number footer / header ("Page 2/3", "page 2 sur 3"): marks a page edge
+_PAGE_NUMBER_RE = re.compile(r'^page \d+ ?(?:/|sur) ?\d+$', re.IGNORECASE)
+# A repeated line this long, within this many lines of a page edge, is a page header / footer
+_DEDUPE_MIN_CHARS = 15
+_PAGE_EDGE_LINES = 6
+# Lines longer than this are prose, not a biomarker label
+_LABEL_MAX_WORDS = 8
+
+
+def is_value_line(line: str) -> bool:
+    """Line that holds (part of) a result: a number, a unit or a qualitative result."""
+    if _DIGIT_RE.search(line):
+        return True
+    folded = fold_text(line)
+    return bool(_UNIT_ONLY_RE.search(folded)) or not _QUALITATIVE_WORDS.isdisjoint(_WORD_RE.findall(folded))
+
+
+def is_biomarker_label(line: str) -> bool:
+    return (len(line.split()) <= _LABEL_MAX_WORDS
+            and CANONICAL_MATCHER.match(normalize_name_for_matching(line)) is not None)
+
+
+def is_anteriority_header(line: str, anteriority: re.Match) -> bool:
+    """"Antériorités" column header, as opposed to an inline "Antériorité du 12/01/23 : 41,0" cell."""
+    return not _DIGIT_RE.search(re.sub(_DATE, '', line[anteriority.end():]))
+
+
+def is_result_line(line: str) -> bool:
+    """Line a page header never is: a result, a section title or a biomarker name."""
+    return is_value_line(line) or is_section_header(line) or is_biomarker_label(line)
+
+
+def page_edge_lines(lines: List[str]) -> Set[int]:
+    """
+    Indexes of the lines near a page edge: the start and end of the text and
+    both sides of every page number line (pages are stitched with a plain
+    newline, the page numbers are the only boundaries left in the text).
+    """
+    edges = [-1, len(lines)] + [i for i, line in enumerate(lines) if _PAGE_NUMBER_RE.match(line)]
+    near = set()
+    for edge in edges:
+        near.update(range(max(0, edge - _PAGE_EDGE_LINES), min(len(lines), edge + _PAGE_EDGE_LINES + 1)))
+    return near
+
+
+def compact_ocr_text(text: str) -> str:
+    """
+    Drop what never holds a current result before the text reaches GPT:
+    - "Antériorités" columns: the header, the dated / bare values listed
+      under it, and dated historical cells inside result lines
+    - patient banners, page footers, lab addresses (_BOILERPLATE_RE)
+    - repeated per-page headers: lines seen near a page edge that come back
+      near a later one; results, section titles and biomarker names are never
+      deduplicated (serum and urine "Protéines totales" both stay)
+    - lines with no digit, unit or qualitative result, unless they are a
+      section title, a known biomarker name, or the label of the value
+      on the next line (split table cells)
+    Blank lines and dot runs are removed too.
+    """
+    lines = [_DOT_RUN_RE.sub(' ', line).strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    
+    edge_lines = page_edge_lines(lines)
+    candidates = []
+    seen = set()
+    in_history = False
+    for index, line in enumerate(lines):
+        anteriority = _ANTERIORITY_RE.search(line)
+        if anteriority:
+            # Only a column header opens the history values listed under it
+            in_history = is_anteriority_header(line, anteriority)
+            line = line[:anteriority.start()].rstrip(" :-|")
+            if not line:
+                continue
+        elif in_history:
+            # A dated cell ("12/03/23 : 4,90") is empty once stripped, and still history
+            undated = _DATED_VALUE_RE.sub('', line).strip()
+            if not undated or _DATE_ONLY_RE.match(line) or _BARE_VALUE_RE.match(undated):
+                continue
+            in_history = False
         
-        poll_headers = {"Ocp-Apim-Subscription-Key": AZURE_OCR_KEY}
-        
-        for _ in range(120):
-            time.sleep(1)
-            poll_response = requests.get(operation_url, headers=poll_headers)
-            result = poll_response.json()
-            
-            status = result.get("status")
-            if status == "succeeded":
-                return result.get("analyzeResult", {}).get("content", "")
-            elif status == "failed":
-                return None
+        line = _DATED_VALUE_RE.sub('', line).strip()
+        if not line or _DATE_ONLY_RE.match(line) or _BOILERPLATE_RE.search(line):
+            continue
         
-        return None
+        key = " ".join(line.lower().split())
+        if len(key) >= _DEDUPE_MIN_CHARS and index in edge_lines and not is_result_line(line):
+            if key in seen:
+                continue
+            seen.add(key)
+        candidates.append(line)
     
-    return None
+    # Second pass: "next line" means the next line that survived the first one
+    kept = []
+    for i, line in enumerate(candidates):
+        if is_result_line(line) or (i + 1 < len(candidates) and is_value_line(candidates[i + 1])):
+            kept.append(line)
+    
+    return "\n".join(kept)
 
 
 def preprocess_ocr_text(text: str) -> str:
@@ -697,6 +1227,9 @@ def preprocess_ocr_text(text: str) -> str:
     Preprocess OCR text before sending to GPT.
     Cleans up common issues that confuse the model.
     """
+    if OCR_COMPACTION:
+        return compact_ocr_text(text)
+    
     # Remove excessive dots (often used as separators in tables)
     text = re.sub(r'\.{3,}', ' ', text)
     
@@ -711,64 +1244,494 @@ def preprocess_ocr_text(text: str) -> str:
     return text
 
 
-def call_azure_gpt(ocr_text: str, max_retries: int = 3) -> Optional[Dict]:
-    """Call Azure OpenAI GPT-4o-mini to parse biomarkers from OCR text."""
-    url = f"{AZURE_OPENAI_API_BASE}openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version=2024-08-01-preview"
+def gpt_cache_key(deployment: str, api_version: str, payload: Dict) -> str:
+    """Cache key for a chat completion: deployment + API version + full payload."""
+    payload_json = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return sha256_key(deployment.encode(), api_version.encode(), payload_json.encode("utf-8"))
+
+
+def cached_gpt(deployment: str, api_version: str, payload: Dict,
+               request_fn: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+    """
+    Return the parsed GPT result for payload, from GPT_CACHE if possible.
+    Concurrent identical requests are coalesced so only one of them calls request_fn.
+    Only successful (parsed) results are cached.
+    """
+    key = gpt_cache_key(deployment, api_version, payload)
     
-    headers = {
+    def load() -> Optional[Dict]:
+        cached = GPT_CACHE.get(key)
+        if cached is not None:
+            print("    GPT cache hit")
+            return json.loads(cached)
+        
+        result = request_fn()
+        if result is not None:
+            GPT_CACHE.put(key, json.dumps(result, ensure_ascii=False))
+        return result
+    
+    return GPT_SINGLE_FLIGHT.do(key, load)
+
+
+def gpt_chat_url() -> str:
+    return f"{AZURE_OPENAI_API_BASE}openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}"
+
+
+def gpt_headers() -> Dict[str, str]:
+    return {
         "api-key": AZURE_OPENAI_API_KEY,
         "Content-Type": "application/json"
     }
+
+
+def build_gpt_payload(ocr_text: str, user_prompt: Optional[str] = None,
+                      system_prompt: Optional[str] = None) -> Dict:
+    """chat/completions payload for ocr_text (user_prompt / system_prompt replace the standard prompts)."""
+    if user_prompt is None:
+        # Preprocess the OCR text
+        processed_text = preprocess_ocr_text(ocr_text)
+        user_prompt = GPT_USER_PROMPT_TEMPLATE.format(ocr_text=processed_text)
     
-    # Preprocess the OCR text
-    processed_text = preprocess_ocr_text(ocr_text)
-    
-    payload = {
+    return {
         "messages": [
-            {"role": "system", "content": GPT_SYSTEM_PROMPT},
-            {"role": "user", "content": GPT_USER_PROMPT_TEMPLATE.format(ocr_text=processed_text)}
+            {"role": "system", "content": system_prompt or GPT_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
         ],
         # Note: temperature removed for gpt-5-mini compatibility (only default 1 supported)
         "response_format": {"type": "json_object"}
     }
+
+
+def call_azure_gpt(ocr_text: str, max_retries: int = 3, user_prompt: Optional[str] = None,
+                   label: str = "extract", system_prompt: Optional[str] = None) -> Optional[Dict]:
+    """
+    Call Azure OpenAI GPT-4o-mini to parse biomarkers from OCR text.
+    user_prompt / system_prompt replace the standard prompts (label tags the ledger record).
+    """
+    url = gpt_chat_url()
+    headers = gpt_headers()
+    payload = build_gpt_payload(ocr_text, user_prompt, system_prompt)
     
-    for retry in range(max_retries):
+    def request() -> Optional[Dict]:
+        start = time.time()
+        result, status, retries = None, "error", 0
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=120)
+            for retry in range(max_retries):
+                retries = retry
+                try:
+                    response = HTTP.post(url, headers=headers, json=payload)
+                    
+                    if response.status_code == 429:
+                        status = "rate_limited"
+                        wait_time = 10 * (retry + 1)
+                        print(f"    [GPT RATE LIMIT] Waiting {wait_time}s...")
+                        time.sleep(wait_time)
+                        continue
+                    
+                    if response.status_code != 200:
+                        status = f"http_{response.status_code}"
+                        print(f"    [GPT ERROR] {response.status_code}: {response.text[:200]}")
+                        return None
+                    
+                    result = response.json()
+                    content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                    
+                    parsed = json.loads(content.strip())
+                    status = "ok"
+                    return parsed
+                    
+                except json.JSONDecodeError as e:
+                    status = "bad_json"
+                    print(f"    [GPT JSON ERROR] {e}")
+                    return None
+                except Exception as e:
+                    status = "error"
+                    print(f"    [GPT ERROR] {e}")
+                    if retry < max_retries - 1:
+                        time.sleep(5)
             
-            if response.status_code == 429:
-                wait_time = 10 * (retry + 1)
-                print(f"    [GPT RATE LIMIT] Waiting {wait_time}s...")
-                time.sleep(wait_time)
-                continue
+            return None
+        finally:
+            LEDGER.record_gpt(label, AZURE_OPENAI_DEPLOYMENT_NAME, payload, result,
+                              time.time() - start, retries, status)
+    
+    return cached_gpt(AZURE_OPENAI_DEPLOYMENT_NAME, AZURE_OPENAI_API_VERSION, payload, request)
+
+
+def call_azure_gpt_stream(ocr_text: str, max_retries: int = 3, user_prompt: Optional[str] = None,
+                          label: str = "extract", system_prompt: Optional[str] = None,
+                          on_biomarker: Optional[Callable[[Dict], None]] = None) -> Optional[Dict]:
+    """
+    Streaming variant of call_azure_gpt: the completion is read as server-sent
+    events and every biomarker is normalized (normalize_gpt_biomarkers) and passed
+    to on_biomarker as soon as its object is complete, not after the whole JSON.
+    Shares the cache with call_azure_gpt; a cache hit replays the cached biomarkers.
+    A failure after biomarkers were handed out is not retried (no duplicates downstream).
+    """
+    url = gpt_chat_url()
+    headers = gpt_headers()
+    payload = build_gpt_payload(ocr_text, user_prompt, system_prompt)
+    stream_payload = dict(payload, stream=True, stream_options={"include_usage": True})
+    streamed = []
+    
+    def emit(bio: Dict) -> None:
+        streamed.append(bio)
+        if on_biomarker is not None:
+            for normalized in normalize_gpt_biomarkers({"biomarkers": [bio]}):
+                on_biomarker(normalized)
+    
+    def request() -> Optional[Dict]:
+        start = time.time()
+        body, status, retries, timings = None, "error", 0, {}
+        try:
+            for retry in range(max_retries):
+                retries = retry
+                parser = BiomarkerStreamParser()
+                usage, timings = None, {}
+                try:
+                    with HTTP.post(url, headers=headers, json=stream_payload, stream=True) as response:
+                        if response.status_code == 429:
+                            status = "rate_limited"
+                            wait_time = 10 * (retry + 1)
+                            print(f"    [GPT RATE LIMIT] Waiting {wait_time}s...")
+                            time.sleep(wait_time)
+                            continue
+                        
+                        if response.status_code != 200:
+                            status = f"http_{response.status_code}"
+                            print(f"    [GPT ERROR] {response.status_code}: {response.text[:200]}")
+                            return None
+                        
+                        response.encoding = "utf-8"
+                        for data in iter_sse_data(response.iter_lines(decode_unicode=True)):
+                            chunk = json.loads(data)
+                            # With include_usage the last chunk has no choices, only usage
+                            usage = chunk.get("usage") or usage
+                            for choice in chunk.get("choices") or []:
+                                delta = (choice.get("delta") or {}).get("content")
+                                if not delta:
+                                    continue
+                                timings.setdefault("first_token_s", time.time() - start)
+                                for bio in parser.feed(delta):
+                                    timings.setdefault("first_biomarker_s", time.time() - start)
+                                    timings["last_biomarker_s"] = time.time() - start
+                                    emit(bio)
+                    
+                    body = {"choices": [{"message": {"content": parser.text}}], "usage": usage}
+                    parsed = json.loads(parser.text.strip())
+                    status = "ok"
+                    total = time.time() - start
+                    STREAM_STATS.add(timings.get("first_token_s", total), timings.get("first_biomarker_s"),
+                                     timings.get("last_biomarker_s"), total)
+                    return parsed
+                    
+                except json.JSONDecodeError as e:
+                    status = "bad_json"
+                    print(f"    [GPT JSON ERROR] {e}")
+                    return None
+                except Exception as e:
+                    status = "error"
+                    print(f"    [GPT ERROR] {e}")
+                    if streamed:
+                        return None
+                    if retry < max_retries - 1:
+                        time.sleep(5)
             
-            if response.status_code != 200:
-                print(f"    [GPT ERROR] {response.status_code}: {response.text[:200]}")
+            return None
+        finally:
+            LEDGER.record_gpt(label, AZURE_OPENAI_DEPLOYMENT_NAME, payload, body, time.time() - start, retries,
+                              status, stream=True, **{k: round(v, 3) for k, v in timings.items()})
+    
+    result = cached_gpt(AZURE_OPENAI_DEPLOYMENT_NAME, AZURE_OPENAI_API_VERSION, payload, request)
+    if result is not None and not streamed:
+        # Cache hit (or a coalesced request): replay the biomarkers
+        for bio in result.get("biomarkers", []):
+            emit(bio)
+    return result
+
+
+def split_ocr_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split (preprocessed) OCR text at section header lines (page_filter.section_family).
+    Returns [(sections, text)]: lines before the first header go with the first
+    section, consecutive headers of the same family stay together, small sections
+    are merged into the previous one and the count is capped at GPT_SECTION_MAX_CHUNKS.
+    """
+    chunks: List[List] = []  # [families, lines]
+    preamble = []
+    for line in text.splitlines():
+        family = section_family(line)
+        if family and (not chunks or family != chunks[-1][0][-1]):
+            chunks.append([[family], preamble + [line]])
+            preamble = []
+        elif chunks:
+            chunks[-1][1].append(line)
+        else:
+            preamble.append(line)
+    if not chunks:
+        return [("document", text)]
+    
+    def size(chunk) -> int:
+        return sum(len(line) + 1 for line in chunk[1])
+    
+    def merge(i: int) -> None:
+        """Merge chunk i + 1 into chunk i."""
+        families, lines = chunks.pop(i + 1)
+        chunks[i][0] += [f for f in families if f not in chunks[i][0]]
+        chunks[i][1] += lines
+    
+    i = 0
+    while i < len(chunks) and len(chunks) > 1:
+        if size(chunks[i]) >= GPT_SECTION_MIN_CHARS:
+            i += 1
+        elif i == 0:
+            merge(0)
+        else:
+            merge(i - 1)
+    
+    while len(chunks) > GPT_SECTION_MAX_CHUNKS:
+        # Merge the adjacent pair with the least text
+        pair = min(range(len(chunks) - 1), key=lambda j: size(chunks[j]) + size(chunks[j + 1]))
+        merge(pair)
+    
+    return [("+".join(families), "\n".join(lines)) for families, lines in chunks]
+
+
+def section_user_prompt(sections: str, text: str) -> str:
+    focus = [GPT_SECTION_FOCUS[f] for f in sections.split("+") if f in GPT_SECTION_FOCUS]
+    return GPT_SECTION_USER_PROMPT_TEMPLATE.format(sections=sections, focus="\n".join(focus), ocr_text=text)
+
+
+def merge_section_results(results: List[Dict]) -> Dict:
+    """
+    One extraction from per-section extractions: biomarkers in section order,
+    a biomarker found in several sections (same canonical name, unit and value)
+    kept once. Same name and unit with another value is another result (serum
+    and urine "Protéines totales" in g/L) and is kept.
+    """
+    merged = []
+    seen = set()
+    for result in results:
+        for bio in result.get("biomarkers", []):
+            canonical_id, _ = get_canonical_name(bio.get("biomarker_name") or "")
+            numeric, modifier, value = clean_value(bio.get("value"))
+            key = (canonical_id, normalize_unit(bio.get("unit") or ""),
+                   modifier, numeric if numeric is not None else value.lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(bio)
+    return {"biomarkers": merged}
+
+
+def call_azure_gpt_sections(ocr_text: str) -> Optional[Dict]:
+    """
+    Extract each report section with its own focused completion, all sections
+    concurrently, and merge the results. Falls back to one completion for the
+    whole text if the report has a single section or a section fails.
+    """
+    sections = split_ocr_sections(preprocess_ocr_text(ocr_text))
+    if len(sections) < 2:
+        return call_azure_gpt(ocr_text)
+    
+    print(f"    GPT extraction in {len(sections)} sections ({', '.join(name for name, _ in sections)})...")
+    results = run_corpus(
+        sections,
+        lambda section: call_azure_gpt(section[1], user_prompt=section_user_prompt(*section), label="section"),
+        workers=len(sections),
+    )
+    if any(result is None for result in results):
+        print("    [GPT SECTIONS] A section failed, retrying as one completion...")
+        return call_azure_gpt(ocr_text)
+    return merge_section_results(results)
+
+
+# ============================================================
+# LOCAL ROW EXTRACTION (regular rows parsed without GPT)
+# ============================================================
+_NUM = r'\d+(?:[.,]\d+)?'
+_ROW_UNIT = r'[^\s\d<>≤≥()][^\s()]*'
+# "<name> <value ...>": the name starts with a letter, the values with a number
+_ROW_HEAD_RE = re.compile(rf'^(?P<name>[^\W\d_].*?)\s+(?P<rest>(?:[+\-]\s*)?[<>≤≥]?\s*{_NUM}(?:\s|[^\s\d.,]).*)$')
+_ROW_PAIR_RE = re.compile(rf'(?P<value>(?:[+\-]\s*)?[<>≤≥]?\s*{_NUM})\s*(?P<unit>{_ROW_UNIT})')
+_ROW_RANGE_RE = re.compile(rf'\(?\s*{_NUM}\s*(?:à|a|-|–)\s*{_NUM}\s*\)?\s*(?P<unit>{_ROW_UNIT})?')
+_ROW_BOUND_RE = re.compile(rf'\(?\s*[<>≤≥]\s*{_NUM}\s*\)?\s*(?P<unit>{_ROW_UNIT})?')
+_ROW_RATIO_RE = re.compile(_NUM)
+_KNOWN_CANONICALS = frozenset(NAME_TO_CANONICAL.values())
+
+
+def _row_unit(unit: str) -> Optional[str]:
+    """Normalized unit, None if it is not a known lab unit."""
+    return normalize_unit(unit) if unit.lower() in UNIT_MAPPINGS else None
+
+
+def parse_result_row(line: str) -> Optional[List[Dict]]:
+    """
+    Biomarkers of one regular result row, in the GPT output format, or None
+    when the row is not one of the shapes below (the line then goes to GPT):
+    - "<name> <value> <unit> [<value> <unit>] <min> à <max> [<unit>]" (or a
+      "< max" bound): one biomarker per value/unit pair, so a dual-unit row
+      keeps both ("Albumine 60,6 % 41,8 g/L 40.2 à 47.6 g/L" -> 60.6 %
+      and 41.8 g/L); the range's unit must be one of the pairs' units
+    - coagulation "<name> <patient> s <témoin> s [<ratio>]": the patient
+      value, plus the ratio for the TCA
+    The name must map to a known canonical biomarker and every unit must be
+    a known lab unit.
+    """
+    line = _DOT_RUN_RE.sub(' ', line.replace("|", " ")).strip()
+    head = _ROW_HEAD_RE.match(line)
+    if not head:
+        return None
+    name = head.group("name").strip(" :*")
+    canonical_id, _ = get_canonical_name(name)
+    if canonical_id not in _KNOWN_CANONICALS:
+        return None
+    
+    pairs, ref_unit, has_ref, ratio = [], None, False, None
+    rest = head.group("rest").strip()
+    while rest:
+        ref = _ROW_RANGE_RE.fullmatch(rest) or _ROW_BOUND_RE.fullmatch(rest)
+        if ref and pairs:
+            has_ref = True
+            if ref.group("unit"):
+                ref_unit = _row_unit(ref.group("unit"))
+                if ref_unit is None:
+                    return None
+            break
+        pair = _ROW_PAIR_RE.match(rest)
+        if pair and _row_unit(pair.group("unit")):
+            numeric, _, _ = clean_value(pair.group("value"))
+            if numeric is None:
                 return None
-            
-            result = response.json()
-            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            return json.loads(content.strip())
-            
-        except json.JSONDecodeError as e:
-            print(f"    [GPT JSON ERROR] {e}")
+            pairs.append((pair.group("value"), pair.group("unit")))
+            rest = rest[pair.end():].strip()
+            continue
+        if len(pairs) == 2 and _ROW_RATIO_RE.fullmatch(rest):
+            ratio = rest
+            break
+        return None
+    
+    if has_ref:
+        units = [_row_unit(unit) for _, unit in pairs]
+        if len(set(units)) != len(units) or (ref_unit is not None and ref_unit not in units):
             return None
-        except Exception as e:
-            print(f"    [GPT ERROR] {e}")
-            if retry < max_retries - 1:
-                time.sleep(5)
+    elif len(pairs) == 2 and all(_row_unit(unit) == "s" for _, unit in pairs):
+        pairs = pairs[:1]  # Patient | Témoin
+    else:
+        return None
     
-    return None
+    rows = [{"biomarker_name": name, "value": clean_value(value)[2], "unit": unit} for value, unit in pairs]
+    if ratio is not None and canonical_id == "aptt":
+        rows.append({"biomarker_name": "Ratio TCA", "value": clean_value(ratio)[2], "unit": ""})
+    return rows
 
 
-def process_pdf_with_gpt(pdf_path: Path) -> tuple:
+def extract_local_rows(ocr_text: str) -> Tuple[List[Dict], str]:
     """
-    Process a PDF: OCR then GPT extraction.
-    Returns (ocr_text, gpt_result).
+    (biomarkers parsed by parse_result_row, OCR text of every other line).
+    Lines with a date or an "Antériorités" mention are always left to GPT.
     """
+    local, remaining = [], []
+    for line in ocr_text.splitlines():
+        rows = None
+        if not _ANTERIORITY_RE.search(line) and not re.search(_DATE, line):
+            rows = parse_result_row(line)
+        if rows:
+            local.extend(rows)
+        else:
+            remaining.append(line)
+    return local, "\n".join(remaining)
+
+
+def gpt_prompt_tokens(ocr_text: str) -> int:
+    """Estimated prompt tokens of the standard extraction request for ocr_text."""
+    prompt = GPT_SYSTEM_PROMPT + GPT_USER_PROMPT_TEMPLATE.format(ocr_text=preprocess_ocr_text(ocr_text))
+    return LEDGER.estimate_tokens(prompt)
+
+
+class LocalRowStats:
+    """Thread-safe counters of local vs GPT extraction for the run summary."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.gpt = 0
+        self.tokens_avoided = 0
+        self.calls_skipped = 0
+    
+    def add(self, local: int, gpt: int, tokens_avoided: int, call_skipped: bool) -> None:
+        with self._lock:
+            self.local += local
+            self.gpt += gpt
+            self.tokens_avoided += tokens_avoided
+            self.calls_skipped += int(call_skipped)
+    
+    def format_stats(self) -> str:
+        with self._lock:
+            local, total = self.local, self.local + self.gpt
+            tokens_avoided, calls_skipped = self.tokens_avoided, self.calls_skipped
+        share = local / total * 100 if total else 0.0
+        return (f"Local rows: {local}/{total} biomarkers resolved locally ({share:.1f}%), "
+                f"~{tokens_avoided:,} GPT prompt tokens avoided, {calls_skipped} GPT call(s) skipped")
+
+
+# Process-wide counters shared by every worker
+LOCAL_ROW_STATS = LocalRowStats()
+
+
+def call_gpt_with_local_rows(ocr_text: str, extract_fn: Callable[[str], Optional[Dict]],
+                             on_biomarker: Optional[Callable[[Dict], None]] = None) -> Optional[Dict]:
+    """
+    Parse the regular rows locally, send the remaining lines to extract_fn
+    (skipped when no result line is left) and merge both, local rows first.
+    on_biomarker receives the local biomarkers (normalized) before GPT starts.
+    If GPT fails, the local biomarkers are returned alone.
+    """
+    local, remaining = extract_local_rows(ocr_text)
+    if on_biomarker is not None:
+        for bio in normalize_gpt_biomarkers({"biomarkers": local}):
+            on_biomarker(bio)
+    
+    needs_gpt = any(is_value_line(line) for line in preprocess_ocr_text(remaining).splitlines())
+    print(f"    Local rows: {len(local)} biomarkers parsed"
+          + ("" if needs_gpt else ", no result line left for GPT"))
+    gpt_result = extract_fn(remaining) if needs_gpt else {"biomarkers": []}
+    tokens_avoided = gpt_prompt_tokens(ocr_text) - (gpt_prompt_tokens(remaining) if needs_gpt else 0)
+    
+    if gpt_result is None:
+        LOCAL_ROW_STATS.add(len(local), 0, 0, False)
+        return {"biomarkers": local} if local else None
+    merged = merge_section_results([{"biomarkers": local}, gpt_result])
+    LOCAL_ROW_STATS.add(len(local), len(merged["biomarkers"]) - len(local), tokens_avoided, not needs_gpt)
+    return merged
+
+
+def template_user_prompt(profile: TemplateProfile, lab: str, ocr_text: str) -> str:
+    columns = profile.columns_hint or "non détectées"
+    return GPT_TEMPLATE_USER_PROMPT_TEMPLATE.format(lab=lab.capitalize(), columns=columns,
+                                                    ocr_text=preprocess_ocr_text(ocr_text))
+
+
+def ocr_pdf(pdf_path: Path, ocr_mode: str = OCR_MODE, text_layer: bool = TEXT_LAYER_FAST_PATH,
+            page_filter: bool = PAGE_FILTER) -> Optional[str]:
+    """
+    Text of a PDF file: its own text layer when usable (text_layer=True), else
+    Azure OCR in the given mode (see OCR_MODES).
+    In "whole" mode a failed (None or raising) document job falls back to
+    page-by-page OCR; an empty but successful result does not.
+    page_filter drops non-result pages wherever page texts are known
+    (text layer, shards); a whole-document OCR text is kept as is.
+    """
+    if text_layer:
+        page_texts = text_layer_pages(pdf_path)
+        if page_texts:
+            return join_pages(page_texts, page_filter)
+    
     total_pages = get_pdf_page_count(pdf_path)
-    print(f"  Processing {pdf_path.name} ({total_pages} pages)...")
+    
+    if ocr_mode == "sharded" and total_pages > OCR_PAGES_PER_SHARD:
+        print(f"    OCR {total_pages} pages in shards of {OCR_PAGES_PER_SHARD}...")
+        return ocr_sharded(pdf_path, page_filter=page_filter)
     
     # Send entire PDF at once (no chunking needed with upgraded tier)
     print(f"    OCR all {total_pages} pages...")
@@ -776,15 +1739,68 @@ def process_pdf_with_gpt(pdf_path: Path) -> tuple:
     with open(pdf_path, 'rb') as f:
         pdf_bytes = f.read()
     
-    ocr_text = call_azure_ocr(pdf_bytes)
-    
-    if not ocr_text:
-        print("    [ERROR] OCR returned no text")
-        ocr_text = ""
+    try:
+        ocr_text = cached_ocr(pdf_bytes)
+    except Exception as e:
+        print(f"    [ERROR] Whole-document OCR raised {type(e).__name__}: {e}")
+        ocr_text = None
+    if ocr_text is None and total_pages > 1:
+        print("    [OCR FALLBACK] Whole-document OCR failed, retrying page by page...")
+        ocr_text = ocr_sharded(pdf_path, pages_per_shard=1, page_filter=page_filter)
+    return ocr_text
+
+
+def process_pdf_with_gpt(pdf_path: Path, ocr_mode: str = OCR_MODE, text_layer: bool = TEXT_LAYER_FAST_PATH,
+                         page_filter: bool = PAGE_FILTER, gpt_mode: str = GPT_MODE,
+                         on_biomarker: Optional[Callable[[Dict], None]] = None,
+                         local_rows: bool = LOCAL_ROWS, lab_routing: bool = LAB_ROUTING) -> tuple:
+    """
+    Process a PDF: OCR then GPT extraction.
+    In "stream" mode on_biomarker receives each normalized biomarker as it arrives.
+    local_rows parses regular result rows locally and sends only the rest to GPT.
+    lab_routing sends known lab templates (lab_profiles.py) to their profile:
+    compact prompt with the template's column order, local rows per profile.
+    Returns (ocr_text, gpt_result).
+    """
+    total_pages = get_pdf_page_count(pdf_path)
+    print(f"  Processing {pdf_path.name} ({total_pages} pages)...")
     
-    # Call GPT to extract biomarkers
-    print(f"    GPT extraction...")
-    gpt_result = call_azure_gpt(ocr_text)
+    # Azure calls below are recorded in the usage ledger under this PDF
+    with LEDGER.scope(pdf_path.name):
+        ocr_text = ocr_pdf(pdf_path, ocr_mode, text_layer, page_filter)
+        
+        if not ocr_text:
+            print("    [ERROR] OCR returned no text")
+            ocr_text = ""
+        
+        profile = None
+        if lab_routing:
+            fp = fingerprint(ocr_text)
+            profile = LAB_PROFILES.get(fp)
+            if profile is not None:
+                print(f"    Lab template {profile.template}")
+                local_rows = local_rows or profile.local_rows
+        
+        # Call GPT to extract biomarkers
+        print(f"    GPT extraction...")
+        if profile is not None:
+            prompts = lambda text: dict(user_prompt=template_user_prompt(profile, fp.lab, text),
+                                        system_prompt=GPT_TEMPLATE_SYSTEM_PROMPT, label="template")
+            if gpt_mode == "stream":
+                extract = lambda text: call_azure_gpt_stream(text, on_biomarker=on_biomarker, **prompts(text))
+            else:
+                extract = lambda text: call_azure_gpt(text, **prompts(text))
+        elif gpt_mode == "sections":
+            extract = call_azure_gpt_sections
+        elif gpt_mode == "stream":
+            extract = lambda text: call_azure_gpt_stream(text, on_biomarker=on_biomarker)
+        else:
+            extract = call_azure_gpt
+        
+        if local_rows:
+            gpt_result = call_gpt_with_local_rows(ocr_text, extract, on_biomarker if gpt_mode == "stream" else None)
+        else:
+            gpt_result = extract(ocr_text)
     
     return ocr_text, gpt_result
 
@@ -867,6 +1883,103 @@ def compare_values(expected: str, extracted_numeric: Optional[float],
     return exp_clean.lower() == extracted_string.lower()
 
 
+class ExtractedIndex:
+    """
+    Per-report lookups over normalized GPT biomarkers, built once per report:
+    - by_canonical / by_name: exact lookups (lists keep GPT order)
+    - a trigram index over the normalized names, so the partial-name fallback
+      ("gt name inside extracted name" or the reverse) does not scan every name
+    """
+    GRAM = 3
+    
+    def __init__(self, extracted_biomarkers: List[Dict]):
+        self.by_canonical: Dict[str, List[Dict]] = {}
+        self.by_name: Dict[str, List[Dict]] = {}
+        
+        raw_names_norm = normalize_names_for_matching([bio["raw_name"] for bio in extracted_biomarkers])
+        
+        for bio, raw_norm in zip(extracted_biomarkers, raw_names_norm):
+            # Store by canonical (may have multiple entries for same biomarker with different units)
+            self.by_canonical.setdefault(bio["canonical_id"], []).append(bio)
+            # Store by normalized raw name
+            self.by_name.setdefault(raw_norm, []).append(bio)
+        
+        # Names in insertion order; the partial match returns the FIRST one that fits
+        self.names = list(self.by_name)
+        self.name_grams = [self._grams(name) for name in self.names]
+        self.short_names = [i for i, name in enumerate(self.names) if len(name) < self.GRAM]
+        self.postings: Dict[str, List[int]] = {}
+        for i, grams in enumerate(self.name_grams):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(i)
+    
+    @classmethod
+    def _grams(cls, text: str) -> set:
+        return {text[i:i + cls.GRAM] for i in range(len(text) - cls.GRAM + 1)}
+    
+    def partial_match(self, name_norm: str) -> Optional[str]:
+        """First extracted name (GPT order) containing name_norm or contained in it."""
+        if len(name_norm) < self.GRAM:
+            # Too short to index (e.g. "k", "na"): plain scan
+            for name in self.names:
+                if name_norm in name or name in name_norm:
+                    return name
+            return None
+        
+        best = len(self.names)
+        for i in self.short_names:
+            if i < best and self.names[i] in name_norm:
+                best = i
+        
+        grams = self._grams(name_norm)
+        hits: Dict[int, int] = {}
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                hits[i] = hits.get(i, 0) + 1
+        
+        for i, count in hits.items():
+            if i >= best:
+                continue
+            name = self.names[i]
+            # All grams of one side present in the other -> verify the substring
+            if count == len(grams) and name_norm in name:
+                best = i
+            elif count == len(self.name_grams[i]) and name in name_norm:
+                best = i
+        
+        return self.names[best] if best < len(self.names) else None
+
+
+def index_extracted_biomarkers(extracted_biomarkers: List[Dict]) -> ExtractedIndex:
+    """Build the per-report candidate lookups for normalized GPT biomarkers."""
+    return ExtractedIndex(extracted_biomarkers)
+
+
+def find_candidates(gt_canonical: str, gt_name_norm: str, index: ExtractedIndex) -> List[Dict]:
+    """Extracted biomarkers that may correspond to one groundtruth row, best guesses first."""
+    candidates = []
+    
+    # First try canonical match
+    if gt_canonical in index.by_canonical:
+        candidates.extend(index.by_canonical[gt_canonical])
+    
+    # Then try name match (dedupe by identity: no dict comparisons)
+    if gt_name_norm in index.by_name:
+        seen = {id(bio) for bio in candidates}
+        for bio in index.by_name[gt_name_norm]:
+            if id(bio) not in seen:
+                seen.add(id(bio))
+                candidates.append(bio)
+    
+    # Partial name match
+    if not candidates:
+        name_key = index.partial_match(gt_name_norm)
+        if name_key is not None:
+            candidates.extend(index.by_name[name_key])
+    
+    return candidates
+
+
 def evaluate_extraction(gpt_result: Optional[Dict], groundtruth_rows: List[Dict]) -> Dict:
     """
     Evaluate GPT extraction quality against groundtruth CSV rows.
@@ -896,22 +2009,8 @@ def evaluate_extraction(gpt_result: Optional[Dict], groundtruth_rows: List[Dict]
         }
     
     # Build lookup by canonical ID and raw name
-    extracted_by_canonical = {}
-    extracted_by_name = {}
-    
-    for bio in extracted_biomarkers:
-        canonical = bio["canonical_id"]
-        raw_norm = normalize_name_for_matching(bio["raw_name"])
-        
-        # Store by canonical (may have multiple entries for same biomarker with different units)
-        if canonical not in extracted_by_canonical:
-            extracted_by_canonical[canonical] = []
-        extracted_by_canonical[canonical].append(bio)
-        
-        # Store by normalized raw name
-        if raw_norm not in extracted_by_name:
-            extracted_by_name[raw_norm] = []
-        extracted_by_name[raw_norm].append(bio)
+    extracted_index = index_extracted_biomarkers(extracted_biomarkers)
+    gt_names_norm = normalize_names_for_matching([r.get("biomarker_name", "") for r in groundtruth_rows])
     
     exact_matches = 0
     failures = []
@@ -921,14 +2020,13 @@ def evaluate_extraction(gpt_result: Optional[Dict], groundtruth_rows: List[Dict]
     # the other should also count as matched (via unit conversion)
     matched_canonicals_with_values = {}  # {canonical_id: [matched_numeric_values]}
     
-    for gt_row in groundtruth_rows:
+    for gt_row, gt_name_norm in zip(groundtruth_rows, gt_names_norm):
         gt_name = gt_row.get("biomarker_name", "")
         gt_value = gt_row.get("value", "")
         gt_unit = gt_row.get("unit", "")
         
         # Get canonical ID for groundtruth row
         gt_canonical, _ = get_canonical_name(gt_name)
-        gt_name_norm = normalize_name_for_matching(gt_name)
         gt_unit_norm = normalize_unit(gt_unit)
         
         # Skip excluded biomarkers (calculated values, QC indices)
@@ -941,24 +2039,7 @@ def evaluate_extraction(gpt_result: Optional[Dict], groundtruth_rows: List[Dict]
         gt_numeric, gt_modifier, gt_clean = clean_value(gt_value)
         
         # Find matching extracted biomarker
-        candidates = []
-        
-        # First try canonical match
-        if gt_canonical in extracted_by_canonical:
-            candidates.extend(extracted_by_canonical[gt_canonical])
-        
-        # Then try name match
-        if gt_name_norm in extracted_by_name:
-            for bio in extracted_by_name[gt_name_norm]:
-                if bio not in candidates:
-                    candidates.append(bio)
-        
-        # Partial name match
-        if not candidates:
-            for name_key, bios in extracted_by_name.items():
-                if gt_name_norm in name_key or name_key in gt_name_norm:
-                    candidates.extend(bios)
-                    break
+        candidates = find_candidates(gt_canonical, gt_name_norm, extracted_index)
         
         matched = False
         best_candidate = None
@@ -1100,79 +2181,153 @@ def load_groundtruth_csv(csv_path: Path) -> Dict[str, List[Dict]]:
     return grouped
 
 
-def main():
-    print("=" * 70)
-    print("LabTrack OCR + GPT Quality Test v2.0")
-    print("Enhanced prompt + Comprehensive normalization")
-    print("=" * 70)
-    
-    if not AZURE_OCR_KEY or not AZURE_OCR_ENDPOINT:
-        print("[ERROR] Azure OCR credentials not found")
-        return
-    if not AZURE_OPENAI_API_KEY or not AZURE_OPENAI_API_BASE:
-        print("[ERROR] Azure OpenAI credentials not found")
-        return
-    
-    print(f"OCR Endpoint: {AZURE_OCR_ENDPOINT}")
-    print(f"GPT Endpoint: {AZURE_OPENAI_API_BASE}")
-    print(f"GPT Model: {AZURE_OPENAI_DEPLOYMENT_NAME}")
-    
-    # Load groundtruth from CSV
-    groundtruth_csv = BLOODWORK_DIR / "bloodwork.csv"
-    if not groundtruth_csv.exists():
-        print(f"[ERROR] Groundtruth CSV not found: {groundtruth_csv}")
-        return
+# ============================================================
+# CONCURRENT CORPUS RUNNER
+# ============================================================
+def run_corpus(items: List[Any], process_fn: Callable[[Any], Any],
+               workers: int = DEFAULT_WORKERS) -> List[Any]:
+    """
+    Run process_fn over items, keeping up to `workers` of them in flight.
     
-    groundtruth_data = load_groundtruth_csv(groundtruth_csv)
-    print(f"Loaded groundtruth for {len(groundtruth_data)} PDFs from CSV")
+    Each PDF spends most of its time waiting on Azure (OCR polling, GPT),
+    so threads are enough to overlap them. Each item runs in a copy of the
+    caller's context (LEDGER.scope attribution survives the thread hop).
+    Returns results in the SAME ORDER as items, whatever the completion order.
+    If process_fn raises for an item, its result is None.
+    """
+    results: List[Any] = [None] * len(items)
+    
+    if workers <= 1:
+        for idx, item in enumerate(items):
+            try:
+                results[idx] = process_fn(item)
+            except Exception as e:
+                print(f"  [ERROR] item {idx + 1}/{len(items)}: {e}")
+        return results
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(contextvars.copy_context().run, process_fn, item): idx
+                   for idx, item in enumerate(items)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                print(f"  [ERROR] item {idx + 1}/{len(items)}: {e}")
     
-    OUTPUT_DIR.mkdir(exist_ok=True)
+    return results
+
+
+def safe_output_name(pdf_name: str) -> str:
+    """File-system safe stem used for the per-PDF artifacts in OUTPUT_DIR."""
+    return re.sub(r'[^\w\-]', '_', pdf_name.replace(".pdf", ""))[:50]
+
+
+def process_and_evaluate(pdf_name: str, gt_rows: List[Dict], position: str = "",
+                         ocr_mode: str = OCR_MODE, text_layer: bool = TEXT_LAYER_FAST_PATH,
+                         page_filter: bool = PAGE_FILTER, gpt_mode: str = GPT_MODE,
+                         local_rows: bool = LOCAL_ROWS, lab_routing: bool = LAB_ROUTING) -> Dict:
+    """
+    OCR + GPT one PDF, save its artifacts and score it against groundtruth.
+    Thread-safe: only writes files that belong to this PDF.
+    """
+    pdf_path = BLOODWORK_DIR / pdf_name
+    
+    start_time = time.time()
+    # Seconds from the start of the PDF at which each streamed biomarker was available
+    arrivals = []
+    ocr_text, gpt_result = process_pdf_with_gpt(pdf_path, ocr_mode, text_layer, page_filter, gpt_mode,
+                                                on_biomarker=lambda bio: arrivals.append(time.time() - start_time),
+                                                local_rows=local_rows, lab_routing=lab_routing)
+    process_time = time.time() - start_time
+    
+    safe_name = safe_output_name(pdf_name)
+    
+    with open(OUTPUT_DIR / f"{safe_name}_ocr.md", "w", encoding="utf-8") as f:
+        f.write(ocr_text)
+    
+    gpt_path = OUTPUT_DIR / f"{safe_name}_gpt.json"
+    if gpt_result:
+        with open(gpt_path, "w", encoding="utf-8") as f:
+            json.dump(gpt_result, f, indent=2, ensure_ascii=False)
+    else:
+        # A previous run's output must not be re-scored as this run's (--evaluate-only)
+        gpt_path.unlink(missing_ok=True)
+    
+    quality = evaluate_extraction(gpt_result, gt_rows)
+    quality["pdf_name"] = pdf_name
+    quality["process_time_seconds"] = round(process_time, 1)
+    fp = fingerprint(ocr_text)
+    quality["lab"] = fp.lab
+    quality["lab_template"] = fp.template
+    quality["ocr_text_length"] = len(ocr_text)
+    quality["ocr_tokens"] = LEDGER.estimate_tokens(ocr_text)
+    quality["prompt_ocr_tokens"] = LEDGER.estimate_tokens(preprocess_ocr_text(ocr_text))
+    reduction = (1 - quality["prompt_ocr_tokens"] / quality["ocr_tokens"]) * 100 if quality["ocr_tokens"] else 0.0
+    if arrivals:
+        quality["first_biomarker_seconds"] = round(arrivals[0], 1)
+        quality["last_biomarker_seconds"] = round(arrivals[-1], 1)
+    
+    # One print per PDF so concurrent workers don't interleave their report lines
+    lines = [
+        f"\n{'=' * 60}",
+        f"{position} {pdf_name}".strip(),
+        f"Fields in groundtruth: {len(gt_rows)} | Template: {fp.template}",
+        f"  Time: {process_time:.1f}s | GPT found: {quality.get('gpt_biomarker_count', 0)} biomarkers",
+        f"  OCR tokens: {quality['ocr_tokens']} -> {quality['prompt_ocr_tokens']} in prompt (-{reduction:.0f}%)",
+        f"  Exact Matches: {quality.get('exact_matches', 0)}/{quality.get('total_fields', 0)} ({quality.get('exact_match_rate', 0)}%)",
+    ]
+    if arrivals:
+        lines.append(f"  Streamed: first biomarker at {arrivals[0]:.1f}s, last at {arrivals[-1]:.1f}s "
+                     f"({len(arrivals)} biomarkers)")
+    if quality.get("failures"):
+        lines.append(f"  Failures ({len(quality['failures'])}): ")
+        for fail in quality["failures"][:3]:
+            lines.append(f"    - {fail.get('biomarker', '?')}: {fail.get('reason', '?')}")
+    print("\n".join(lines))
+    
+    return quality
+
+
+def template_summary_lines(results: List[Dict]) -> List[str]:
+    """Accuracy and latency per lab template (lab_profiles.fingerprint), as a markdown table."""
+    by_template: Dict[str, List[Dict]] = {}
+    for r in results:
+        if "lab_template" in r:
+            by_template.setdefault(r["lab_template"], []).append(r)
+    if not by_template:
+        return []
     
+    lines = [
+        "\n## Results by lab template\n",
+        "| Template | PDFs | Fields | Exact | Rate | Mean time |",
+        "|----------|------|--------|-------|------|-----------|",
+    ]
+    for template, rows in sorted(by_template.items(), key=lambda item: -len(item[1])):
+        fields = sum(r.get("total_fields", 0) for r in rows)
+        exact = sum(r.get("exact_matches", 0) for r in rows)
+        rate = exact / fields * 100 if fields else 0.0
+        mean_time = sum(r.get("process_time_seconds") or 0 for r in rows) / len(rows)
+        lines.append(f"| {template} | {len(rows)} | {fields} | {exact} | {rate:.1f}% | {mean_time:.1f}s |")
+    return lines
+
+
+def write_reports(qualities: List[Optional[Dict]]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Write quality_results.json, all_failures.json and summary_report.md
+    from per-PDF quality dicts (None entries are skipped).
+    Returns (results, all_failures).
+    """
+    # Aggregate in input order so the output files are deterministic
     results = []
     all_failures = []
-    
-    for idx, (pdf_name, gt_rows) in enumerate(groundtruth_data.items()):
-        pdf_path = BLOODWORK_DIR / pdf_name
-        
-        if not pdf_path.exists():
-            print(f"\n[SKIP] PDF not found: {pdf_name}")
+    for quality in qualities:
+        if quality is None:
             continue
-        
-        print(f"\n{'=' * 60}")
-        print(f"[{idx + 1}/{len(groundtruth_data)}] {pdf_name}")
-        print(f"Fields in groundtruth: {len(gt_rows)}")
-        
-        start_time = time.time()
-        ocr_text, gpt_result = process_pdf_with_gpt(pdf_path)
-        process_time = time.time() - start_time
-        
-        safe_name = re.sub(r'[^\w\-]', '_', pdf_name.replace(".pdf", ""))[:50]
-        
-        with open(OUTPUT_DIR / f"{safe_name}_ocr.md", "w", encoding="utf-8") as f:
-            f.write(ocr_text)
-        
-        if gpt_result:
-            with open(OUTPUT_DIR / f"{safe_name}_gpt.json", "w", encoding="utf-8") as f:
-                json.dump(gpt_result, f, indent=2, ensure_ascii=False)
-        
-        quality = evaluate_extraction(gpt_result, gt_rows)
-        quality["pdf_name"] = pdf_name
-        quality["process_time_seconds"] = round(process_time, 1)
-        quality["ocr_text_length"] = len(ocr_text)
-        
         for f in quality.get("failures", []):
-            f["pdf_name"] = pdf_name
+            f["pdf_name"] = quality["pdf_name"]
             all_failures.append(f)
-        
         results.append(quality)
-        
-        print(f"  Time: {process_time:.1f}s | GPT found: {quality.get('gpt_biomarker_count', 0)} biomarkers")
-        print(f"  Exact Matches: {quality.get('exact_matches', 0)}/{quality.get('total_fields', 0)} ({quality.get('exact_match_rate', 0)}%)")
-        
-        if quality.get("failures"):
-            print(f"  Failures ({len(quality['failures'])}): ")
-            for fail in quality["failures"][:3]:
-                print(f"    - {fail.get('biomarker', '?')}: {fail.get('reason', '?')}")
     
     with open(OUTPUT_DIR / "quality_results.json", "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
@@ -1206,6 +2361,7 @@ def main():
         line = f"| {i+1} | {pdf_short} | {r.get('total_fields', 0)} | {r.get('gpt_biomarker_count', 0)} | {r.get('exact_matches', 0)} | {r.get('exact_match_rate', 0)}% |"
         summary_lines.append(line)
     
+    summary_lines.extend(template_summary_lines(results))
     summary_lines.append(f"\n**Total failures:** {len(all_failures)}")
     
     summary_text = "\n".join(summary_lines)
@@ -1214,8 +2370,203 @@ def main():
     with open(OUTPUT_DIR / "summary_report.md", "w", encoding="utf-8") as f:
         f.write(summary_text)
     
+    return results, all_failures
+
+
+def main(workers: int = DEFAULT_WORKERS, prefetch: bool = False, ocr_mode: str = OCR_MODE,
+         text_layer: bool = TEXT_LAYER_FAST_PATH, page_filter: bool = PAGE_FILTER, gpt_mode: str = GPT_MODE,
+         local_rows: bool = LOCAL_ROWS, lab_routing: bool = LAB_ROUTING):
+    print("=" * 70)
+    print("LabTrack OCR + GPT Quality Test v2.0")
+    print("Enhanced prompt + Comprehensive normalization")
+    print("=" * 70)
+    
+    if not AZURE_OCR_KEY or not AZURE_OCR_ENDPOINT:
+        print("[ERROR] Azure OCR credentials not found")
+        return
+    if not AZURE_OPENAI_API_KEY or not AZURE_OPENAI_API_BASE:
+        print("[ERROR] Azure OpenAI credentials not found")
+        return
+    
+    print(f"OCR Endpoint: {AZURE_OCR_ENDPOINT}")
+    print(f"GPT Endpoint: {AZURE_OPENAI_API_BASE}")
+    print(f"GPT Model: {AZURE_OPENAI_DEPLOYMENT_NAME} ({gpt_mode} mode"
+          + (", regular rows parsed locally" if local_rows else "")
+          + (", known lab templates routed to their profile)" if lab_routing else ")"))
+    print(f"Workers: {workers}")
+    print(f"OCR mode: {ocr_mode}" + (f" ({OCR_PAGES_PER_SHARD} page(s) per shard)" if ocr_mode == "sharded" else "")
+          + (", text layer first" if text_layer else "") + (", page filter" if page_filter else ""))
+    
+    # Load groundtruth from CSV
+    groundtruth_csv = BLOODWORK_DIR / "bloodwork.csv"
+    if not groundtruth_csv.exists():
+        print(f"[ERROR] Groundtruth CSV not found: {groundtruth_csv}")
+        return
+    
+    groundtruth_data = load_groundtruth_csv(groundtruth_csv)
+    print(f"Loaded groundtruth for {len(groundtruth_data)} PDFs from CSV")
+    
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    
+    # Queue every PDF that exists, remembering its position in the CSV
+    jobs = []
+    for idx, (pdf_name, gt_rows) in enumerate(groundtruth_data.items()):
+        if not (BLOODWORK_DIR / pdf_name).exists():
+            print(f"\n[SKIP] PDF not found: {pdf_name}")
+            continue
+        jobs.append((pdf_name, gt_rows, f"[{idx + 1}/{len(groundtruth_data)}]"))
+    
+    run_start = time.time()
+    if prefetch and ocr_mode == "sharded":
+        print("\n[PREFETCH] Skipped: sharded OCR already submits every shard concurrently")
+    elif prefetch:
+        prefetch_ocr([pdf_name for pdf_name, _, _ in jobs], text_layer)
+    qualities = run_corpus(
+        jobs,
+        lambda job: process_and_evaluate(*job, ocr_mode=ocr_mode, text_layer=text_layer, page_filter=page_filter,
+                                         gpt_mode=gpt_mode, local_rows=local_rows, lab_routing=lab_routing),
+        workers=workers,
+    )
+    run_time = time.time() - run_start
+    
+    write_reports(qualities)
+    
+    print(f"\nWall time: {run_time:.1f}s with {workers} worker(s)")
+    ocr_tokens = sum(q.get("ocr_tokens", 0) for q in qualities if q)
+    prompt_ocr_tokens = sum(q.get("prompt_ocr_tokens", 0) for q in qualities if q)
+    if ocr_tokens:
+        print(f"OCR text: {ocr_tokens:,} -> {prompt_ocr_tokens:,} prompt tokens "
+              f"(-{(1 - prompt_ocr_tokens / ocr_tokens) * 100:.1f}%, compaction {'on' if OCR_COMPACTION else 'off'})")
+    print(OCR_CACHE.format_stats("OCR"))
+    print(OCR_CLIENT.format_stats())
+    if text_layer:
+        print(TEXT_LAYER_STATS.format_stats(LEDGER.ocr_seconds_per_page()))
+    if page_filter:
+        print(PAGE_FILTER_STATS.format_stats(LEDGER.chars_per_token()))
+    print(GPT_CACHE.format_stats("GPT") + f", {GPT_SINGLE_FLIGHT.coalesced} coalesced")
+    if local_rows:
+        print(LOCAL_ROW_STATS.format_stats())
+    if gpt_mode == "stream":
+        print(STREAM_STATS.format_stats())
+        firsts = [q["first_biomarker_seconds"] for q in qualities if q and "first_biomarker_seconds" in q]
+        if firsts:
+            lasts = [q["last_biomarker_seconds"] for q in qualities if q and "last_biomarker_seconds" in q]
+            times = [q["process_time_seconds"] for q in qualities if q and "first_biomarker_seconds" in q]
+            print(f"Per PDF (from PDF start): first biomarker {sum(firsts) / len(firsts):.1f}s, "
+                  f"last {sum(lasts) / len(lasts):.1f}s, complete {sum(times) / len(times):.1f}s (mean)")
+    print(HTTP.format_stats())
+    print(LEDGER.format_run_summary())
     print(f"\n\nResults saved to: {OUTPUT_DIR}/")
 
 
+def load_saved_outputs() -> List[Tuple[str, Optional[Dict], List[Dict], int]]:
+    """
+    Load the artifacts of a previous run from OUTPUT_DIR, in CSV order.
+    Returns [(pdf_name, gpt_result or None, groundtruth_rows, ocr_text_length)]
+    for every PDF that was processed (has a saved _ocr.md or _gpt.json).
+    """
+    groundtruth_csv = BLOODWORK_DIR / "bloodwork.csv"
+    if not groundtruth_csv.exists() or not OUTPUT_DIR.exists():
+        return []
+    
+    saved = []
+    for pdf_name, gt_rows in load_groundtruth_csv(groundtruth_csv).items():
+        safe_name = safe_output_name(pdf_name)
+        gpt_path = OUTPUT_DIR / f"{safe_name}_gpt.json"
+        ocr_path = OUTPUT_DIR / f"{safe_name}_ocr.md"
+        
+        if not ocr_path.exists() and not gpt_path.exists():
+            continue  # never processed (PDF was skipped in the full run)
+        
+        gpt_result = None
+        if gpt_path.exists():
+            with open(gpt_path, encoding="utf-8") as f:
+                gpt_result = json.load(f)
+        
+        ocr_length = len(ocr_path.read_text(encoding="utf-8")) if ocr_path.exists() else 0
+        saved.append((pdf_name, gpt_result, gt_rows, ocr_length))
+    
+    return saved
+
+
+def rescore_saved_outputs():
+    """
+    Evaluate-only mode: re-score the *_gpt.json artifacts already in OUTPUT_DIR
+    against bloodwork.csv without calling Azure.
+    
+    Use it after changing NAME_TO_CANONICAL, compare_values, unit conversions...
+    PDFs whose GPT output was never saved are scored as "No GPT result".
+    """
+    print("=" * 70)
+    print("LabTrack Quality Test - OFFLINE RE-SCORING (no Azure calls)")
+    print("=" * 70)
+    
+    groundtruth_csv = BLOODWORK_DIR / "bloodwork.csv"
+    if not groundtruth_csv.exists():
+        print(f"[ERROR] Groundtruth CSV not found: {groundtruth_csv}")
+        return
+    if not OUTPUT_DIR.exists():
+        print(f"[ERROR] No saved results in {OUTPUT_DIR}/ - run the full test first")
+        return
+    
+    # Keep the timings and lab templates of the run that produced the artifacts
+    previous = {}
+    previous_results = OUTPUT_DIR / "quality_results.json"
+    if previous_results.exists():
+        with open(previous_results, encoding="utf-8") as f:
+            previous = {r["pdf_name"]: r for r in json.load(f)}
+    
+    start_time = time.time()
+    saved = load_saved_outputs()
+    
+    qualities = [evaluate_extraction(gpt_result, gt_rows) for _, gpt_result, gt_rows, _ in saved]
+    
+    for quality, (pdf_name, _, _, ocr_length) in zip(qualities, saved):
+        quality["pdf_name"] = pdf_name
+        quality["process_time_seconds"] = previous.get(pdf_name, {}).get("process_time_seconds")
+        quality["ocr_text_length"] = ocr_length
+        if "lab_template" in previous.get(pdf_name, {}):
+            quality["lab"] = previous[pdf_name]["lab"]
+            quality["lab_template"] = previous[pdf_name]["lab_template"]
+    
+    results, _ = write_reports(qualities)
+    
+    print(f"\nRe-scored {len(results)} PDFs in {time.time() - start_time:.2f}s")
+    print(f"Results saved to: {OUTPUT_DIR}/")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="LabTrack OCR + GPT quality test")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"PDFs processed concurrently (default: {DEFAULT_WORKERS}, env OCR_GPT_WORKERS)")
+    parser.add_argument("--prefetch-ocr", action="store_true",
+                        help="OCR all uncached PDFs concurrently before the GPT pass")
+    parser.add_argument("--ocr-mode", choices=OCR_MODES, default=OCR_MODE,
+                        help="whole: one OCR job per PDF; sharded: page shards OCR'd concurrently "
+                             f"(default: {OCR_MODE}, env OCR_MODE / OCR_PAGES_PER_SHARD)")
+    parser.add_argument("--no-text-layer", action="store_true",
+                        help="Always OCR with Azure, even PDFs with a usable text layer (env TEXT_LAYER_FAST_PATH=0)")
+    parser.add_argument("--page-filter", action="store_true", default=PAGE_FILTER,
+                        help="Drop pages without results before the GPT prompt (env PAGE_FILTER=1)")
+    parser.add_argument("--gpt-mode", choices=GPT_MODES, default=GPT_MODE,
+                        help="single: one completion per PDF; sections: one per report section, concurrently; "
+                             "stream: one streamed completion per PDF, biomarkers parsed as they arrive "
+                             f"(default: {GPT_MODE}, env GPT_MODE)")
+    parser.add_argument("--local-rows", action="store_true", default=LOCAL_ROWS,
+                        help="Parse regular result rows locally, send only the other lines to GPT (env LOCAL_ROWS=1)")
+    parser.add_argument("--lab-routing", action="store_true", default=LAB_ROUTING,
+                        help="Route known lab templates (Biogroup / Synlab / Cerballiance) to their cached "
+                             "extraction profile (env LAB_ROUTING=1, profiles in LAB_PROFILES)")
+    parser.add_argument("--evaluate-only", action="store_true",
+                        help=f"Re-score saved *_gpt.json in {OUTPUT_DIR}/ without calling Azure")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.evaluate_only:
+        rescore_saved_outputs()
+    else:
+        main(workers=args.workers, prefetch=args.prefetch_ocr, ocr_mode=args.ocr_mode,
+             text_layer=TEXT_LAYER_FAST_PATH and not args.no_text_layer, page_filter=args.page_filter,
+             gpt_mode=args.gpt_mode, local_rows=args.local_rows, lab_routing=args.lab_routing)
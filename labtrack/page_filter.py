@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Page relevance filter: drop pages that carry no results (cover page, legal
+notices, sampling conditions, interpretation boilerplate) before the GPT
+prompt is built.
+
+A page is kept when it has at least one of:
+- a section header line ("HÉMATOLOGIE", "Electrophorèse des protéines"...)
+- PAGE_FILTER_MIN_VALUE_LINES lines with a number followed by a lab unit
+Everything else is dropped. If every page of a document would be dropped,
+nothing is (the prompt is never emptied by the filter).
+
+Works on page texts, so it applies wherever pages are known: text-layer
+pages (text_layer.py) and page-sharded OCR.
+
+Usage (inspect the page decisions for one PDF with a text layer):
+    python page_filter.py bloodwork/<name>.pdf
+"""
+
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from loinc_index import fold_text
+
+PAGE_FILTER = os.getenv("PAGE_FILTER", "0") == "1"
+# Lines with "<number> <unit>" a page needs without a section header
+PAGE_FILTER_MIN_VALUE_LINES = int(os.getenv("PAGE_FILTER_MIN_VALUE_LINES", "2"))
+
+# Folded (lowercase, no accents) starts of section header lines
+SECTION_HEADERS = (
+    "hematologie", "hemogramme", "numeration", "formule leucocytaire", "hemostase", "coagulation",
+    "biochimie", "ionogramme", "bilan lipidique", "bilan hepatique", "bilan renal", "bilan martial",
+    "electrophorese", "proteines", "enzymologie", "immunologie", "immunochimie", "serologie",
+    "hormonologie", "endocrinologie", "thyroide", "vitamines", "marqueurs", "auto-immunite",
+    "metabolisme", "glycemie", "diabete", "urines", "immuno-hematologie",
+)
+_HEADER_MAX_WORDS = 6
+
+# Report sections a header line opens (first matching prefix wins), for section-parallel extraction
+SECTION_FAMILIES = (
+    ("electrophorese", "electrophoresis"),
+    ("immuno-hematologie", "hematology"), ("hematologie", "hematology"), ("hemogramme", "hematology"),
+    ("numeration", "hematology"), ("formule leucocytaire", "hematology"),
+    ("hemostase", "hemostasis"), ("coagulation", "hemostasis"),
+    ("serologie", "serology"), ("immunologie", "serology"), ("immunochimie", "serology"),
+    ("auto-immunite", "serology"),
+    ("hormonologie", "hormones"), ("endocrinologie", "hormones"), ("thyroide", "hormones"),
+    ("urines", "urine"),
+)
+
+_UNIT_RE = re.compile(
+    r'\d(?:[.,]\d+)?\s*(?:[<>]\s*)?'
+    r'(?:g/dl|g/l|mg/l|mg/dl|[µu]g/l|[µu]g/dl|ng/ml|ng/l|pg/ml|pg\b|fl\b|'
+    r'[mµunp]mol/l|mmol/mol|m?ui/l|[µu]ui/ml|u/l|ui/ml|g/24h|mg/24h|'
+    r'giga/l|tera/l|t/l|10[*^]?\d+/l|/mm3|ml/min|sec\b|s\b|%)',
+)
+
+
+def is_section_header(line: str) -> bool:
+    folded = fold_text(line).strip(" :-*#|")
+    return len(folded.split()) <= _HEADER_MAX_WORDS and folded.startswith(SECTION_HEADERS)
+
+
+def section_family(line: str) -> str:
+    """Section a header line opens ("hematology", "biochemistry"...), "" if not a header.
+    Lines with a digit are results ("Glycémie 0,95 g/L"), never headers here."""
+    if not is_section_header(line) or any(c.isdigit() for c in line):
+        return ""
+    folded = fold_text(line).strip(" :-*#|")
+    for prefix, family in SECTION_FAMILIES:
+        if folded.startswith(prefix):
+            return family
+    return "biochemistry"
+
+
+def classify_page(text: str) -> Tuple[bool, str]:
+    """(keep, reason) for one page of text."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return False, "empty"
+
+    for line in lines:
+        if is_section_header(line):
+            return True, f"header: {line.strip()[:30]}"
+
+    value_lines = sum(1 for line in lines if _UNIT_RE.search(fold_text(line)))
+    if value_lines >= PAGE_FILTER_MIN_VALUE_LINES:
+        return True, f"{value_lines} value lines"
+    return False, f"{value_lines} value line(s), no header"
+
+
+class PageFilterStats:
+    """Thread-safe page / character counters for the run summary."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.dropped = 0
+        self.chars = 0
+        self.dropped_chars = 0
+
+    def add(self, pages: int, dropped: int, chars: int, dropped_chars: int) -> None:
+        with self._lock:
+            self.pages += pages
+            self.dropped += dropped
+            self.chars += chars
+            self.dropped_chars += dropped_chars
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "dropped": self.dropped,
+                "dropped_chars": self.dropped_chars,
+                "char_reduction": round(self.dropped_chars / self.chars * 100, 1) if self.chars else 0.0,
+            }
+
+    def format_stats(self, chars_per_token: float) -> str:
+        s = self.stats()
+        return (f"Page filter: {s['dropped']}/{s['pages']} pages dropped, "
+                f"~{int(s['dropped_chars'] / chars_per_token):,} prompt tokens saved ({s['char_reduction']}% of text)")
+
+
+# Process-wide counters shared by every worker
+PAGE_FILTER_STATS = PageFilterStats()
+
+
+def filter_result_pages(page_texts: List[str]) -> List[str]:
+    """Pages of one document that carry results, in order (all pages if none does)."""
+    kept = [text for text in page_texts if classify_page(text)[0]]
+    if not kept:
+        kept = page_texts
+    total_chars = sum(len(text) for text in page_texts)
+    PAGE_FILTER_STATS.add(len(page_texts), len(page_texts) - len(kept),
+                          total_chars, total_chars - sum(len(text) for text in kept))
+    return kept
+
+
+if __name__ == "__main__":
+    from text_layer import extract_page_texts
+
+    if len(sys.argv) != 2:
+        print(f"Usage: python {Path(__file__).name} <pdf>")
+        sys.exit(1)
+
+    for number, page in enumerate(extract_page_texts(Path(sys.argv[1])), 1):
+        keep, reason = classify_page(page.text)
+        print(f"Page {number}: {'keep' if keep else 'drop':<5} {reason:<40} {len(page.text)} chars")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Persistent content-addressed cache for Azure results (OCR text, GPT output).
+
+Entries are plain files named after a SHA-256 key, so the cache directory
+can be wiped, copied or shared between machines without any index file.
+Eviction is LRU by file mtime (a hit touches the entry) once the directory
+grows past max_bytes. Several processes can point at the same directory:
+writes are atomic renames, so readers only ever see complete entries.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple, Callable, Any
+
+
+def sha256_key(*parts: bytes) -> str:
+    """Hash several byte strings into one hex key (length-prefixed, so parts can't collide)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Size-bounded on-disk key -> text cache.
+
+    Thread-safe; writes are atomic (temp file + rename) so a crashed run never
+    leaves a half-written entry behind.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ".txt"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size_bytes: Optional[int] = None  # computed lazily on first write
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for key, or None (counted as a miss)."""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)  # mark as recently used for LRU eviction
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        """Store text under key, then evict least-recently-used entries if over budget."""
+        if not self.enabled:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = text.encode("utf-8")
+        path = self._path(key)
+
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_name, path)
+        except OSError:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            return
+
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = self._scan_size()
+            else:
+                self._size_bytes += len(data) - old_size
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for path in self.directory.glob(f"*{self.suffix}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # removed by another process
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """Drop oldest entries until the cache is back under 90% of max_bytes."""
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._size_bytes = total
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
+
+    def format_stats(self, label: str) -> str:
+        s = self.stats()
+        return (f"{label} cache: {s['hits']} hits / {s['misses']} misses "
+                f"({s['hit_rate']}%), {s['evictions']} evicted [{self.directory}]")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into ONE execution.
+
+    The first caller for a key runs fn(); callers arriving while it is still
+    running block and receive the same result (or exception) instead of
+    issuing a duplicate HTTP request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, "_Call"] = {}
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
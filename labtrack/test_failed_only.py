@@ -2,17 +2,22 @@
 """
 Quick test script - runs only on PDFs that had failures in the last run.
 """
+import argparse
 import json
 import sys
 sys.path.insert(0, '.')
 
 from ocr_gpt_quality_test import (
     process_pdf_with_gpt, evaluate_extraction, 
-    load_groundtruth_csv, BLOODWORK_DIR, OUTPUT_DIR
+    load_groundtruth_csv, run_corpus, BLOODWORK_DIR, OUTPUT_DIR, DEFAULT_WORKERS,
+    OCR_CACHE, GPT_CACHE, OCR_CLIENT
 )
+from http_client import HTTP
+from usage_ledger import LEDGER
+from text_layer import TEXT_LAYER_STATS
 from pathlib import Path
 
-def main():
+def main(workers: int = DEFAULT_WORKERS):
     # Load failures from last run
     with open('ocr_gpt_test_results/all_failures.json') as f:
         failures = json.load(f)
@@ -28,42 +33,51 @@ def main():
     total_exact = 0
     total_fields = 0
     
+    def retest(job):
+        _, pdf_name = job
+        gt_rows = groundtruth.get(pdf_name, [])
+        ocr_text, gpt_result = process_pdf_with_gpt(BLOODWORK_DIR / pdf_name)
+        return evaluate_extraction(gpt_result, gt_rows)
+    
+    jobs = []
     for i, pdf_name in enumerate(failed_pdfs, 1):
-        pdf_path = BLOODWORK_DIR / pdf_name
-        if not pdf_path.exists():
+        if not (BLOODWORK_DIR / pdf_name).exists():
             print(f"[{i}/{len(failed_pdfs)}] {pdf_name[:50]}... NOT FOUND")
             continue
-            
+        jobs.append((i, pdf_name))
+    
+    results = run_corpus(jobs, retest, workers=workers)
+    
+    # Report in the original (sorted) order
+    for (i, pdf_name), result in zip(jobs, results):
         gt_rows = groundtruth.get(pdf_name, [])
         print(f"[{i}/{len(failed_pdfs)}] {pdf_name[:50]}...")
         print(f"  Fields in groundtruth: {len(gt_rows)}")
         
-        try:
-            ocr_text, gpt_result = process_pdf_with_gpt(pdf_path)
-            result = evaluate_extraction(gpt_result, gt_rows)
-            
-            exact = result.get("exact_matches", 0)
-            fields = result.get("total_fields", 0)
-            rate = result.get("exact_match_rate", 0)
-            pdf_failures = result.get("failures", [])
-            
-            total_exact += exact
-            total_fields += fields
-            
-            print(f"  Exact Matches: {exact}/{fields} ({rate}%)")
-            if pdf_failures:
-                print(f"  Failures ({len(pdf_failures)}):")
-                for fail in pdf_failures[:3]:
-                    print(f"    - {fail.get('biomarker', 'Unknown')}: {fail.get('reason', '')}")
-                if len(pdf_failures) > 3:
-                    print(f"    ... and {len(pdf_failures) - 3} more")
-            
-            for fail in pdf_failures:
-                fail['pdf_name'] = pdf_name
-            total_failures.extend(pdf_failures)
-            
-        except Exception as e:
-            print(f"  ERROR: {e}")
+        if result is None:
+            print("  ERROR: processing failed")
+            print()
+            continue
+        
+        exact = result.get("exact_matches", 0)
+        fields = result.get("total_fields", 0)
+        rate = result.get("exact_match_rate", 0)
+        pdf_failures = result.get("failures", [])
+        
+        total_exact += exact
+        total_fields += fields
+        
+        print(f"  Exact Matches: {exact}/{fields} ({rate}%)")
+        if pdf_failures:
+            print(f"  Failures ({len(pdf_failures)}):")
+            for fail in pdf_failures[:3]:
+                print(f"    - {fail.get('biomarker', 'Unknown')}: {fail.get('reason', '')}")
+            if len(pdf_failures) > 3:
+                print(f"    ... and {len(pdf_failures) - 3} more")
+        
+        for fail in pdf_failures:
+            fail['pdf_name'] = pdf_name
+        total_failures.extend(pdf_failures)
         
         print()
     
@@ -76,6 +90,12 @@ def main():
     print(f"Total matches: {total_exact}")
     print(f"Match rate: {total_exact/total_fields*100:.1f}%" if total_fields > 0 else "N/A")
     print(f"Total failures: {len(total_failures)}")
+    print(OCR_CACHE.format_stats("OCR"))
+    print(GPT_CACHE.format_stats("GPT"))
+    print(OCR_CLIENT.format_stats())
+    print(TEXT_LAYER_STATS.format_stats(LEDGER.ocr_seconds_per_page()))
+    print(HTTP.format_stats())
+    print(LEDGER.format_run_summary())
     
     # Save new failures
     with open('ocr_gpt_test_results/failures_retest.json', 'w') as f:
@@ -83,4 +103,6 @@ def main():
     print(f"\nSaved to: ocr_gpt_test_results/failures_retest.json")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Re-test PDFs that failed in the last run")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    main(workers=parser.parse_args().workers)
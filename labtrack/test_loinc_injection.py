@@ -4,15 +4,31 @@ LOINC Prompt Injection Test - Experimental
 Tests the new approach where LOINC codes are injected into the GPT prompt
 and GPT performs normalization during extraction.
 
+By default only a per-document shortlist retrieved from loinc_fr_context.csv
+(loinc_retrieval.py) is injected; --full-catalogue injects every entry.
+--local-coding uses the standard prompt and assigns codes locally (loinc_coding.py).
+
 This is a SEPARATE test that doesn't modify the working code.
 """
 import os
 import json
 import time
-import requests
+import argparse
 from pathlib import Path
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
+from azure_ocr_async import OCRClient
+from http_client import HTTP
+from usage_ledger import LEDGER
+from loinc_index import LoincIndex
+from loinc_retrieval import LoincRetriever, LOINC_SHORTLIST_K
+from loinc_coding import LoincCoder
+from ocr_gpt_quality_test import (
+    run_corpus, cached_ocr, cached_gpt, DEFAULT_WORKERS, OCR_CACHE, GPT_CACHE,
+    call_azure_gpt, normalize_gpt_biomarkers, ocr_with_ledger, GPT_SYSTEM_PROMPT
+)
+
 # Load environment
 load_dotenv('.env.local')
 
@@ -21,29 +37,23 @@ AZURE_OCR_ENDPOINT = os.getenv('AZURE_OCR_ENDPOINT')
 AZURE_OPENAI_API_KEY = os.getenv('AZURE_OPENAI_API_KEY')
 AZURE_OPENAI_API_BASE = os.getenv('AZURE_OPENAI_API_BASE')
 AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
+AZURE_OPENAI_API_VERSION = "2024-08-01-preview"
+
+OCR_CLIENT = OCRClient(AZURE_OCR_ENDPOINT, AZURE_OCR_KEY)
 
 BLOODWORK_DIR = Path("bloodwork")
 
 
 def load_loinc_context(max_entries: int = 6000) -> str:
-    """Load LOINC context from CSV and format for prompt injection."""
+    """Load LOINC context (compiled index, rebuilt if the CSV changed) and format for prompt injection."""
     loinc_path = Path("loinc_fr_context.csv")
     if not loinc_path.exists():
         return ""
     
-    entries = []
-    with open(loinc_path, 'r', encoding='utf-8') as f:
-        next(f)  # Skip header
-        for i, line in enumerate(f):
-            if i >= max_entries:
-                break
-            parts = line.strip().split('|')
-            if len(parts) >= 2:
-                code, name = parts[0], parts[1]
-                unit = parts[2] if len(parts) > 2 else ""
-                entries.append(f"{code}|{name}|{unit}")
-    
-    return "\n".join(entries)
+    index = LoincIndex.open(loinc_path)
+    context = "\n".join(index.prompt_lines()[:max_entries])
+    index.close()
+    return context
 
 
 def build_loinc_system_prompt(loinc_context: str) -> str:
@@ -78,39 +88,12 @@ JSON strict avec: loinc_code, name, value, unit
 
 def call_azure_ocr(pdf_bytes: bytes) -> str:
     """Call Azure Document Intelligence for OCR."""
-    analyze_url = f"{AZURE_OCR_ENDPOINT}documentintelligence/documentModels/prebuilt-read:analyze?api-version=2024-11-30"
-    
-    headers = {
-        "Ocp-Apim-Subscription-Key": AZURE_OCR_KEY,
-        "Content-Type": "application/pdf"
-    }
-    
-    response = requests.post(analyze_url, headers=headers, data=pdf_bytes)
-    
-    if response.status_code != 202:
-        print(f"    [OCR ERROR] {response.status_code}: {response.text[:200]}")
-        return ""
-    
-    operation_url = response.headers.get("Operation-Location")
-    poll_headers = {"Ocp-Apim-Subscription-Key": AZURE_OCR_KEY}
-    
-    for _ in range(120):
-        time.sleep(1)
-        poll_response = requests.get(operation_url, headers=poll_headers)
-        result = poll_response.json()
-        
-        if result.get("status") == "succeeded":
-            content = result.get("analyzeResult", {}).get("content", "")
-            return content
-        elif result.get("status") == "failed":
-            return ""
-    
-    return ""
+    return ocr_with_ledger(OCR_CLIENT, pdf_bytes) or ""
 
 
 def call_azure_gpt_loinc(ocr_text: str, loinc_prompt: str):
     """Call Azure GPT with LOINC-injected prompt."""
-    url = f"{AZURE_OPENAI_API_BASE}openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version=2024-08-01-preview"
+    url = f"{AZURE_OPENAI_API_BASE}openai/deployments/{AZURE_OPENAI_DEPLOYMENT_NAME}/chat/completions?api-version={AZURE_OPENAI_API_VERSION}"
     
     headers = {
         "api-key": AZURE_OPENAI_API_KEY,
@@ -131,55 +114,84 @@ Texte OCR:
         "response_format": {"type": "json_object"}
     }
     
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=120)
-        
-        if response.status_code == 429:
-            print("    [RATE LIMIT] Waiting 15s...")
-            time.sleep(15)
-            response = requests.post(url, headers=headers, json=payload, timeout=120)
-        
-        if response.status_code != 200:
-            print(f"    [GPT ERROR] {response.status_code}: {response.text[:200]}")
+    def request():
+        start = time.time()
+        result, status, retries = None, "error", 0
+        try:
+            response = HTTP.post(url, headers=headers, json=payload)
+            
+            if response.status_code == 429:
+                print("    [RATE LIMIT] Waiting 15s...")
+                time.sleep(15)
+                retries = 1
+                response = HTTP.post(url, headers=headers, json=payload)
+            
+            if response.status_code != 200:
+                status = f"http_{response.status_code}"
+                print(f"    [GPT ERROR] {response.status_code}: {response.text[:200]}")
+                return None
+            
+            # Token counts / cache hits go to the usage ledger (python usage_ledger.py)
+            result = response.json()
+            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+            parsed = json.loads(content.strip())
+            status = "ok"
+            return parsed
+            
+        except Exception as e:
+            print(f"    [GPT ERROR] {e}")
             return None
-        
-        result = response.json()
-        
-        # Token economics logging
-        usage = result.get("usage", {})
-        if usage:
-            cached = usage.get('prompt_tokens_details', {}).get('cached_tokens', 0)
-            total_input = usage.get('prompt_tokens', 0)
-            new_tokens = total_input - cached
-            output_tokens = usage.get('completion_tokens', 0)
-            print(f"\n    --- TOKEN ECONOMICS ---")
-            print(f"    Input Tokens: {total_input:,} (Cached: {cached:,}, New: {new_tokens:,})")
-            print(f"    Output Tokens: {output_tokens:,}")
-            print(f"    ---------------------------")
-        
-        content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-        return json.loads(content.strip())
-        
-    except Exception as e:
-        print(f"    [GPT ERROR] {e}")
+        finally:
+            LEDGER.record_gpt("loinc", AZURE_OPENAI_DEPLOYMENT_NAME, payload, result,
+                              time.time() - start, retries, status)
+    
+    return cached_gpt(AZURE_OPENAI_DEPLOYMENT_NAME or "", AZURE_OPENAI_API_VERSION, payload, request)
+
+
+def local_loinc_result(coder: LoincCoder, gpt_result: Optional[Dict]) -> Optional[Dict]:
+    """Standard GPT output coded by LoincCoder, in the shape of the LOINC-prompt output."""
+    if gpt_result is None:
         return None
+    
+    coded = coder.code_biomarkers(normalize_gpt_biomarkers(gpt_result))
+    return {"biomarkers": [
+        {"loinc_code": b["loinc_code"], "name": b["raw_name"], "value": b["value_string"], "unit": b["unit_raw"]}
+        for b in coded
+    ]}
 
 
-def main():
+def main(workers: int = DEFAULT_WORKERS, full_catalogue: bool = False, top_k: int = LOINC_SHORTLIST_K,
+         local_coding: bool = False):
     print("=" * 70)
-    print("LOINC Prompt Injection Test - FULL 5300 entries")
+    if local_coding:
+        print("LOINC Test - standard prompt + local LOINC coding (no LOINC in prompt)")
+    elif full_catalogue:
+        print("LOINC Prompt Injection Test - FULL 5300 entries")
+    else:
+        print(f"LOINC Prompt Injection Test - retrieved shortlist (top {top_k})")
     print("=" * 70)
     
-    # Load ALL LOINC entries
+    # Load ALL LOINC entries (also the reference size for the shortlist)
     print("Loading LOINC context...")
     loinc_context = load_loinc_context(max_entries=6000)
     loinc_entries = len(loinc_context.split('\n'))
     print(f"Loaded {loinc_entries} LOINC entries")
     
     # Build system prompt
-    loinc_prompt = build_loinc_system_prompt(loinc_context)
-    prompt_tokens = len(loinc_prompt) / 4
-    print(f"System prompt: ~{int(prompt_tokens)} tokens")
+    full_prompt = build_loinc_system_prompt(loinc_context)
+    full_prompt_tokens = LEDGER.estimate_tokens(full_prompt)
+    print(f"System prompt (full catalogue): ~{int(full_prompt_tokens)} tokens")
+    
+    if local_coding:
+        coder = LoincCoder.from_csv()
+    elif full_catalogue:
+        def loinc_prompt_for(ocr_text: str) -> str:
+            return full_prompt
+    else:
+        retriever = LoincRetriever.from_csv()
+        
+        def loinc_prompt_for(ocr_text: str) -> str:
+            return build_loinc_system_prompt(retriever.shortlist_context(ocr_text, top_k))
     
     # Get ALL PDFs from bloodwork directory
     all_pdfs = sorted([p.name for p in BLOODWORK_DIR.glob("*.pdf")])
@@ -189,7 +201,31 @@ def main():
     total_loinc_matched = 0
     total_unknown = 0
     
-    for i, pdf_name in enumerate(all_pdfs, 1):
+    prompt_token_counts = []
+    
+    def extract(pdf_name):
+        """OCR + LOINC GPT for one PDF. Returns (ocr_text, gpt_result, system prompt tokens), None if missing."""
+        if not (BLOODWORK_DIR / pdf_name).exists():
+            return None
+        with open(BLOODWORK_DIR / pdf_name, 'rb') as f:
+            pdf_bytes = f.read()
+        
+        with LEDGER.scope(pdf_name):
+            ocr_text = cached_ocr(pdf_bytes, call_azure_ocr)
+            if not ocr_text:
+                return "", None, 0
+            
+            if local_coding:
+                gpt_result = local_loinc_result(coder, call_azure_gpt(ocr_text))
+                return ocr_text, gpt_result, LEDGER.estimate_tokens(GPT_SYSTEM_PROMPT)
+            
+            loinc_prompt = loinc_prompt_for(ocr_text)
+            return ocr_text, call_azure_gpt_loinc(ocr_text, loinc_prompt), LEDGER.estimate_tokens(loinc_prompt)
+    
+    print(f"Running OCR + GPT with LOINC injection ({workers} workers)...")
+    outcomes = run_corpus(all_pdfs, extract, workers=workers)
+    
+    for i, (pdf_name, outcome) in enumerate(zip(all_pdfs, outcomes), 1):
         pdf_path = BLOODWORK_DIR / pdf_name
         if not pdf_path.exists():
             print(f"\n[{i}/{len(all_pdfs)}] {pdf_name[:50]}... NOT FOUND")
@@ -198,22 +234,14 @@ def main():
         print(f"\n[{i}/{len(all_pdfs)}] {pdf_name[:50]}...")
         print("-" * 70)
         
-        # OCR
-        print("  Running OCR...")
-        with open(pdf_path, 'rb') as f:
-            pdf_bytes = f.read()
-        
-        ocr_text = call_azure_ocr(pdf_bytes)
+        ocr_text, result, prompt_tokens = outcome if outcome is not None else ("", None, 0)
         if not ocr_text:
             print("  OCR failed!")
             continue
         
-        ocr_tokens = len(ocr_text) / 4
-        print(f"  OCR text: ~{int(ocr_tokens)} tokens")
-        
-        # GPT Extraction with LOINC
-        print("  Running GPT with LOINC injection...")
-        result = call_azure_gpt_loinc(ocr_text, loinc_prompt)
+        ocr_tokens = LEDGER.estimate_tokens(ocr_text)
+        prompt_token_counts.append(prompt_tokens)
+        print(f"  OCR text: ~{int(ocr_tokens)} tokens | System prompt: ~{int(prompt_tokens)} tokens")
         
         if result:
             biomarkers = result.get("biomarkers", [])
@@ -249,7 +277,26 @@ def main():
     print(f"Unknown: {total_unknown}")
     if total_biomarkers > 0:
         print(f"Overall LOINC match rate: {total_loinc_matched/total_biomarkers*100:.1f}%")
+    if prompt_token_counts:
+        avg_prompt = sum(prompt_token_counts) / len(prompt_token_counts)
+        print(f"Avg system prompt: ~{int(avg_prompt)} tokens "
+              f"(full catalogue ~{int(full_prompt_tokens)}, x{full_prompt_tokens / avg_prompt:.1f} smaller)")
+    print(OCR_CACHE.format_stats("OCR"))
+    print(OCR_CLIENT.format_stats())
+    print(GPT_CACHE.format_stats("GPT"))
+    print(HTTP.format_stats())
+    print(LEDGER.format_run_summary())
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="LOINC prompt injection test")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--full-catalogue", action="store_true",
+                        help="Inject all LOINC entries instead of the per-document shortlist")
+    parser.add_argument("--top-k", type=int, default=LOINC_SHORTLIST_K,
+                        help=f"LOINC entries injected per document (default: {LOINC_SHORTLIST_K})")
+    parser.add_argument("--local-coding", action="store_true",
+                        help="Standard extraction prompt, LOINC codes assigned locally (loinc_coding.py)")
+    args = parser.parse_args()
+    main(workers=args.workers, full_catalogue=args.full_catalogue, top_k=args.top_k,
+         local_coding=args.local_coding)
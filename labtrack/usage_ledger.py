@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Usage ledger: one JSONL record per Azure call (OCR job or GPT completion).
+
+Each record carries the PDF it was made for (set with LEDGER.scope(pdf)),
+pages, prompt / cached / completion tokens as reported by Azure, prompt and
+completion sizes in characters, latency, retries and status. Records from
+every run are appended to the same file (USAGE_LEDGER, empty to disable),
+tagged with a run ID.
+
+The summarizer turns the file into:
+- cost per PDF (token / page prices below, override through env)
+- prompt-cache hit ratio (cached_tokens / prompt_tokens)
+- calibrated chars-per-token, used by estimate_tokens() instead of len/4
+
+Usage:
+    python usage_ledger.py                 # last run
+    python usage_ledger.py --all           # every run in the file
+    python usage_ledger.py --run <run_id>
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Iterator
+
+LEDGER_PATH = os.getenv("USAGE_LEDGER", "usage_ledger.jsonl")
+
+# USD per 1M tokens (gpt-4o-mini list prices) / per 1000 OCR pages (prebuilt-read)
+GPT_PRICE_INPUT_PER_M = float(os.getenv("GPT_PRICE_INPUT_PER_M", "0.15"))
+GPT_PRICE_CACHED_INPUT_PER_M = float(os.getenv("GPT_PRICE_CACHED_INPUT_PER_M", "0.075"))
+GPT_PRICE_OUTPUT_PER_M = float(os.getenv("GPT_PRICE_OUTPUT_PER_M", "0.60"))
+OCR_PRICE_PER_1K_PAGES = float(os.getenv("OCR_PRICE_PER_1K_PAGES", "1.50"))
+
+# Fallbacks when the ledger has no GPT / OCR record yet
+DEFAULT_CHARS_PER_TOKEN = 4.0
+DEFAULT_OCR_SECONDS_PER_PAGE = 1.0
+
+_current_pdf: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("ledger_pdf", default=None)
+
+
+def usage_from_response(result: Dict) -> Dict[str, int]:
+    """Token counts from a chat/completions response body."""
+    usage = result.get("usage") or {}
+    if not isinstance(usage, dict):
+        return {"prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+    }
+
+
+def payload_chars(payload: Dict) -> int:
+    """Characters of prompt text in a chat/completions payload."""
+    return sum(len(message.get("content") or "") for message in payload.get("messages", []))
+
+
+def is_billed(record: Dict) -> bool:
+    """
+    Whether Azure billed the call: an OCR job only if it succeeded (failed and
+    429-rejected jobs are not charged), a completion whenever one came back.
+    """
+    if record.get("kind") == "ocr":
+        return record.get("status") == "ok"
+    return record.get("status") in ("ok", "bad_json")
+
+
+def record_cost(record: Dict) -> float:
+    """USD cost of one ledger record (0 if not billed)."""
+    if not is_billed(record):
+        return 0.0
+    if record.get("kind") == "ocr":
+        return record.get("pages", 0) * OCR_PRICE_PER_1K_PAGES / 1000
+    cached = record.get("cached_tokens", 0)
+    fresh = record.get("prompt_tokens", 0) - cached
+    return (fresh * GPT_PRICE_INPUT_PER_M
+            + cached * GPT_PRICE_CACHED_INPUT_PER_M
+            + record.get("completion_tokens", 0) * GPT_PRICE_OUTPUT_PER_M) / 1e6
+
+
+class UsageLedger:
+    """Thread-safe JSONL appender; one instance per process (LEDGER)."""
+
+    def __init__(self, path: str = LEDGER_PATH):
+        self.path = Path(path) if path else None
+        self.run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._chars_per_token: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    @contextmanager
+    def scope(self, pdf: str) -> Iterator[None]:
+        """Attribute the calls made inside the block (same thread) to pdf."""
+        token = _current_pdf.set(pdf)
+        try:
+            yield
+        finally:
+            _current_pdf.reset(token)
+
+    def record(self, kind: str, **fields: Any) -> None:
+        """Append one record. Never raises: callers record from finally blocks."""
+        if not self.enabled:
+            return
+        entry = {"ts": round(time.time(), 3), "run_id": self.run_id, "kind": kind, "pdf": _current_pdf.get()}
+        entry.update(fields)
+        try:
+            line = json.dumps(entry, ensure_ascii=False)
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            print(f"    [LEDGER] Record dropped: {e}")
+
+    def record_gpt(self, label: str, deployment: str, payload: Dict, result: Optional[Dict],
+                   latency_s: float, retries: int, status: str, **fields: Any) -> None:
+        """One chat/completions attempt that reached Azure (result = response body, None on error).
+        fields: extra values stored as is (stream timings)."""
+        content = ""
+        if isinstance(result, dict):
+            # Error bodies can carry "choices": [] or a null message
+            choice = (result.get("choices") or [{}])[0] or {}
+            content = (choice.get("message") or {}).get("content") or ""
+        self.record(
+            "gpt", label=label, deployment=deployment,
+            **usage_from_response(result if isinstance(result, dict) else {}),
+            prompt_chars=payload_chars(payload), completion_chars=len(content),
+            latency_s=round(latency_s, 3), retries=retries, status=status, **fields,
+        )
+
+    def record_ocr(self, model: str, pages: int, pdf_bytes: int, text_chars: int,
+                   latency_s: float, retries: int, polls: int, status: str, pdf: Optional[str] = None) -> None:
+        """One Document Intelligence analyze job (pdf overrides the current scope)."""
+        fields = {} if pdf is None else {"pdf": pdf}
+        self.record(
+            "ocr", model=model, pages=pages, pdf_bytes=pdf_bytes, text_chars=text_chars,
+            latency_s=round(latency_s, 3), retries=retries, polls=polls, status=status, **fields,
+        )
+
+    def read(self, run_id: Optional[str] = None) -> List[Dict]:
+        """Records of run_id (all runs if None)."""
+        if not self.enabled or not self.path.exists():
+            return []
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn line from a killed run
+                if run_id is None or record.get("run_id") == run_id:
+                    records.append(record)
+        return records
+
+    def chars_per_token(self) -> float:
+        """Prompt chars per prompt token over every GPT call in the ledger (cached per process)."""
+        if self._chars_per_token is None:
+            gpt = [r for r in self.read() if r.get("kind") == "gpt" and r.get("prompt_tokens")]
+            tokens = sum(r["prompt_tokens"] for r in gpt)
+            self._chars_per_token = (sum(r.get("prompt_chars", 0) for r in gpt) / tokens
+                                     if tokens else DEFAULT_CHARS_PER_TOKEN)
+        return self._chars_per_token
+
+    def ocr_seconds_per_page(self) -> float:
+        """Mean OCR job latency per page over every successful OCR job in the ledger."""
+        ocr = [r for r in self.read() if r.get("kind") == "ocr" and r.get("status") == "ok" and r.get("pages")]
+        pages = sum(r["pages"] for r in ocr)
+        return sum(r.get("latency_s", 0.0) for r in ocr) / pages if pages else DEFAULT_OCR_SECONDS_PER_PAGE
+
+    def estimate_tokens(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token())
+
+    def format_run_summary(self) -> str:
+        """One line for the end of a run: calls, tokens, cache ratio, cost."""
+        s = summarize(self.read(self.run_id))
+        return (f"Usage: {s['gpt_calls']} GPT calls, {s['prompt_tokens']:,} prompt tokens "
+                f"({s['prompt_cache_ratio']}% cached), {s['completion_tokens']:,} completion, "
+                f"{s['ocr_pages']} OCR pages, ~${s['cost_usd']:.4f} [{self.path}]")
+
+
+def summarize(records: List[Dict]) -> Dict[str, Any]:
+    """Totals and per-PDF breakdown of ledger records."""
+    gpt = [r for r in records if r.get("kind") == "gpt"]
+    ocr = [r for r in records if r.get("kind") == "ocr"]
+    prompt_tokens = sum(r.get("prompt_tokens", 0) for r in gpt)
+    cached_tokens = sum(r.get("cached_tokens", 0) for r in gpt)
+    completion_tokens = sum(r.get("completion_tokens", 0) for r in gpt)
+    completion_chars = sum(r.get("completion_chars", 0) for r in gpt)
+
+    per_pdf: Dict[str, Dict[str, float]] = {}
+    for r in records:
+        pdf = per_pdf.setdefault(r.get("pdf") or "(no pdf)", {
+            "ocr_calls": 0, "gpt_calls": 0, "pages": 0, "prompt_tokens": 0,
+            "completion_tokens": 0, "latency_s": 0.0, "retries": 0, "cost_usd": 0.0,
+        })
+        pdf[f"{r.get('kind')}_calls"] = pdf.get(f"{r.get('kind')}_calls", 0) + 1
+        pdf["pages"] += r.get("pages", 0) if is_billed(r) else 0
+        pdf["prompt_tokens"] += r.get("prompt_tokens", 0)
+        pdf["completion_tokens"] += r.get("completion_tokens", 0)
+        pdf["latency_s"] += r.get("latency_s", 0.0)
+        pdf["retries"] += r.get("retries", 0)
+        pdf["cost_usd"] += record_cost(r)
+
+    return {
+        "gpt_calls": len(gpt),
+        "ocr_calls": len(ocr),
+        "ocr_pages": sum(r.get("pages", 0) for r in ocr if is_billed(r)),
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": completion_tokens,
+        "prompt_cache_ratio": round(cached_tokens / prompt_tokens * 100, 1) if prompt_tokens else 0.0,
+        "prompt_chars_per_token": round(sum(r.get("prompt_chars", 0) for r in gpt) / prompt_tokens, 2)
+                                  if prompt_tokens else None,
+        "completion_chars_per_token": round(completion_chars / completion_tokens, 2)
+                                      if completion_tokens else None,
+        "gpt_latency_s": round(sum(r.get("latency_s", 0.0) for r in gpt), 1),
+        "ocr_latency_s": round(sum(r.get("latency_s", 0.0) for r in ocr), 1),
+        "retries": sum(r.get("retries", 0) for r in records),
+        "errors": sum(1 for r in records if r.get("status") != "ok"),
+        "cost_usd": sum(record_cost(r) for r in records),
+        "per_pdf": per_pdf,
+    }
+
+
+# Process-wide ledger shared by every Azure call
+LEDGER = UsageLedger()
+
+
+def main(run_id: Optional[str], all_runs: bool):
+    records = LEDGER.read()
+    if not records:
+        print(f"[ERROR] No records in {LEDGER.path}")
+        return
+
+    if not all_runs:
+        run_id = run_id or records[-1]["run_id"]
+        records = [r for r in records if r.get("run_id") == run_id]
+    s = summarize(records)
+
+    print("=" * 70)
+    print(f"USAGE LEDGER - {'all runs' if all_runs else f'run {run_id}'} ({len(records)} records)")
+    print("=" * 70)
+    print(f"{'PDF':<42} {'OCR':>4} {'GPT':>4} {'Pages':>5} {'Prompt':>8} {'Compl':>6} {'Time':>7} {'Cost $':>8}")
+    for pdf, p in sorted(s["per_pdf"].items()):
+        print(f"{pdf[:42]:<42} {p['ocr_calls']:>4} {p['gpt_calls']:>4} {p['pages']:>5} "
+              f"{p['prompt_tokens']:>8} {p['completion_tokens']:>6} {p['latency_s']:>6.1f}s {p['cost_usd']:>8.4f}")
+
+    n_pdfs = len([pdf for pdf in s["per_pdf"] if pdf != "(no pdf)"]) or 1
+    print("-" * 70)
+    print(f"GPT calls: {s['gpt_calls']} ({s['gpt_latency_s']}s) | OCR jobs: {s['ocr_calls']} "
+          f"({s['ocr_pages']} pages, {s['ocr_latency_s']}s) | retries: {s['retries']} | errors: {s['errors']}")
+    print(f"Prompt tokens: {s['prompt_tokens']:,} ({s['cached_tokens']:,} cached -> "
+          f"prompt-cache hit ratio {s['prompt_cache_ratio']}%)")
+    print(f"Completion tokens: {s['completion_tokens']:,}")
+    print(f"Chars per token: prompt {s['prompt_chars_per_token']} | completion {s['completion_chars_per_token']} "
+          f"(estimates use {LEDGER.chars_per_token():.2f})")
+    print(f"Cost: ${s['cost_usd']:.4f} total, ${s['cost_usd'] / n_pdfs:.4f} per PDF")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the Azure usage ledger")
+    parser.add_argument("--run", help="Run ID (default: last run in the ledger)")
+    parser.add_argument("--all", action="store_true", help="Summarize every run in the ledger")
+    args = parser.parse_args()
+    main(args.run, args.all)